@@ -0,0 +1,255 @@
+"""Benchmark the core pipeline on synthetic vaults.
+
+    python benchmarks/bench.py --sizes 1000 10000 --output results.json
+    python benchmarks/bench.py --sizes 1000 --compare results.json
+
+Each benchmark is run ``--repeat`` times (write benchmarks once, on a
+fresh copy of the vault) and the results are written as JSON: one record
+per (size, benchmark) with every run's wall time, plus environment
+metadata, so two result files can be compared with ``--compare``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from synth_vault import VaultSpec, generate_vault
+
+from tag_wrangler import __version__, fmparse
+from tag_wrangler.analyzer import (
+    find_similar_tags,
+    tag_co_occurrence,
+    vault_stats,
+)
+from tag_wrangler.cache import ScanCache
+from tag_wrangler.operations import (
+    AddRule,
+    DeleteRule,
+    RenameRule,
+    add_tag_to_notes,
+    apply_rules,
+    rename_tag,
+)
+from tag_wrangler.shards import plan_shards, scan_sharded
+from tag_wrangler.snapshot import load_snapshot, snapshot_path, write_snapshot
+from tag_wrangler.tables import VaultTables
+from tag_wrangler.vault import build_tag_index, scan_vault
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def time_runs(fn: Callable[[], object], repeat: int) -> tuple[list[float], object]:
+    """Wall time of *repeat* calls to *fn* and the last call's result."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def bench_size(
+    size: int, workdir: Path, repeat: int, seed: int, only: set[str] | None
+) -> list[dict]:
+    records: list[dict] = []
+
+    def record(name: str, runs: list[float], **extra) -> None:
+        if only is not None and name not in only:
+            return
+        records.append(
+            {
+                "size": size,
+                "benchmark": name,
+                "min": min(runs),
+                "median": statistics.median(runs),
+                "runs": runs,
+                **extra,
+            }
+        )
+        print(
+            f"{size:>8}  {name:<22} {min(runs):9.4f}s  (median "
+            f"{statistics.median(runs):.4f}s, {len(runs)} run(s))",
+            file=sys.stderr,
+        )
+
+    def wanted(name: str) -> bool:
+        return only is None or name in only
+
+    spec = VaultSpec(notes=size, seed=seed)
+    vault = workdir / f"vault-{size}"
+    start = time.perf_counter()
+    generate_vault(vault, spec)
+    record("generate", [time.perf_counter() - start], vocabulary=spec.vocab_size)
+
+    runs, notes = time_runs(lambda: scan_vault(vault), repeat)
+    record("scan_vault", runs, notes=len(notes))
+
+    cache_dir = workdir / f"cache-{size}"
+    cache = ScanCache.for_vault(vault, cache_dir)
+    scan_vault(vault, cache=cache)
+    runs, _ = time_runs(lambda: scan_vault(vault, cache=cache), repeat)
+    record("scan_vault_cached", runs)
+
+    if wanted("scan_sharded"):
+        shards = plan_shards(vault)
+        runs, _ = time_runs(
+            lambda: scan_sharded(shards, use_cache=False).tag_index(), repeat
+        )
+        record("scan_sharded", runs, shards=len(shards))
+
+    runs, index = time_runs(lambda: build_tag_index(notes), repeat)
+    record("build_tag_index", runs, tags=len(index))
+
+    if wanted("find_similar_tags"):
+        runs, pairs = time_runs(lambda: find_similar_tags(index, 80), repeat)
+        record("find_similar_tags", runs, pairs=len(pairs))
+    if wanted("tag_co_occurrence"):
+        runs, co = time_runs(lambda: tag_co_occurrence(notes, 2), repeat)
+        record("tag_co_occurrence", runs, pairs=len(co))
+    if wanted("vault_tables") or wanted("vault_stats"):
+        runs, tables = time_runs(lambda: VaultTables.from_notes(notes), repeat)
+        record("vault_tables", runs, edges=len(tables.edges))
+        runs, _ = time_runs(lambda: vault_stats(tables), repeat)
+        record("vault_stats", runs)
+    if wanted("snapshot_write") or wanted("snapshot_open"):
+        path = snapshot_path(vault, cache_dir)
+        runs, _ = time_runs(lambda: write_snapshot(path, notes, cache.entries), repeat)
+        record("snapshot_write", runs, bytes=path.stat().st_size)
+
+        def reopen() -> int:
+            # What reopening the app costs: validate, then index and tables
+            snapshot = load_snapshot(vault, cache_dir)
+            tags = len(snapshot.tag_index())
+            VaultTables.from_snapshot(snapshot)
+            snapshot.close()
+            return tags
+
+        runs, tags = time_runs(reopen, repeat)
+        record("snapshot_open", runs, tags=tags)
+
+    # Write benchmarks mutate the vault, so each gets a fresh copy
+    by_count = sorted(index.values(), key=lambda t: (-t.count, t.name))
+    common, mid = by_count[0].name, by_count[len(by_count) // 10].name
+
+    def fresh() -> tuple[Path, list]:
+        target = workdir / f"write-{size}"
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.copytree(vault, target)
+        return target, scan_vault(target)
+
+    writes: dict[str, Callable[[Path, list], object]] = {
+        "rename_tag": lambda root, ns: rename_tag(ns, root, common, common + "-new"),
+        "add_tag_to_notes": lambda root, ns: add_tag_to_notes(
+            ns, root, "bench-added", ns[::10]
+        ),
+        "apply_rules": lambda root, ns: (
+            apply_rules(
+                ns,
+                root,
+                [
+                    RenameRule(mid, mid + "-renamed"),
+                    DeleteRule(by_count[1].name),
+                    AddRule("bench-batch", frozenset(n.path for n in ns[::20])),
+                ],
+            ).modified
+        ),
+    }
+    for name, op in writes.items():
+        if not wanted(name):
+            continue
+        root, fresh_notes = fresh()
+        start = time.perf_counter()
+        modified = op(root, fresh_notes)
+        record(name, [time.perf_counter() - start], modified=modified)
+    return records
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "tag_wrangler": __version__,
+        "commit": commit,
+        "fm_backend": fmparse.get_backend(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(current: list[dict], baseline_path: Path) -> None:
+    """Print min-time ratios of *current* against a saved result file."""
+    baseline = json.loads(baseline_path.read_text())
+    old = {(r["size"], r["benchmark"]): r["min"] for r in baseline["results"]}
+    print(f"{'size':>8}  {'benchmark':<22} {'before':>10} {'after':>10} {'ratio':>7}")
+    for r in current:
+        before = old.get((r["size"], r["benchmark"]))
+        if before is None:
+            continue
+        ratio = r["min"] / before if before else float("inf")
+        print(
+            f"{r['size']:>8}  {r['benchmark']:<22} {before:10.4f} "
+            f"{r['min']:10.4f} {ratio:7.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", help="Run only these benchmarks (by name)")
+    parser.add_argument(
+        "--fm-backend",
+        choices=fmparse.BACKENDS,
+        help="Frontmatter parser backend to benchmark",
+    )
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare to")
+    parser.add_argument(
+        "--workdir", type=Path, help="Keep generated vaults here (default: temp)"
+    )
+    args = parser.parse_args()
+
+    if args.fm_backend:
+        fmparse.set_backend(args.fm_backend)
+    only = set(args.only) if args.only else None
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory(prefix="tw-bench-") as tmp:
+        workdir = args.workdir or Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for size in args.sizes:
+            results.extend(bench_size(size, workdir, args.repeat, args.seed, only))
+
+    payload = {"environment": environment(), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(payload, indent=2) + "\n")
+    else:
+        json.dump(payload, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
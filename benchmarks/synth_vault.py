@@ -0,0 +1,162 @@
+"""Deterministic synthetic Obsidian vault generator for benchmarks.
+
+The same parameters and seed always produce byte-identical vaults. Tags
+follow a Zipf distribution over a generated vocabulary that includes
+nested tags and near-duplicate spellings, so similarity and
+co-occurrence benchmarks see realistic shapes.
+
+    python benchmarks/synth_vault.py /tmp/vault --notes 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import itertools
+import random
+import shutil
+from pathlib import Path
+
+_SYLLABLES = [
+    "ka", "to", "ri", "mu", "sen", "lo", "pra", "dex", "vi", "no", "tal", "go",
+    "qui", "ber", "sha", "mon", "el", "ar", "zu", "fen", "ix", "or", "plu", "dra",
+]  # fmt: skip
+_WORDS = [
+    "the", "a", "vault", "note", "idea", "project", "draft", "review", "meeting",
+    "code", "plan", "with", "for", "and", "of", "to", "in", "on", "data", "tag", "link",
+    "task", "week", "today", "later", "research", "summary", "design",
+]  # fmt: skip
+
+
+@dataclasses.dataclass(frozen=True)
+class VaultSpec:
+    """Shape of a synthetic vault."""
+
+    notes: int = 1000
+    vocabulary: int | None = None  # distinct tags; default scales with notes
+    zipf: float = 1.1  # exponent of the tag popularity distribution
+    tags_per_note: tuple[int, int] = (0, 8)  # inclusive range
+    nested: float = 0.3  # share of tags that are nested (a/b, a/b/c)
+    near_duplicates: float = 0.05  # share of tags that are variant spellings
+    inline: float = 0.3  # share of a note's tags written inline as #tag
+    folder_depth: int = 3  # maximum folder nesting
+    folders_per_level: int = 6
+    body_words: int = 120  # mean body length in words
+    seed: int = 42
+
+    @property
+    def vocab_size(self) -> int:
+        if self.vocabulary is not None:
+            return self.vocabulary
+        return max(50, int(self.notes**0.75))
+
+
+def make_vocabulary(spec: VaultSpec, rng: random.Random) -> list[str]:
+    """Tag names, most popular first."""
+    words: list[str] = []
+    seen: set[str] = set()
+    while len(words) < spec.vocab_size:
+        word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word in seen:
+            continue
+        if words and rng.random() < spec.nested:
+            parent = rng.choice(words[: max(1, len(words) // 4)])
+            if parent.count("/") < 2:
+                word = f"{parent}/{word}"
+        elif words and rng.random() < spec.near_duplicates:
+            base = rng.choice(words)
+            word = rng.choice([base + "s", base.replace("/", "-"), base + "-" + "x"])
+            if word in seen:
+                continue
+        seen.add(word)
+        words.append(word)
+    return words
+
+
+def make_folders(spec: VaultSpec, rng: random.Random) -> list[Path]:
+    folders = [Path(".")]
+    level = [Path(".")]
+    for _ in range(spec.folder_depth):
+        level = [
+            parent / f"{rng.choice(_WORDS)}-{i}"
+            for parent in level
+            for i in range(rng.randint(1, spec.folders_per_level))
+        ][:200]
+        folders.extend(level)
+    return folders
+
+
+def render_note(
+    spec: VaultSpec, rng: random.Random, title: str, tags: list[str]
+) -> str:
+    inline = [t for t in tags if rng.random() < spec.inline]
+    fm_tags = [t for t in tags if t not in inline]
+    lines = ["---", f"title: {title}", f"date: 2024-{rng.randint(1, 12):02d}-01"]
+    if fm_tags:
+        lines.append("tags:")
+        lines.extend(f"  - {t}" for t in fm_tags)
+    lines += ["---", "", f"# {title}", ""]
+    words = max(0, int(rng.gauss(spec.body_words, spec.body_words / 3)))
+    body = [rng.choice(_WORDS) for _ in range(words)]
+    for tag in inline:
+        body.insert(rng.randint(0, len(body)), f"#{tag}")
+    for start in range(0, len(body), 12):
+        lines.append(" ".join(body[start : start + 12]))
+    return "\n".join(lines) + "\n"
+
+
+def generate_vault(root: Path, spec: VaultSpec, clean: bool = True) -> Path:
+    """Write a vault described by *spec* under *root*. Returns *root*."""
+    if clean and root.exists():
+        shutil.rmtree(root)
+    rng = random.Random(spec.seed)
+    vocab = make_vocabulary(spec, rng)
+    cum_weights = list(
+        itertools.accumulate(1 / (rank**spec.zipf) for rank in range(1, len(vocab) + 1))
+    )
+    folders = make_folders(spec, rng)
+    (root / ".obsidian").mkdir(parents=True, exist_ok=True)
+    for folder in folders:
+        (root / folder).mkdir(parents=True, exist_ok=True)
+
+    lo, hi = spec.tags_per_note
+    for i in range(spec.notes):
+        n_tags = rng.randint(lo, hi)
+        tags = list(
+            dict.fromkeys(rng.choices(vocab, cum_weights=cum_weights, k=n_tags))
+        )
+        title = f"note-{i:06d}"
+        path = root / rng.choice(folders) / f"{title}.md"
+        path.write_text(render_note(spec, rng, title, tags), encoding="utf-8")
+    return root
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", type=Path)
+    defaults = VaultSpec()
+    parser.add_argument("--notes", type=int, default=defaults.notes)
+    parser.add_argument("--vocabulary", type=int, default=None)
+    parser.add_argument("--zipf", type=float, default=defaults.zipf)
+    parser.add_argument("--nested", type=float, default=defaults.nested)
+    parser.add_argument("--inline", type=float, default=defaults.inline)
+    parser.add_argument("--folder-depth", type=int, default=defaults.folder_depth)
+    parser.add_argument("--body-words", type=int, default=defaults.body_words)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+    spec = VaultSpec(
+        notes=args.notes,
+        vocabulary=args.vocabulary,
+        zipf=args.zipf,
+        nested=args.nested,
+        inline=args.inline,
+        folder_depth=args.folder_depth,
+        body_words=args.body_words,
+        seed=args.seed,
+    )
+    generate_vault(args.root, spec)
+    print(f"Wrote {spec.notes} notes ({spec.vocab_size} tag vocabulary) to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
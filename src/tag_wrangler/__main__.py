@@ -0,0 +1,7 @@
+"""Allow ``python -m tag_wrangler``."""
+
+import sys
+
+from tag_wrangler.cli import main
+
+sys.exit(main())
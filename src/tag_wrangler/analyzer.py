@@ -2,58 +2,198 @@
 
 from __future__ import annotations
 
+import bisect
+import sys
+import warnings
 from collections import Counter
+from collections.abc import Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING
 
-from rapidfuzz import fuzz
+from tag_wrangler import perf
+from tag_wrangler.models import Note, TagIndex, TagInfo
 
-from tag_wrangler.models import Note, TagInfo
+if TYPE_CHECKING:
+    import pandas as pd
 
+    from tag_wrangler.tables import VaultTables
 
+# numpy, pandas, rapidfuzz and the co-occurrence matrix are imported inside
+# the functions that need them so that light callers (the CLI) start fast.
+
+
+@perf.timed("analyze.similar_tags")
 def find_similar_tags(
-    tag_index: dict[str, TagInfo], threshold: int = 80
+    tag_index: dict[str, TagInfo],
+    threshold: int = 80,
+    blocking: bool = True,
+    workers: int = -1,
+    chunk_size: int = 512,
 ) -> list[tuple[str, str, int]]:
     """Find pairs of tags that look similar (possible duplicates).
 
     Returns list of (tag_a, tag_b, similarity_score) sorted by score descending.
+
+    Scoring is batched through ``rapidfuzz.process.cdist`` on ``workers``
+    threads (-1 = all cores), ``chunk_size`` query rows at a time. With
+    ``blocking`` tags are grouped into length bands and pairs whose length
+    ratio alone keeps them below *threshold* are never scored; this is
+    exact, the result is the same as scoring every pair.
     """
+    import numpy as np
+    from rapidfuzz import fuzz, process
+
     tag_names = sorted(tag_index.keys())
-    pairs: list[tuple[str, str, int]] = []
-    for i, a in enumerate(tag_names):
-        for b in tag_names[i + 1 :]:
-            score = fuzz.ratio(a, b)
-            if score >= threshold:
-                pairs.append((a, b, score))
-    pairs.sort(key=lambda x: x[2], reverse=True)
-    return pairs
-
-
-def tag_frequency(notes: list[Note]) -> Counter:
-    """Return tag -> usage count."""
-    counter: Counter = Counter()
-    for note in notes:
-        counter.update(note.tags)
-    return counter
-
-
-def tag_co_occurrence(notes: list[Note], min_count: int = 2) -> dict[tuple[str, str], int]:
-    """Find tags that frequently appear together."""
-    co: Counter = Counter()
-    for note in notes:
-        tags = sorted(note.tags)
-        for i, a in enumerate(tags):
-            for b in tags[i + 1 :]:
-                co[(a, b)] += 1
-    return {pair: count for pair, count in co.items() if count >= min_count}
-
-
-def orphan_tags(tag_index: dict[str, TagInfo], threshold: int = 1) -> list[TagInfo]:
-    """Tags used in very few notes (potential cleanup candidates)."""
-    return sorted(
-        [t for t in tag_index.values() if t.count <= threshold],
-        key=lambda t: t.name,
+    if len(tag_names) < 2:
+        return []
+
+    found: list[tuple[int, int, float]] = []
+    lengths = np.fromiter((len(n) for n in tag_names), dtype=np.int64)
+    for rows, cols in _length_blocks(tag_names, threshold, blocking, chunk_size):
+        rows_arr, cols_arr = np.asarray(rows), np.asarray(cols)
+        if not blocking:
+            keep = rows_arr[:, None] < cols_arr[None, :]
+        else:
+            # Length blocks pair each tag with equal-or-longer partners;
+            # equal-length pairs show up from both sides, so keep one.
+            keep = (rows_arr[:, None] < cols_arr[None, :]) | (
+                lengths[cols_arr][None, :] > lengths[rows_arr][:, None]
+            )
+        r, c = np.nonzero(keep)
+        if not len(r):
+            continue
+        # cdist scores the whole block, including the pairs dropped above
+        perf.count("pairs_scored", len(rows) * len(cols))
+        left, right = rows_arr[r], cols_arr[c]
+        scores = process.cdist(
+            [tag_names[i] for i in rows],
+            [tag_names[j] for j in cols],
+            scorer=fuzz.ratio,
+            score_cutoff=threshold,
+            dtype=np.float64,
+            workers=workers,
+        )[r, c]
+        hit = scores >= threshold
+        for i, j, score in zip(
+            left[hit].tolist(), right[hit].tolist(), scores[hit].tolist()
+        ):
+            found.append((min(i, j), max(i, j), score))
+
+    # Same order as a plain i < j double loop stably sorted by score
+    found.sort(key=lambda x: (-x[2], x[0], x[1]))
+    return [(tag_names[i], tag_names[j], score) for i, j, score in found]
+
+
+def _max_partner_length(length: int, threshold: float) -> int:
+    """Longest string that could still reach *threshold* against *length*.
+
+    ``fuzz.ratio`` is at most ``200 * shorter / (shorter + longer)``.
+    """
+    if threshold <= 0:
+        return sys.maxsize
+    return int(length * (200 - threshold) / threshold + 1e-9)
+
+
+def _length_blocks(
+    tag_names: list[str], threshold: float, blocking: bool, chunk_size: int
+) -> Iterator[tuple[list[int], list[int]]]:
+    """Yield (query rows, candidate columns) index blocks to score."""
+    everything = list(range(len(tag_names)))
+    if not blocking:
+        for start in range(0, len(everything), chunk_size):
+            yield everything[start : start + chunk_size], everything
+        return
+
+    by_length = sorted(everything, key=lambda i: len(tag_names[i]))
+    lengths = [len(tag_names[i]) for i in by_length]
+    start = 0
+    while start < len(by_length):
+        length = lengths[start]
+        group_end = bisect.bisect_right(lengths, length, lo=start)
+        band_end = bisect.bisect_right(
+            lengths, _max_partner_length(length, threshold), lo=group_end
+        )
+        cols = by_length[start:band_end]
+        for row_start in range(start, group_end, chunk_size):
+            yield by_length[row_start : min(row_start + chunk_size, group_end)], cols
+        start = group_end
+
+
+@perf.timed("analyze.tag_frequency")
+def tag_frequency(tables: VaultTables) -> pd.Series:
+    """Notes per tag, most used first (ties in name order).
+
+    Passing a list of notes, as before :class:`VaultTables`, still works but
+    is deprecated; it returns the old ``Counter``.
+    """
+    if isinstance(tables, Sequence):
+        from tag_wrangler.tables import VaultTables
+
+        _deprecated("tag_frequency(notes)", "tag_frequency(VaultTables)")
+        return Counter(tag_frequency(VaultTables.from_notes(tables)).to_dict())
+    import numpy as np
+    import pandas as pd
+
+    counts = tables.tag_counts()
+    order = np.argsort(-counts, kind="stable")
+    return pd.Series(counts[order], index=tables.tag_names[order], name="count")
+
+
+@perf.timed("analyze.tags_per_note")
+def tags_per_note(tables: VaultTables) -> pd.Series:
+    """Number of notes with 0, 1, 2, ... tags, indexed by tag count."""
+    import numpy as np
+    import pandas as pd
+
+    return pd.Series(np.bincount(tables.notes["tag_count"].to_numpy()), name="notes")
+
+
+@perf.timed("analyze.co_occurrence")
+def tag_co_occurrence(
+    notes: list[Note], min_count: int = 2
+) -> dict[tuple[str, str], int]:
+    """Find tags that frequently appear together.
+
+    For repeated queries (top-k pairs, related tags) build a
+    :class:`~tag_wrangler.cooccurrence.TagMatrix` once and query it instead.
+    """
+    from tag_wrangler.cooccurrence import TagMatrix
+
+    return TagMatrix.from_notes(notes).pair_counts(min_count)
+
+
+@perf.timed("analyze.orphan_tags")
+def orphan_tags(tables: VaultTables, threshold: int = 1) -> pd.DataFrame:
+    """Tags used in very few notes (potential cleanup candidates).
+
+    One row per tag, by name: ``tag``, ``count`` and ``note``, the path of
+    the first note carrying it. Passing a tag index, as before
+    :class:`VaultTables`, still works but is deprecated; it returns the old
+    list of :class:`TagInfo`.
+    """
+    if isinstance(tables, Mapping):
+        _deprecated("orphan_tags(tag_index)", "orphan_tags(VaultTables)")
+        return [
+            tables[name] for name in sorted(tables) if tables[name].count <= threshold
+        ]
+    import numpy as np
+    import pandas as pd
+
+    counts = tables.tag_counts()
+    codes = tables.tag_codes
+    rows = np.flatnonzero(counts[codes] <= threshold)
+    # Edges are in note order, so a tag's first row is its first note
+    tag_codes, first = np.unique(codes[rows], return_index=True)
+    note_ids = tables.edges["note_id"].to_numpy()[rows[first]]
+    return pd.DataFrame(
+        {
+            "tag": tables.tag_names[tag_codes],
+            "count": counts[tag_codes],
+            "note": tables.notes["path"].to_numpy()[note_ids],
+        }
     )
 
 
+@perf.timed("analyze.hierarchy")
 def tag_hierarchy(tag_index: dict[str, TagInfo]) -> dict[str, list[str]]:
     """Build a tree of nested tags (e.g. project/work -> {project: [work]})."""
     tree: dict[str, list[str]] = {}
@@ -66,24 +206,53 @@ def tag_hierarchy(tag_index: dict[str, TagInfo]) -> dict[str, list[str]]:
     return tree
 
 
-def vault_stats(notes: list[Note], tag_index: dict[str, TagInfo]) -> dict:
-    """Compute summary statistics for the vault."""
-    total_notes = len(notes)
-    total_tags = len(tag_index)
-    notes_with_tags = sum(1 for n in notes if n.tags)
-    notes_without_tags = total_notes - notes_with_tags
-    avg_tags = (
-        sum(len(n.tags) for n in notes) / total_notes if total_notes else 0
-    )
-    most_common = tag_frequency(notes).most_common(10)
-    orphans = orphan_tags(tag_index)
+@perf.timed("analyze.vault_stats")
+def vault_stats(tables: VaultTables, tag_index: TagIndex | None = None) -> dict:
+    """Compute summary statistics for the vault.
+
+    The old ``vault_stats(notes, tag_index)`` form still works but is
+    deprecated.
+    """
+    if tag_index is not None:
+        _deprecated("vault_stats(notes, tag_index)", "vault_stats(VaultTables)")
+        counts = {name: info.count for name, info in tag_index.items()}
+        with_tags = sum(1 for n in tables if n.tags)
+        return stats_from_counts(len(tables), with_tags, counts)
+    import numpy as np
+
+    counts = dict(zip(tables.tag_names.tolist(), tables.tag_counts().tolist()))
+    tag_count = tables.notes["tag_count"].to_numpy()
+    with_tags = int(np.count_nonzero(tag_count))
+    return stats_from_counts(len(tag_count), with_tags, counts)
 
+
+@perf.timed("analyze.index_stats")
+def index_stats(tag_index: TagIndex) -> dict:
+    """:func:`vault_stats` from the tag index alone, without numpy or pandas."""
+    tagged: set[int] = set()
+    for info in tag_index.values():
+        tagged.update(info.postings)
+    counts = {name: info.count for name, info in tag_index.items()}
+    return stats_from_counts(len(tag_index.paths), len(tagged), counts)
+
+
+def stats_from_counts(
+    total_notes: int, notes_with_tags: int, counts: Mapping[str, int]
+) -> dict:
+    """:func:`vault_stats` from note totals and notes per tag."""
+    occurrences = sum(counts.values())
+    top = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:10]
     return {
         "total_notes": total_notes,
-        "total_unique_tags": total_tags,
+        "total_unique_tags": len(counts),
         "notes_with_tags": notes_with_tags,
-        "notes_without_tags": notes_without_tags,
-        "avg_tags_per_note": round(avg_tags, 1),
-        "top_tags": most_common,
-        "orphan_count": len(orphans),
+        "notes_without_tags": total_notes - notes_with_tags,
+        "avg_tags_per_note": round(occurrences / total_notes, 1) if total_notes else 0,
+        "top_tags": top,
+        "orphan_count": sum(1 for c in counts.values() if c <= 1),
     }
+
+
+def _deprecated(old: str, new: str) -> None:
+    # Point at the caller, past the analyzer function and its perf.timed wrapper
+    warnings.warn(f"{old} is deprecated; use {new}", DeprecationWarning, stacklevel=4)
@@ -0,0 +1,58 @@
+"""Operation history: undo batches, resume or roll back interrupted ones."""
+
+from __future__ import annotations
+
+import datetime
+
+import streamlit as st
+
+from tag_wrangler.app.state import get_journal, recover_operation
+
+# Most recent journaled operations listed
+HISTORY_ROWS = 10
+
+
+def operation_history() -> None:
+    """List recent journaled operations with resume / roll back / undo."""
+    entries = get_journal().entries()
+    st.divider()
+    st.subheader("Operation history")
+    interrupted = [e for e in entries if e.can_resume]
+    if interrupted:
+        st.warning(
+            f"{len(interrupted)} operation(s) stopped part-way through. Resume "
+            "them to finish the remaining files, or roll them back to restore "
+            "the files they changed."
+        )
+    if not entries:
+        st.caption("Bulk operations are journaled here so they can be undone.")
+        return
+    for entry in entries[:HISTORY_ROWS]:
+        when = datetime.datetime.fromtimestamp(entry.created)
+        info, status, resume, undo = st.columns([5, 2, 1, 1])
+        info.markdown(f"`{entry.description}`  \n{when:%Y-%m-%d %H:%M:%S}")
+        progress = f"{entry.done}/{entry.files}" if entry.can_resume else entry.files
+        status.caption(f"{entry.status.capitalize()}, {progress} file(s)")
+        if entry.can_resume:
+            resume.button(
+                "Resume",
+                key=f"resume_{entry.id}",
+                on_click=_recover,
+                args=(entry.id, "resume"),
+            )
+        if entry.can_roll_back:
+            undo.button(
+                "Roll back" if entry.can_resume else "Undo",
+                key=f"undo_{entry.id}",
+                on_click=_recover,
+                args=(entry.id, "rollback"),
+                help="Restore the files this operation changed. Notes edited "
+                "since are left alone and reported.",
+            )
+
+
+def _recover(entry_id: str, action: str) -> None:
+    try:
+        recover_operation(entry_id, action)
+    except (KeyError, ValueError) as e:
+        st.error(str(e))
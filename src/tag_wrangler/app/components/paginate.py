@@ -0,0 +1,52 @@
+"""Server-side pagination for long tag and note lists."""
+
+from __future__ import annotations
+
+from collections.abc import Hashable, Sequence
+from typing import TypeVar
+
+import pandas as pd
+import streamlit as st
+
+T = TypeVar("T", bound=Sequence | pd.DataFrame)
+
+# Rows per page unless a page asks for something else
+PAGE_SIZE = 50
+
+
+def paginate(
+    items: T,
+    key: str,
+    page_size: int = PAGE_SIZE,
+    reset_on: Hashable = None,
+    noun: str = "rows",
+) -> T:
+    """Draw page controls for *items* and return the visible slice.
+
+    Only the returned slice should be rendered, so a rerun sends at most
+    *page_size* entries to the browser however long *items* is. Nothing is
+    drawn when everything fits on one page. The page goes back to 1 when
+    *reset_on* (e.g. the current search text) changes.
+    """
+    total = len(items)
+    pages = max(1, -(-total // page_size))
+    page_key = f"page_{key}"
+    context_key = f"page_{key}_context"
+    if st.session_state.get(context_key) != reset_on:
+        st.session_state[context_key] = reset_on
+        st.session_state[page_key] = 1
+    elif st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    if pages == 1:
+        return items
+
+    col_page, col_info = st.columns([1, 4], vertical_alignment="bottom")
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=pages, key=page_key)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    with col_info:
+        st.caption(f"{noun.capitalize()} {start + 1:,}-{stop:,} of {total:,}")
+    if isinstance(items, pd.DataFrame):
+        return items.iloc[start:stop]
+    return items[start:stop]
@@ -0,0 +1,113 @@
+"""Sidebar "Performance" panel: timing spans, counters and one-off profiles."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import marshal
+import pstats
+
+import pandas as pd
+import streamlit as st
+
+from tag_wrangler import perf
+
+# Rows of the cumulative-time table shown for a captured profile
+PROFILE_LINES = 40
+
+
+def start_profile() -> None:
+    """Start profiling this rerun if the user asked for it.
+
+    Called from ``init_state``; a profile left running by a rerun that
+    stopped early (``st.stop()``) is collected here instead.
+    """
+    if st.session_state.get("profiler") is not None:
+        finish_profile()
+    if st.session_state.pop("profile_armed", False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        st.session_state.profiler = profiler
+
+
+def finish_profile() -> None:
+    profiler = st.session_state.get("profiler")
+    if profiler is None:
+        return
+    profiler.disable()
+    st.session_state.profiler = None
+    profiler.create_stats()
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_LINES)
+    st.session_state.profile_result = {
+        "text": out.getvalue(),
+        "raw": marshal.dumps(profiler.stats),
+    }
+
+
+def _arm_profile() -> None:
+    st.session_state.profile_armed = True
+
+
+def perf_panel() -> None:
+    """Render the panel; call it last on a page so the whole rerun is covered."""
+    finish_profile()
+    with st.sidebar.expander("Performance"):
+        data = perf.snapshot()
+        if data["spans"]:
+            spans = pd.DataFrame(
+                [
+                    {
+                        "Span": name,
+                        "Calls": s["count"],
+                        "Total (ms)": s["total"] * 1000,
+                        "Mean (ms)": s["total"] * 1000 / s["count"],
+                        "Max (ms)": s["max"] * 1000,
+                    }
+                    for name, s in data["spans"].items()
+                ]
+            ).sort_values("Total (ms)", ascending=False)
+            st.dataframe(
+                spans,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    c: st.column_config.NumberColumn(format="%.1f")
+                    for c in ("Total (ms)", "Mean (ms)", "Max (ms)")
+                },
+            )
+        else:
+            st.caption("No spans recorded yet.")
+        for name, value in sorted(data["counters"].items()):
+            st.caption(f"{name}: {value:,}")
+
+        out = io.StringIO()
+        perf.write_snapshot(out)
+        cols = st.columns(2)
+        cols[0].download_button(
+            "Download",
+            out.getvalue(),
+            file_name="tag-wrangler-perf.jsonl",
+            mime="application/jsonl",
+            use_container_width=True,
+        )
+        if cols[1].button("Reset", use_container_width=True):
+            perf.reset()
+            st.rerun()
+
+        st.button(
+            "Profile next rerun",
+            on_click=_arm_profile,
+            help="Run cProfile over the next page run and offer the result "
+            "for download.",
+        )
+        result = st.session_state.get("profile_result")
+        if result is not None:
+            st.code(result["text"], language=None)
+            st.download_button(
+                "Download profile (.prof)",
+                result["raw"],
+                file_name="tag-wrangler.prof",
+                mime="application/octet-stream",
+            )
@@ -0,0 +1,52 @@
+"""Pick one tag through the n-gram search and a paginated result list."""
+
+from __future__ import annotations
+
+import streamlit as st
+
+from tag_wrangler.app.components.paginate import paginate
+from tag_wrangler.app.state import cached, get_tag_search
+
+# Matching tags offered per page
+PICKER_PAGE_SIZE = 20
+
+
+def tag_picker(label: str, key: str, page_size: int = PICKER_PAGE_SIZE) -> str | None:
+    """Draw a tag search box over a page of hits; return the picked tag.
+
+    Only the current page of matches is sent to the browser, never the whole
+    tag list. The pick is kept in session state under *key*, so it survives
+    paging and new searches until it is cleared.
+    """
+    picked_key = f"{key}_picked"
+    search = st.text_input(
+        label, key=f"{key}_search", placeholder="Type part of a tag..."
+    )
+    tag_search = get_tag_search()
+    hits = cached(("tag_search", search), lambda: tag_search.search(search))
+    page = paginate(hits, key, page_size=page_size, reset_on=search, noun="tags")
+    options = [tag_search.names[i] for i in page]
+    picked = st.session_state.get(picked_key)
+    if picked is not None and picked not in st.session_state.tag_index:
+        # Renamed or removed since it was picked
+        picked = st.session_state[picked_key] = None
+
+    if not options:
+        st.caption("No tags match.")
+    else:
+        choice = st.selectbox(
+            f"Matching tags ({len(hits):,})",
+            options,
+            index=options.index(picked) if picked in options else None,
+            placeholder="Choose a tag...",
+        )
+        if choice is not None:
+            picked = st.session_state[picked_key] = choice
+
+    if picked is not None:
+        col_tag, col_clear = st.columns([4, 1], vertical_alignment="center")
+        col_tag.markdown(f"Selected: `{picked}`")
+        if col_clear.button("Clear", key=f"{key}_clear"):
+            picked = st.session_state[picked_key] = None
+            st.rerun()
+    return picked
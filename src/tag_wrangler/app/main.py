@@ -2,9 +2,18 @@
 
 from __future__ import annotations
 
+import os
+
 import streamlit as st
 
-from tag_wrangler.app.state import init_state, load_vault
+from tag_wrangler.app.components.perf_panel import perf_panel
+from tag_wrangler.app.state import (
+    init_state,
+    load_vault,
+    note_count,
+    start_watcher,
+    stop_watcher,
+)
 
 
 def main() -> None:
@@ -17,6 +26,7 @@ def main() -> None:
     init_state()
     _sidebar()
     _home()
+    perf_panel()
 
 
 def _sidebar() -> None:
@@ -30,19 +40,70 @@ def _sidebar() -> None:
             value=str(st.session_state.vault_path or ""),
             placeholder="/path/to/your/obsidian/vault",
         )
+        st.session_state.scan_workers = st.number_input(
+            "Scan workers",
+            min_value=1,
+            max_value=max(os.cpu_count() or 1, st.session_state.scan_workers),
+            value=st.session_state.scan_workers,
+            step=1,
+            help="Parse notes in this many processes (1 = single-threaded).",
+        )
+        st.session_state.lazy_body = st.checkbox(
+            "Frontmatter only",
+            value=st.session_state.lazy_body,
+            help="Keep only frontmatter in memory; note bodies are read on demand.",
+        )
+        st.session_state.use_store = st.checkbox(
+            "SQLite index",
+            value=st.session_state.use_store,
+            help="Keep the vault index in a local SQLite database that is synced "
+            "incrementally with disk and used for note queries.",
+        )
+        full_rescan = st.checkbox(
+            "Full rescan",
+            help="Ignore the scan cache and re-parse every note.",
+        )
         if st.button("Load vault", use_container_width=True):
             if vault_dir:
                 with st.spinner("Scanning vault..."):
-                    if load_vault(vault_dir):
+                    if load_vault(vault_dir, full_rescan=full_rescan):
                         st.success(
-                            f"Loaded {len(st.session_state.notes)} notes "
+                            f"Loaded {note_count()} notes "
                             f"with {len(st.session_state.tag_index)} unique tags"
                         )
 
-        if st.session_state.notes:
+        if st.session_state.vault_path:
             st.divider()
-            st.metric("Notes", len(st.session_state.notes))
+            st.metric("Notes", note_count())
             st.metric("Unique tags", len(st.session_state.tag_index))
+            st.session_state.watch_vault = st.checkbox(
+                "Watch for changes",
+                value=st.session_state.watch_vault,
+                help="Pick up notes edited, added, moved or deleted outside the app "
+                "without reloading the vault.",
+            )
+            if st.session_state.watch_vault:
+                start_watcher()
+                st.caption(f"Watching ({st.session_state.watcher.backend} backend)")
+            else:
+                stop_watcher()
+            store = st.session_state.store
+            cache = st.session_state.scan_cache
+            shared = st.session_state.shared
+            if shared is not None and shared.refs > 1:
+                st.caption(f"Shared with {shared.refs - 1} other session(s)")
+            if store is not None:
+                st.caption(
+                    f"SQLite index: {store.stats.hits} unchanged, "
+                    f"{store.stats.misses} re-parsed"
+                )
+            elif shared is not None and shared.snapshot is not None:
+                st.caption("Opened from snapshot; notes load when a page needs them")
+            elif cache is not None:
+                st.caption(
+                    f"Scan cache: {cache.stats.hits} hit(s), "
+                    f"{cache.stats.misses} miss(es)"
+                )
 
 
 def _home() -> None:
@@ -63,7 +124,7 @@ Manage, organise, and standardise the tags in your Obsidian vault.
 """
     )
 
-    if not st.session_state.notes:
+    if not st.session_state.vault_path:
         st.info(
             "Enter the path to your Obsidian vault in the sidebar and "
             "click **Load vault** to begin."
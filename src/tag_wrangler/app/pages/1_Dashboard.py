@@ -8,21 +8,27 @@ import streamlit as st
 
 from tag_wrangler.analyzer import (
     orphan_tags,
-    tag_co_occurrence,
     tag_frequency,
+    tags_per_note,
     vault_stats,
 )
-from tag_wrangler.app.state import init_state, require_vault
+from tag_wrangler.app.components.perf_panel import perf_panel
+from tag_wrangler.app.state import (
+    cached,
+    get_tag_matrix,
+    get_vault_tables,
+    init_state,
+    require_vault,
+)
 
 init_state()
 st.title("Dashboard")
 
-if not require_vault():
+if not require_vault(notes=False):
     st.stop()
 
-notes = st.session_state.notes
-tag_index = st.session_state.tag_index
-stats = vault_stats(notes, tag_index)
+tables = get_vault_tables()
+stats = cached("vault_stats", lambda: vault_stats(tables))
 
 # ---- Key metrics row ----
 cols = st.columns(5)
@@ -39,30 +45,36 @@ left, right = st.columns(2)
 
 with left:
     st.subheader("Tag frequency (top 30)")
-    freq = tag_frequency(notes)
-    top = freq.most_common(30)
-    if top:
-        df = pd.DataFrame(top, columns=["Tag", "Count"])
+    df = cached(
+        "top_tags_df",
+        lambda: (
+            tag_frequency(tables).head(30).rename_axis("Tag").reset_index(name="Count")
+        ),
+    )
+    if not df.empty:
         fig = px.bar(
             df,
             x="Count",
             y="Tag",
             orientation="h",
-            height=max(400, len(top) * 22),
+            height=max(400, len(df) * 22),
         )
         fig.update_layout(yaxis=dict(autorange="reversed"), margin=dict(l=0))
         st.plotly_chart(fig, use_container_width=True)
 
 with right:
     st.subheader("Tag distribution")
-    tag_counts = [len(n.tags) for n in notes]
-    if tag_counts:
-        df_dist = pd.DataFrame({"tags_per_note": tag_counts})
-        fig2 = px.histogram(
+    # Binned on the server: one bar per tag count, not one value per note
+    df_dist = cached(
+        "tag_dist_df",
+        lambda: tags_per_note(tables).rename_axis("tags_per_note").reset_index(),
+    )
+    if not df_dist.empty:
+        fig2 = px.bar(
             df_dist,
             x="tags_per_note",
-            nbins=max(max(tag_counts), 1),
-            labels={"tags_per_note": "Tags per note"},
+            y="notes",
+            labels={"tags_per_note": "Tags per note", "notes": "Notes"},
         )
         fig2.update_layout(margin=dict(l=0))
         st.plotly_chart(fig2, use_container_width=True)
@@ -71,24 +83,30 @@ st.divider()
 
 # ---- Orphan / rare tags ----
 st.subheader("Rare tags (used once)")
-orphans = orphan_tags(tag_index, threshold=1)
-if orphans:
-    st.write(f"Found **{len(orphans)}** tags that appear in only 1 note:")
-    orphan_df = pd.DataFrame(
-        [{"Tag": o.name, "Note": str(o.notes[0])} for o in orphans]
-    )
+orphan_df = cached(
+    "orphan_df",
+    lambda: orphan_tags(tables, threshold=1)[["tag", "note"]].rename(
+        columns={"tag": "Tag", "note": "Note"}
+    ),
+)
+if not orphan_df.empty:
+    st.write(f"Found **{len(orphan_df)}** tags that appear in only 1 note:")
     st.dataframe(orphan_df, use_container_width=True, hide_index=True)
 else:
     st.success("No orphan tags found.")
 
 # ---- Co-occurrence ----
 st.subheader("Tag co-occurrence (top 20)")
-co = tag_co_occurrence(notes, min_count=2)
-if co:
-    sorted_co = sorted(co.items(), key=lambda x: x[1], reverse=True)[:20]
-    co_df = pd.DataFrame(
-        [{"Tag A": a, "Tag B": b, "Count": c} for (a, b), c in sorted_co]
-    )
+co_df = cached(
+    "top_pairs_df",
+    lambda: pd.DataFrame(
+        get_tag_matrix().top_pairs(20, min_count=2),
+        columns=["Tag A", "Tag B", "Count"],
+    ),
+)
+if not co_df.empty:
     st.dataframe(co_df, use_container_width=True, hide_index=True)
 else:
     st.info("Not enough data for co-occurrence analysis.")
+
+perf_panel()
@@ -5,13 +5,23 @@ from __future__ import annotations
 import pandas as pd
 import streamlit as st
 
-from tag_wrangler.analyzer import tag_hierarchy
-from tag_wrangler.app.state import init_state, require_vault
+from tag_wrangler.app.components.paginate import paginate
+from tag_wrangler.app.components.perf_panel import perf_panel
+from tag_wrangler.app.components.tag_picker import tag_picker
+from tag_wrangler.app.state import (
+    cached,
+    get_tag_matrix,
+    get_tag_search,
+    get_tag_trie,
+    get_vault_tables,
+    init_state,
+    require_vault,
+)
 
 init_state()
 st.title("Tag Explorer")
 
-if not require_vault():
+if not require_vault(notes=False):
     st.stop()
 
 tag_index = st.session_state.tag_index
@@ -19,13 +29,30 @@ tag_index = st.session_state.tag_index
 # ---- Search / filter ----
 search = st.text_input("Search tags", placeholder="Type to filter...")
 
-filtered = {
-    k: v
-    for k, v in tag_index.items()
-    if not search or search.lower() in k.lower()
-}
+tag_search = get_tag_search()
+
+
+def _tag_table() -> pd.DataFrame:
+    tables = get_vault_tables()
+    names = pd.Series(tables.tag_names, dtype=object)
+    nested = names.str.contains("/", regex=False)
+    return pd.DataFrame(
+        {
+            "Tag": names,
+            "Count": tables.tag_counts(),
+            "Nested": nested,
+            "Root": names.str.partition("/")[0].where(nested, ""),
+        }
+    )
+
 
-st.write(f"Showing **{len(filtered)}** of {len(tag_index)} tags")
+# Rows are in tag_search.names order, so search hits index straight into it
+tag_table = cached("tag_table", _tag_table)
+df = tag_table
+if search:
+    df = df.iloc[cached(("tag_search", search), lambda: tag_search.search(search))]
+
+st.write(f"Showing **{len(df)}** of {len(tag_index)} tags")
 
 # ---- Tag table ----
 sort_col = st.radio(
@@ -33,18 +60,7 @@ sort_col = st.radio(
     horizontal=True,
 )
 
-rows = [
-    {
-        "Tag": info.name,
-        "Count": info.count,
-        "Nested": info.is_nested,
-        "Root": info.root if info.is_nested else "",
-    }
-    for info in filtered.values()
-]
-
-if rows:
-    df = pd.DataFrame(rows)
+if not df.empty:
     if sort_col == "Count (desc)":
         df = df.sort_values("Count", ascending=False)
     elif sort_col == "Count (asc)":
@@ -54,36 +70,69 @@ if rows:
     else:
         df = df.sort_values("Tag", ascending=False)
 
-    st.dataframe(df, use_container_width=True, hide_index=True, height=500)
+    page = paginate(df, "tags", page_size=100, reset_on=(search, sort_col))
+    st.dataframe(page, use_container_width=True, hide_index=True)
 
 # ---- Tag detail ----
 st.divider()
 st.subheader("Tag detail")
-selected_tag = st.selectbox(
-    "Select a tag to inspect",
-    options=sorted(tag_index.keys()),
-    index=None,
-    placeholder="Choose a tag...",
-)
+selected_tag = tag_picker("Find a tag to inspect", "tag_detail")
 
 if selected_tag and selected_tag in tag_index:
     info = tag_index[selected_tag]
     st.write(f"**{info.name}** appears in **{info.count}** note(s):")
-    for p in info.notes:
-        st.write(f"- `{p}`")
+    node = get_tag_trie().find(selected_tag)
+    if node is not None and node.children:
+        st.caption(
+            f"{node.note_count} distinct note(s) including {node.tag_count - 1} "
+            f"nested tag(s) under `{selected_tag}/`."
+        )
+    paths = paginate(info.notes, "tag_notes", reset_on=selected_tag, noun="notes")
+    st.markdown("\n".join(f"- `{p}`" for p in paths))
+
+    metric = st.radio("Related by", ["Jaccard", "PMI"], horizontal=True)
+    related = cached(
+        ("related", selected_tag, metric),
+        lambda: get_tag_matrix().related(selected_tag, k=15, metric=metric.lower()),
+    )
+    if related:
+        st.markdown("**Related tags**")
+        st.dataframe(
+            pd.DataFrame(related, columns=["Tag", metric, "Shared notes"]),
+            use_container_width=True,
+            hide_index=True,
+        )
 
 # ---- Hierarchy view ----
 st.divider()
 st.subheader("Tag hierarchy")
-tree = tag_hierarchy(tag_index)
-if tree:
-    for root, children in sorted(tree.items()):
-        with st.expander(f"{root}/ ({len(children)} children)"):
-            for child in sorted(children):
-                count = tag_index.get(f"{root}/{child}", None)
-                label = f"`{root}/{child}`"
-                if count:
-                    label += f" ({count.count})"
-                st.write(label)
+st.caption(
+    "Counts in brackets are distinct notes under each level: a note tagged "
+    "`a/b` and `a/c` counts once for `a`."
+)
+roots = get_tag_trie().nested_roots()
+if roots:
+    for root in paginate(roots, "roots", page_size=20, noun="roots"):
+        with st.expander(
+            f"{root.name}/ ({root.tag_count} tags, {root.note_count} notes)"
+        ):
+            nodes = cached(
+                ("tag_trie_walk", root.path),
+                lambda root=root: list(root.walk())[1:],
+            )
+            page = paginate(nodes, f"root_{root.path}", page_size=200)
+            # Indent relative to the page, which may start deep in the tree
+            base = min(node.depth for node in page)
+            lines = []
+            for node in page:
+                label = f"`{node.path}`"
+                if node.children:
+                    label += f" ({node.note_count})"
+                elif node.info is not None:
+                    label += f" ({node.own_count})"
+                lines.append("  " * (node.depth - base) + f"- {label}")
+            st.markdown("\n".join(lines))
 else:
     st.info("No nested tags found (e.g. `project/work`).")
+
+perf_panel()
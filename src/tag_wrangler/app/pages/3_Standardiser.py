@@ -6,8 +6,18 @@ import pandas as pd
 import streamlit as st
 
 from tag_wrangler.analyzer import find_similar_tags
-from tag_wrangler.app.state import init_state, reload_vault, require_vault
-from tag_wrangler.operations import merge_tags, rename_tag
+from tag_wrangler.app.components.history import operation_history
+from tag_wrangler.app.components.perf_panel import perf_panel
+from tag_wrangler.app.state import (
+    apply_result,
+    cached,
+    get_journal,
+    init_state,
+    require_vault,
+    show_write_report,
+    vault_write,
+)
+from tag_wrangler.operations import MergeRule, RenameRule, apply_rules, parse_rules
 
 init_state()
 st.title("Tag Standardiser")
@@ -15,6 +25,8 @@ st.title("Tag Standardiser")
 if not require_vault():
     st.stop()
 
+show_write_report()
+
 notes = st.session_state.notes
 tag_index = st.session_state.tag_index
 vault_root = st.session_state.vault_path
@@ -24,7 +36,10 @@ st.subheader("Similar tags (possible duplicates)")
 
 threshold = st.slider("Similarity threshold", 50, 100, 80, step=5)
 
-pairs = find_similar_tags(tag_index, threshold=threshold)
+pairs = cached(
+    ("similar_tags", threshold),
+    lambda: find_similar_tags(tag_index, threshold=threshold),
+)
 
 if pairs:
     st.write(f"Found **{len(pairs)}** similar pair(s):")
@@ -50,9 +65,12 @@ with col2:
     new_name = st.text_input("New name", key="rename_new")
 
 if st.button("Rename", disabled=not (old_name and new_name)):
-    count = rename_tag(notes, vault_root, old_name, new_name)
-    reload_vault()
-    st.success(f"Renamed `{old_name}` -> `{new_name}` in {count} note(s).")
+    with vault_write():
+        result = apply_rules(
+            notes, vault_root, [RenameRule(old_name, new_name)], journal=get_journal()
+        )
+        apply_result(result)
+    st.success(f"Renamed `{old_name}` -> `{new_name}` in {result.modified} note(s).")
     st.rerun()
 
 # ---- Merge tags ----
@@ -68,11 +86,13 @@ source_tags = st.multiselect(
 target_tag = st.text_input("Target tag (keep this one)", key="merge_target")
 
 if st.button("Merge", disabled=not (source_tags and target_tag)):
-    count = merge_tags(notes, vault_root, source_tags, target_tag)
-    reload_vault()
+    rule = MergeRule(tuple(source_tags), target_tag)
+    with vault_write():
+        result = apply_rules(notes, vault_root, [rule], journal=get_journal())
+        apply_result(result)
     st.success(
         f"Merged {len(source_tags)} tag(s) into `{target_tag}` "
-        f"across {count} note(s)."
+        f"across {result.modified} note(s)."
     )
     st.rerun()
 
@@ -80,8 +100,9 @@ if st.button("Merge", disabled=not (source_tags and target_tag)):
 st.divider()
 st.subheader("Batch rename rules")
 st.caption(
-    "Define multiple rename rules (one per line, format: `old_tag -> new_tag`), "
-    "then apply them all at once."
+    "Define multiple rules (one per line): `old_tag -> new_tag` renames, "
+    "`a, b -> target` merges and `old_tag ->` deletes. All rules are applied "
+    "in one pass, writing each note at most once."
 )
 
 rules_text = st.text_area(
@@ -92,21 +113,28 @@ rules_text = st.text_area(
 
 if st.button("Apply rules"):
     if rules_text.strip():
-        total = 0
-        errors = []
-        for line in rules_text.strip().splitlines():
-            line = line.strip()
-            if not line or "->" not in line:
-                continue
-            parts = line.split("->")
-            if len(parts) != 2:
-                errors.append(f"Invalid rule: {line}")
-                continue
-            old, new = parts[0].strip(), parts[1].strip()
-            count = rename_tag(notes, vault_root, old, new)
-            total += count
-        reload_vault()
-        if errors:
-            st.warning("\n".join(errors))
-        st.success(f"Applied rules, modified {total} note(s) total.")
+        rules, errors = parse_rules(rules_text)
+        with vault_write():
+            result = apply_rules(notes, vault_root, rules, journal=get_journal())
+            apply_result(result)
+        st.session_state.rules_report = (
+            errors,
+            result.modified,
+            [(str(r), n) for r, n in zip(rules, result.per_rule)],
+        )
         st.rerun()
+
+if "rules_report" in st.session_state:
+    errors, modified, per_rule = st.session_state.pop("rules_report")
+    if errors:
+        st.warning("\n".join(errors))
+    st.success(f"Applied rules, modified {modified} note(s) total.")
+    if per_rule:
+        st.dataframe(
+            pd.DataFrame(per_rule, columns=["Rule", "Notes matched"]),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+operation_history()
+perf_panel()
@@ -5,8 +5,23 @@ from __future__ import annotations
 import pandas as pd
 import streamlit as st
 
-from tag_wrangler.app.state import init_state, reload_vault, require_vault
-from tag_wrangler.operations import add_tag_to_notes, delete_tag, rename_tag
+from tag_wrangler.app.components.history import operation_history
+from tag_wrangler.app.components.perf_panel import perf_panel
+from tag_wrangler.app.state import (
+    apply_result,
+    get_journal,
+    init_state,
+    note_folders,
+    notes_in_folder,
+    notes_matching,
+    notes_with_tag,
+    require_vault,
+    show_write_report,
+    untagged_notes,
+    vault_write,
+)
+from tag_wrangler.operations import AddRule, DeleteRule, RenameRule, apply_rules
+from tag_wrangler.query import QueryError
 
 init_state()
 st.title("Bulk Operations")
@@ -14,6 +29,8 @@ st.title("Bulk Operations")
 if not require_vault():
     st.stop()
 
+show_write_report()
+
 notes = st.session_state.notes
 tag_index = st.session_state.tag_index
 vault_root = st.session_state.vault_path
@@ -24,7 +41,13 @@ st.caption("Filter notes to target for bulk operations.")
 
 filter_mode = st.radio(
     "Filter by",
-    ["All notes", "Notes with specific tag", "Notes in folder", "Untagged notes"],
+    [
+        "All notes",
+        "Notes with specific tag",
+        "Tag query",
+        "Notes in folder",
+        "Untagged notes",
+    ],
     horizontal=True,
 )
 
@@ -35,23 +58,31 @@ if filter_mode == "Notes with specific tag":
         "Tag", sorted(tag_index.keys()), index=None, placeholder="Choose tag..."
     )
     if filter_tag:
-        target_notes = [n for n in notes if filter_tag in n.tags]
-elif filter_mode == "Notes in folder":
-    folders = sorted(
-        set(str(n.path.parent) for n in notes if str(n.path.parent) != ".")
+        target_notes = notes_with_tag(filter_tag)
+elif filter_mode == "Tag query":
+    query = st.text_input(
+        "Query",
+        placeholder="project/* AND NOT archive OR todo",
+        help="Combine tags with AND, OR, NOT and parentheses. "
+        "`*` matches any characters, so `project/*` is every tag under project.",
     )
+    if query.strip():
+        try:
+            target_notes = notes_matching(query)
+        except QueryError as e:
+            st.error(f"Invalid query: {e}")
+            target_notes = []
+elif filter_mode == "Notes in folder":
     folder = st.selectbox(
-        "Folder", ["(root)"] + folders, index=None, placeholder="Choose folder..."
+        "Folder",
+        ["(root)"] + note_folders(),
+        index=None,
+        placeholder="Choose folder...",
     )
     if folder:
-        if folder == "(root)":
-            target_notes = [n for n in notes if str(n.path.parent) == "."]
-        else:
-            target_notes = [
-                n for n in notes if str(n.path.parent).startswith(folder)
-            ]
+        target_notes = notes_in_folder("." if folder == "(root)" else folder)
 elif filter_mode == "Untagged notes":
-    target_notes = [n for n in notes if not n.tags]
+    target_notes = untagged_notes()
 
 st.write(f"**{len(target_notes)}** note(s) selected")
 
@@ -82,9 +113,13 @@ operation = st.selectbox(
 if operation == "Add tag":
     tag_to_add = st.text_input("Tag to add")
     if st.button("Add to selected notes", disabled=not tag_to_add):
-        count = add_tag_to_notes(notes, vault_root, tag_to_add, target_notes)
-        reload_vault()
-        st.success(f"Added `{tag_to_add}` to {count} note(s).")
+        rule = AddRule(tag_to_add, frozenset(n.path for n in target_notes))
+        with vault_write():
+            result = apply_rules(
+                target_notes, vault_root, [rule], journal=get_journal()
+            )
+            apply_result(result)
+        st.success(f"Added `{tag_to_add}` to {result.modified} note(s).")
         st.rerun()
 
 elif operation == "Remove tag":
@@ -96,9 +131,12 @@ elif operation == "Remove tag":
         key="bulk_remove",
     )
     if st.button("Remove from all notes", disabled=not tag_to_remove):
-        count = delete_tag(notes, vault_root, tag_to_remove)
-        reload_vault()
-        st.success(f"Removed `{tag_to_remove}` from {count} note(s).")
+        with vault_write():
+            result = apply_rules(
+                notes, vault_root, [DeleteRule(tag_to_remove)], journal=get_journal()
+            )
+            apply_result(result)
+        st.success(f"Removed `{tag_to_remove}` from {result.modified} note(s).")
         st.rerun()
 
 elif operation == "Find & replace tag":
@@ -114,9 +152,18 @@ elif operation == "Find & replace tag":
     with col2:
         replace_tag = st.text_input("Replace with", key="bulk_replace")
     if st.button("Replace", disabled=not (find_tag and replace_tag)):
-        count = rename_tag(notes, vault_root, find_tag, replace_tag)
-        reload_vault()
+        with vault_write():
+            result = apply_rules(
+                notes,
+                vault_root,
+                [RenameRule(find_tag, replace_tag)],
+                journal=get_journal(),
+            )
+            apply_result(result)
         st.success(
-            f"Replaced `{find_tag}` with `{replace_tag}` in {count} note(s)."
+            f"Replaced `{find_tag}` with `{replace_tag}` in {result.modified} note(s)."
         )
         st.rerun()
+
+operation_history()
+perf_panel()
@@ -6,8 +6,19 @@ import pandas as pd
 import streamlit as st
 import yaml
 
-from tag_wrangler.app.state import init_state, reload_vault, require_vault
-from tag_wrangler.parser import write_frontmatter
+from tag_wrangler.app.components.paginate import paginate
+from tag_wrangler.app.components.perf_panel import perf_panel
+from tag_wrangler.app.components.tag_picker import tag_picker
+from tag_wrangler.app.state import (
+    init_state,
+    notes_matching,
+    notes_with_tag,
+    refresh_note,
+    require_vault,
+    vault_write,
+)
+from tag_wrangler.parser import load_body, write_frontmatter
+from tag_wrangler.query import QueryError
 
 init_state()
 st.title("Note Browser")
@@ -16,43 +27,64 @@ if not require_vault():
     st.stop()
 
 notes = st.session_state.notes
-tag_index = st.session_state.tag_index
 vault_root = st.session_state.vault_path
 
 # ---- Filter / search ----
-col_search, col_filter = st.columns([2, 1])
-with col_search:
-    search = st.text_input("Search notes", placeholder="Filter by title or path...")
-with col_filter:
-    filter_tag = st.selectbox(
-        "Filter by tag",
-        ["(all)"] + sorted(tag_index.keys()),
-        key="note_filter_tag",
-    )
-
-filtered = notes
+search = st.text_input("Search notes", placeholder="Filter by title or path...")
+filter_tag = tag_picker("Filter by tag", "note_filter_tag")
+
+tag_query = st.text_input(
+    "Tag query",
+    placeholder="project/* AND NOT archive OR todo",
+    help="Combine tags with AND, OR, NOT and parentheses; `*` is a wildcard.",
+)
+
+filtered = notes if filter_tag is None else notes_with_tag(filter_tag)
+if tag_query.strip():
+    if filter_tag is not None:
+        tag_query = f"({tag_query}) AND {filter_tag}"
+    try:
+        filtered = notes_matching(tag_query)
+    except QueryError as e:
+        st.error(f"Invalid query: {e}")
+        filtered = []
 if search:
     q = search.lower()
     filtered = [
         n for n in filtered if q in n.title.lower() or q in str(n.path).lower()
     ]
-if filter_tag != "(all)":
-    filtered = [n for n in filtered if filter_tag in n.tags]
 
 st.write(f"**{len(filtered)}** note(s)")
 
 # ---- Note list ----
 if filtered:
-    note_options = {f"{n.title}  ({n.path})": i for i, n in enumerate(filtered)}
+    # Only the current page is turned into table rows and select options
+    page = paginate(
+        filtered, "notes", reset_on=(search, filter_tag, tag_query), noun="notes"
+    )
+    page_df = pd.DataFrame(
+        [
+            {
+                "Title": n.title,
+                "Path": str(n.path),
+                "Tags": ", ".join(n.tags),
+                "# Tags": len(n.tags),
+            }
+            for n in page
+        ]
+    )
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+
+    note_options = {f"{n.title}  ({n.path})": n for n in page}
     selected_label = st.selectbox(
-        "Select a note",
+        "Select a note on this page",
         options=list(note_options.keys()),
         index=None,
         placeholder="Choose a note...",
     )
 
     if selected_label is not None:
-        note = filtered[note_options[selected_label]]
+        note = note_options[selected_label]
 
         st.divider()
 
@@ -74,8 +106,9 @@ if filtered:
 
         with detail_right:
             st.markdown("**Body preview**")
-            body_preview = note.body[:2000]
-            if len(note.body) > 2000:
+            body = load_body(note, vault_root)
+            body_preview = body[:2000]
+            if len(body) > 2000:
                 body_preview += "\n\n... (truncated)"
             st.text_area(
                 "Content",
@@ -107,25 +140,12 @@ if filtered:
                 if not isinstance(new_fm, dict):
                     st.error("Frontmatter must be a YAML mapping (key: value pairs).")
                 else:
-                    write_frontmatter(note, vault_root, new_fm)
-                    reload_vault()
+                    with vault_write():
+                        write_frontmatter(note, vault_root, new_fm)
+                        refresh_note(note)
                     st.success("Frontmatter saved.")
                     st.rerun()
             except yaml.YAMLError as e:
                 st.error(f"Invalid YAML: {e}")
 
-    # ---- Bulk view table ----
-    st.divider()
-    st.subheader("All notes")
-    all_df = pd.DataFrame(
-        [
-            {
-                "Title": n.title,
-                "Path": str(n.path),
-                "Tags": ", ".join(n.tags),
-                "# Tags": len(n.tags),
-            }
-            for n in filtered
-        ]
-    )
-    st.dataframe(all_df, use_container_width=True, hide_index=True, height=400)
+perf_panel()
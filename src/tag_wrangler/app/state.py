@@ -2,36 +2,114 @@
 
 from __future__ import annotations
 
+import contextlib
+import secrets
+from collections.abc import Callable, Hashable
 from pathlib import Path
+from typing import TypeVar
 
 import streamlit as st
 
-from tag_wrangler.vault import build_tag_index, scan_vault
+from tag_wrangler.app.components.perf_panel import start_profile
+from tag_wrangler.cache import ScanCache
+from tag_wrangler.cooccurrence import TagMatrix
+from tag_wrangler.journal import Journal
+from tag_wrangler.memo import ResultCache
+from tag_wrangler.models import Note
+from tag_wrangler.operations import BatchResult
+from tag_wrangler.query import TagBitmaps
+from tag_wrangler.registry import REGISTRY, RESULT_CACHE_SIZE, SharedVault
+from tag_wrangler.snapshot import (
+    Snapshot,
+    load_snapshot,
+    snapshot_path,
+    write_snapshot,
+)
+from tag_wrangler.store import VaultStore
+from tag_wrangler.tables import VaultTables
+from tag_wrangler.trie import TagSearch, TagTrie
+from tag_wrangler.vault import (
+    build_tag_index,
+    refresh_notes,
+    scan_vault,
+    update_tag_index,
+)
+from tag_wrangler.watcher import VaultWatcher, apply_events
+
+# Seconds between checks for pending watcher events while a page is open
+WATCH_INTERVAL = 2.0
+
+T = TypeVar("T")
 
 
 def init_state() -> None:
-    """Initialise session state defaults."""
+    """Initialise session state defaults and catch up with the shared vault."""
+    start_profile()
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = secrets.token_hex(8)
+    if "shared" not in st.session_state:
+        st.session_state.shared = None
     if "vault_path" not in st.session_state:
         st.session_state.vault_path = None
     if "notes" not in st.session_state:
         st.session_state.notes = []
     if "tag_index" not in st.session_state:
         st.session_state.tag_index = {}
+    if "scan_cache" not in st.session_state:
+        st.session_state.scan_cache = None
+    if "scan_workers" not in st.session_state:
+        st.session_state.scan_workers = 1
+    if "lazy_body" not in st.session_state:
+        st.session_state.lazy_body = False
+    if "results" not in st.session_state:
+        st.session_state.results = ResultCache(maxsize=RESULT_CACHE_SIZE)
+    if "use_store" not in st.session_state:
+        st.session_state.use_store = False
+    if "store" not in st.session_state:
+        st.session_state.store = None
+    if "journal" not in st.session_state:
+        st.session_state.journal = None
+    if "watch_vault" not in st.session_state:
+        st.session_state.watch_vault = False
+    if "watcher" not in st.session_state:
+        st.session_state.watcher = None
+    _sync_shared()
+    if st.session_state.watcher is not None:
+        sync_watcher()
+        _watch_fragment()
+
 
+def load_vault(path: str, full_rescan: bool = False) -> bool:
+    """Load (or reload) a vault from *path*. Returns True on success.
 
-def load_vault(path: str) -> bool:
-    """Load (or reload) a vault from *path*. Returns True on success."""
+    Unchanged files are served from the persistent scan cache; pass
+    ``full_rescan`` to re-parse everything. A vault another session already
+    has loaded is shared with it rather than scanned again (see
+    :mod:`tag_wrangler.registry`); loading the session's own vault again
+    rescans it for everyone. A vault whose snapshot still matches the disk
+    is opened from it, with notes built only once a page needs them.
+    """
     vault = Path(path).expanduser().resolve()
     if not vault.is_dir():
         st.error(f"Directory not found: {vault}")
         return False
-    notes = scan_vault(vault)
-    if not notes:
+    if st.session_state.use_store:
+        _release_shared()
+        notes = _load_from_store(vault, full_rescan)
+        if notes:
+            st.session_state.notes = notes
+            st.session_state.tag_index = build_tag_index(notes)
+            bump_generation()
+        loaded = bool(notes)
+    else:
+        _close_store()
+        loaded = _load_shared(vault, full_rescan)
+    if not loaded:
         st.warning("No markdown files found in this directory.")
         return False
     st.session_state.vault_path = vault
-    st.session_state.notes = notes
-    st.session_state.tag_index = build_tag_index(notes)
+    if st.session_state.watch_vault:
+        start_watcher()
     return True
 
 
@@ -41,9 +119,449 @@ def reload_vault() -> None:
         load_vault(str(st.session_state.vault_path))
 
 
-def require_vault() -> bool:
-    """Show warning if no vault is loaded. Returns True when vault is ready."""
-    if not st.session_state.notes:
+def apply_changes(changes: list[tuple[Note, tuple[str, ...]]]) -> None:
+    """Fold ``(note, tags_before)`` deltas from an operation into the state.
+
+    Updates the tag index for just those notes and re-stamps them in the
+    scan cache, instead of rescanning the whole vault.
+    """
+    if not changes:
+        return
+    with vault_write():
+        update_tag_index(st.session_state.tag_index, changes)
+        bump_generation()
+        if st.session_state.store is not None:
+            st.session_state.store.update(note for note, _ in changes)
+            return
+        cache = st.session_state.scan_cache
+        if cache is not None:
+            vault = st.session_state.vault_path
+            for note, _ in changes:
+                cache.refresh(note.path.as_posix(), vault / note.path, note)
+
+
+def apply_result(result: BatchResult) -> None:
+    """:func:`apply_changes` for a batch, keeping its write report.
+
+    The report is shown by :func:`show_write_report` on the next run, since
+    pages rerun straight after a write.
+    """
+    apply_changes(result.changes)
+    st.session_state.write_report = result.report
+
+
+def show_write_report() -> None:
+    """Show throughput and any failed files from the last batch write."""
+    report = st.session_state.pop("write_report", None)
+    if report is None or not (report.written or report.errors):
+        return
+    if report.errors:
+        st.error(
+            f"{len(report.errors)} note(s) could not be written and were left "
+            "unchanged:\n\n" + "\n".join(f"- `{e}`" for e in report.errors[:50])
+        )
+    st.caption(f"Last write: {report}")
+
+
+def recover_operation(entry_id: str, action: str) -> None:
+    """Resume (``"resume"``) or roll back (``"rollback"``) a journaled batch.
+
+    Only the files the journal rewrote are re-read into the session.
+    """
+    journal = get_journal()
+    recover = journal.resume if action == "resume" else journal.rollback
+    ensure_notes()
+    with vault_write():
+        paths, report = recover(entry_id)
+        written = set(paths)
+        notes = [n for n in st.session_state.notes if n.path in written]
+        apply_changes(
+            refresh_notes(
+                notes, st.session_state.vault_path, lazy_body=st.session_state.lazy_body
+            )
+        )
+    st.session_state.write_report = report
+
+
+def refresh_note(note: Note) -> None:
+    """Re-read one note from disk (e.g. after a frontmatter edit)."""
+    with vault_write():
+        changes = refresh_notes(
+            [note], st.session_state.vault_path, lazy_body=st.session_state.lazy_body
+        )
+        apply_changes(changes)
+
+
+def start_watcher() -> None:
+    """Watch the loaded vault for outside edits (restarts on vault change)."""
+    vault = st.session_state.vault_path
+    watcher = st.session_state.watcher
+    if watcher is not None and watcher.vault_root == vault:
+        return
+    stop_watcher()
+    if vault is not None:
+        watcher = VaultWatcher(vault)
+        watcher.start()
+        st.session_state.watcher = watcher
+
+
+def stop_watcher() -> None:
+    watcher = st.session_state.watcher
+    if watcher is not None:
+        watcher.stop()
+        st.session_state.watcher = None
+
+
+def sync_watcher() -> bool:
+    """Fold settled watcher events into the state. Returns True if anything changed.
+
+    Only the touched notes are re-parsed. Edits to existing notes patch the
+    tag index; added, removed or renamed notes shift note IDs, so the index
+    is rebuilt from the in-memory notes (still without re-parsing).
+    """
+    watcher = st.session_state.watcher
+    events = watcher.poll() if watcher is not None else None
+    if not events:
+        return False
+    ensure_notes()
+    with vault_write():
+        vault = st.session_state.vault_path
+        notes = st.session_state.notes
+        changes, structural = apply_events(
+            notes, vault, events, lazy_body=st.session_state.lazy_body
+        )
+        if not structural:
+            apply_changes(changes)
+            return bool(changes)
+        _reindex()
+        bump_generation()
+        store = st.session_state.store
+        if store is not None:
+            store.sync()
+        cache = st.session_state.scan_cache
+        if cache is not None and store is None:
+            for rel in events.deleted | set(events.moved):
+                cache.entries.pop(rel.as_posix(), None)
+            for note in notes:
+                if note.path.as_posix() not in cache.entries:
+                    cache.refresh(note.path.as_posix(), vault / note.path, note)
+            for note, _ in changes:
+                cache.refresh(note.path.as_posix(), vault / note.path, note)
+    return True
+
+
+@st.fragment(run_every=WATCH_INTERVAL)
+def _watch_fragment() -> None:
+    """Poll the watcher in the background and rerun the page on changes."""
+    if sync_watcher():
+        st.rerun(scope="app")
+
+
+def notes_with_tag(tag: str) -> list[Note]:
+    """Notes carrying *tag*, answered by the SQLite index when it is enabled."""
+    if st.session_state.store is not None:
+        return _notes_at(st.session_state.store.notes_by_tag(tag))
+    ensure_notes()
+    with vault_read():
+        return [n for n in st.session_state.notes if tag in n.tags]
+
+
+def notes_matching(query: str) -> list[Note]:
+    """Notes matching a boolean tag query (raises ``QueryError``)."""
+    ensure_notes()
+    with vault_read():
+        bitmaps = cached("tag_bitmaps", lambda: TagBitmaps(st.session_state.tag_index))
+        notes = st.session_state.notes
+        return [notes[i] for i in bitmaps.select(query)]
+
+
+def untagged_notes() -> list[Note]:
+    if st.session_state.store is not None:
+        return _notes_at(st.session_state.store.untagged_notes())
+    ensure_notes()
+    with vault_read():
+        return [n for n in st.session_state.notes if not n.tags]
+
+
+def notes_in_folder(folder: str) -> list[Note]:
+    """Notes in *folder* and its subfolders (``"."`` is the vault root only)."""
+    store = st.session_state.store
+    if store is not None:
+        return _notes_at(store.notes_in_folder(folder, recursive=folder != "."))
+    prefix = Path(folder)
+    ensure_notes()
+    with vault_read():
+        if folder == ".":
+            return [n for n in st.session_state.notes if n.path.parent == prefix]
+        return [
+            n
+            for n in st.session_state.notes
+            if n.path.parent == prefix or prefix in n.path.parent.parents
+        ]
+
+
+def note_folders() -> list[str]:
+    """Every folder holding at least one note, excluding the vault root."""
+    if st.session_state.store is not None:
+        folders = st.session_state.store.folders()
+    else:
+        folders = get_vault_tables().folders()
+    return sorted(f for f in folders if f != ".")
+
+
+def _notes_at(paths: list[Path]) -> list[Note]:
+    """Map store query results back to the session's Note objects."""
+    index = st.session_state.tag_index
+    notes = st.session_state.notes
+    return [notes[index.note_id(p)] for p in paths]
+
+
+def _load_from_store(vault: Path, full_rescan: bool) -> list[Note]:
+    """Sync the vault's SQLite index with disk and read notes back from it."""
+    store = st.session_state.store
+    if store is None or store.vault_root != vault:
+        _close_store()
+        store = VaultStore.for_vault(vault)
+        st.session_state.store = store
+    if full_rescan:
+        store.clear()
+    store.sync()
+    return store.load_notes()
+
+
+def _close_store() -> None:
+    if st.session_state.store is not None:
+        st.session_state.store.close()
+        st.session_state.store = None
+
+
+def cached(key: Hashable, compute: Callable[[], T]) -> T:
+    """Compute a result once per vault generation and reuse it across reruns.
+
+    *key* names the result (a tuple for parameterised results, e.g.
+    ``("similar", threshold)``); *compute* is only called on a miss. Results
+    of a shared vault are shared by every session viewing it.
+    """
+    with vault_read():
+        return st.session_state.results.get(key, compute)
+
+
+def bump_generation() -> None:
+    """Mark the loaded vault as changed, dropping every cached result."""
+    st.session_state.results.bump()
+
+
+def get_tag_matrix() -> TagMatrix:
+    """Note x tag matrix for the loaded vault, built on first use."""
+    snapshot = _snapshot()
+    if snapshot is not None:
+        return cached("tag_matrix", lambda: TagMatrix.from_snapshot(snapshot))
+    return cached("tag_matrix", lambda: TagMatrix.from_notes(st.session_state.notes))
+
+
+def get_vault_tables() -> VaultTables:
+    """Columnar notes and note-tag tables for the current vault state."""
+    snapshot = _snapshot()
+    if snapshot is not None:
+        return cached("vault_tables", lambda: VaultTables.from_snapshot(snapshot))
+    notes = st.session_state.notes
+    return cached("vault_tables", lambda: VaultTables.from_notes(notes))
+
+
+def get_tag_trie() -> TagTrie:
+    """Tag trie with rolled-up counts for the current vault."""
+    return cached("tag_trie", lambda: TagTrie.from_index(st.session_state.tag_index))
+
+
+def get_tag_search() -> TagSearch:
+    """N-gram search index over the current tag names.
+
+    Names are in :func:`get_vault_tables` tag order, so search hits are
+    also row positions in the tag tables.
+    """
+    return cached("tag_search", lambda: TagSearch(get_vault_tables().tag_names))
+
+
+def get_journal() -> Journal:
+    """Operation journal of the loaded vault; pass it to ``apply_rules``."""
+    vault = st.session_state.vault_path
+    journal = st.session_state.journal
+    if journal is None or journal.vault_root != vault:
+        journal = Journal.for_vault(vault)
+        st.session_state.journal = journal
+    return journal
+
+
+def vault_read() -> contextlib.AbstractContextManager:
+    """Read lock on the shared vault (a no-op for a session-local vault)."""
+    shared = st.session_state.shared
+    return shared.lock.read() if shared is not None else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def vault_write():
+    """Write lock on the shared vault; wrap every write to notes in it.
+
+    Waits for other sessions' readers and writers, then points this session
+    at the vault's current state, so a write never works on a stale index.
+    """
+    shared = st.session_state.shared
+    if shared is None:
+        yield
+        return
+    with shared.lock.write():
+        _adopt(shared)
+        yield
+
+
+def ensure_notes() -> list[Note]:
+    """The loaded notes, built first if the vault was opened from a snapshot.
+
+    Notes come from the scan cache; should the vault have changed since
+    the snapshot was checked, the tag index is rebuilt from them.
+    """
+    shared = st.session_state.shared
+    if shared is None or shared.snapshot is None:
+        return st.session_state.notes
+    with vault_write():
+        if shared.snapshot is not None:
+            if shared.cache is None:
+                shared.cache = ScanCache.for_vault(shared.root)
+            notes = _scan(shared.root, shared.cache, full_rescan=False)
+            shared.notes[:] = notes
+            paths = [note.path for note in notes]
+            if shared.cache.stats.misses or paths != shared.tag_index.paths:
+                shared.reindex()
+                shared.results.bump()
+            shared.snapshot = None
+            _adopt(shared)
+    return st.session_state.notes
+
+
+def _load_shared(vault: Path, full_rescan: bool) -> bool:
+    """Hold the shared copy of *vault*, loading it only if nobody has it yet.
+
+    A vault nobody holds is opened from its snapshot when that is still
+    fresh, or else scanned. A full rescan, or reloading the vault this
+    session already holds, rescans the shared copy in place for everyone.
+    """
+    lazy_body = st.session_state.lazy_body
+    shared = st.session_state.shared
+    if shared is not None and shared.key != (vault, lazy_body):
+        _release_shared()
+        shared = None
+    reload = shared is not None
+    scanned = False
+
+    def load() -> SharedVault | None:
+        nonlocal scanned
+        snapshot = None if full_rescan else load_snapshot(vault)
+        if snapshot is not None:
+            # The scan cache is only opened once notes are needed
+            return SharedVault(
+                vault, lazy_body, [], snapshot.tag_index(), snapshot=snapshot
+            )
+        scanned = True
+        cache = ScanCache.for_vault(vault)
+        notes = _scan(vault, cache, full_rescan)
+        return SharedVault.from_notes(vault, lazy_body, notes, cache) if notes else None
+
+    if shared is None:
+        shared = REGISTRY.acquire(
+            st.session_state.session_id, vault, load, lazy_body=lazy_body
+        )
+        if shared is None:
+            return False
+        st.session_state.shared = shared
+    if reload or (full_rescan and not scanned):
+        with shared.lock.write():
+            if shared.cache is None:
+                shared.cache = ScanCache.for_vault(vault)
+            notes = _scan(vault, shared.cache, full_rescan)
+            if not notes:
+                return False
+            shared.notes[:] = notes
+            shared.snapshot = None
+            shared.reindex()
+            shared.results.bump()
+    _adopt(shared)
+    return True
+
+
+def _scan(vault: Path, cache: ScanCache, full_rescan: bool) -> list[Note]:
+    """Scan *vault* through *cache*, then save the cache and a fresh snapshot."""
+    notes = scan_vault(
+        vault,
+        cache=cache,
+        full_rescan=full_rescan,
+        workers=st.session_state.scan_workers,
+        lazy_body=st.session_state.lazy_body,
+    )
+    try:
+        cache.save()
+        write_snapshot(snapshot_path(vault), notes, cache.entries)
+    except OSError:
+        # A read-only cache dir only costs the next load its speed-up
+        pass
+    return notes
+
+
+def _sync_shared() -> None:
+    """Renew this session's hold on its shared vault and catch up with it."""
+    shared = st.session_state.shared
+    if shared is not None:
+        shared = REGISTRY.hold(st.session_state.session_id, shared)
+        st.session_state.shared = shared
+        _adopt(shared)
+
+
+def _adopt(shared: SharedVault) -> None:
+    st.session_state.notes = shared.notes
+    st.session_state.tag_index = shared.tag_index
+    st.session_state.scan_cache = shared.cache
+    st.session_state.results = shared.results
+
+
+def _release_shared() -> None:
+    """Stop holding the shared vault; this session's view becomes its own."""
+    shared = st.session_state.shared
+    if shared is not None:
+        REGISTRY.release(st.session_state.session_id, shared)
+        st.session_state.shared = None
+        st.session_state.scan_cache = None
+        st.session_state.results = ResultCache(maxsize=RESULT_CACHE_SIZE)
+
+
+def _reindex() -> None:
+    """Rebuild the tag index from the notes (after notes were added or removed)."""
+    shared = st.session_state.shared
+    if shared is not None:
+        shared.reindex()
+        st.session_state.tag_index = shared.tag_index
+    else:
+        st.session_state.tag_index = build_tag_index(st.session_state.notes)
+
+
+def require_vault(notes: bool = True) -> bool:
+    """Show warning if no vault is loaded. Returns True when vault is ready.
+
+    Pages that only show tags pass ``notes=False``, so a vault opened from
+    its snapshot is shown without building its notes.
+    """
+    if st.session_state.vault_path is None:
         st.info("Load a vault from the sidebar to get started.")
         return False
+    if notes:
+        ensure_notes()
     return True
+
+
+def note_count() -> int:
+    """Number of notes in the loaded vault (without building them)."""
+    return len(st.session_state.tag_index.paths)
+
+
+def _snapshot() -> Snapshot | None:
+    """Snapshot serving the loaded vault until its notes are built."""
+    shared = st.session_state.shared
+    return shared.snapshot if shared is not None else None
@@ -0,0 +1,173 @@
+"""Persistent scan cache: only re-parse notes that changed on disk."""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import os
+import pickle
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+
+from tag_wrangler.models import Note
+
+# Bump whenever the pickled layout (or the Note model) changes.
+CACHE_VERSION = 2
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    """Manifest row for one file plus its cached parse result."""
+
+    mtime_ns: int
+    size: int
+    digest: str
+    note: Note | None  # None records a file that failed to parse
+
+
+@dataclasses.dataclass
+class ScanStats:
+    """Hit/miss counters for the most recent scan."""
+
+    hits: int = 0
+    misses: int = 0
+    removed: int = 0
+    failed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.hits + self.misses
+
+
+class ScanCache:
+    """On-disk manifest (path, mtime_ns, size, content hash) of parsed notes."""
+
+    def __init__(self, path: Path, vault_root: Path) -> None:
+        self.path = path
+        self.vault_root = vault_root
+        self.entries: dict[str, CacheEntry] = {}
+        self.lazy_body = False  # whether cached notes were parsed without bodies
+        self.stats = ScanStats()
+
+    @classmethod
+    def for_vault(
+        cls, vault_root: Path, cache_dir: Path | None = None, shard: str | None = None
+    ) -> ScanCache:
+        """Open (or start) the cache belonging to *vault_root*.
+
+        A *shard* name gives that part of the vault a cache file of its own,
+        so shards can be scanned (and saved) by separate processes.
+        """
+        vault_root = vault_root.resolve()
+        key = hashlib.sha1(str(vault_root).encode("utf-8")).hexdigest()[:16]
+        if shard is not None:
+            key += "-" + hashlib.sha1(shard.encode("utf-8")).hexdigest()[:12]
+        cache = cls(
+            (cache_dir or default_cache_dir()) / f"scan-{key}.pickle", vault_root
+        )
+        cache.load()
+        return cache
+
+    def load(self) -> None:
+        """Read the manifest from disk; a missing or stale file yields an empty cache."""
+        try:
+            with self.path.open("rb") as fh:
+                payload = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+            self.entries = {}
+            return
+        if (
+            not isinstance(payload, dict)
+            or payload.get("version") != CACHE_VERSION
+            or payload.get("vault_root") != str(self.vault_root)
+        ):
+            self.entries = {}
+            return
+        self.entries = payload["entries"]
+        self.lazy_body = payload.get("lazy_body", False)
+
+    def save(self) -> None:
+        """Atomically write the manifest back to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": CACHE_VERSION,
+            "vault_root": str(self.vault_root),
+            "lazy_body": self.lazy_body,
+            "entries": self.entries,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def clear(self) -> None:
+        """Forget every entry (used for a forced full rescan)."""
+        self.entries = {}
+
+    def lookup(self, rel: str, st: os.stat_result) -> CacheEntry | None:
+        """Return the entry for *rel* if its mtime and size still match."""
+        entry = self.entries.get(rel)
+        if entry and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return entry
+        return None
+
+    def lookup_digest(
+        self, rel: str, st: os.stat_result, digest: str
+    ) -> CacheEntry | None:
+        """Return the entry for *rel* if the content is unchanged (touched file)."""
+        entry = self.entries.get(rel)
+        if entry and entry.digest == digest:
+            entry.mtime_ns = st.st_mtime_ns
+            entry.size = st.st_size
+            return entry
+        return None
+
+    def store(
+        self, rel: str, st: os.stat_result, digest: str, note: Note | None
+    ) -> None:
+        self.entries[rel] = CacheEntry(
+            mtime_ns=st.st_mtime_ns, size=st.st_size, digest=digest, note=note
+        )
+
+    def refresh(self, rel: str, full_path: Path, note: Note) -> None:
+        """Re-stamp *rel* after the app rewrote it, keeping *note* cached."""
+        try:
+            st = full_path.stat()
+            data = full_path.read_bytes()
+        except OSError:
+            self.entries.pop(rel, None)
+            return
+        self.store(rel, st, content_digest(data), note)
+
+    def prune(
+        self, seen: set[str], in_scope: Callable[[str], bool] | None = None
+    ) -> int:
+        """Drop entries for files that no longer exist. Returns count removed.
+
+        With *in_scope*, only entries it accepts are candidates (for scans
+        that covered part of the vault).
+        """
+        stale = [
+            rel
+            for rel in self.entries
+            if rel not in seen and (in_scope is None or in_scope(rel))
+        ]
+        for rel in stale:
+            del self.entries[rel]
+        return len(stale)
+
+
+def content_digest(data: bytes) -> str:
+    """Stable content hash used in the manifest."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def default_cache_dir() -> Path:
+    """Per-user cache directory (honours ``XDG_CACHE_HOME``)."""
+    base = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return Path(base).expanduser() / "tag-wrangler"
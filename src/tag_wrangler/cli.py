@@ -0,0 +1,433 @@
+"""Headless command-line interface.
+
+Every command works on a vault path without importing the Streamlit UI
+stack or pandas; the other heavy modules (rapidfuzz, numpy) are only
+imported by the commands that need them. Run ``tag-wrangler ui`` to start
+the app.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+APP_PATH = Path(__file__).parent / "app" / "main.py"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = _build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    if extra and args.command != "ui":
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if args.command == "ui":
+        return _run_ui(extra)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into e.g. `head`; nothing left to report
+        return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    from tag_wrangler import __version__
+
+    parser = argparse.ArgumentParser(
+        prog="tag-wrangler",
+        description="Manage, organise and standardise Obsidian vault tags.",
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    sub = parser.add_subparsers(dest="command", metavar="command")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("vault", type=Path, help="Path to the vault directory")
+    common.add_argument(
+        "--format",
+        choices=["text", "json", "csv"],
+        default="text",
+        help="Output format (default: text)",
+    )
+    common.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the persistent scan cache",
+    )
+    common.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse notes in this many processes (default: 1)",
+    )
+    common.add_argument(
+        "--fm-backend",
+        choices=["fast", "libyaml", "frontmatter"],
+        help="Frontmatter parser backend (default: fast, or $TAG_WRANGLER_FM_BACKEND)",
+    )
+
+    p = sub.add_parser("scan", parents=[common], help="List notes and their tags")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("stats", parents=[common], help="Vault summary statistics")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("tags", parents=[common], help="Every tag with its note count")
+    p.set_defaults(func=cmd_tags)
+
+    p = sub.add_parser("similar", parents=[common], help="Similar (duplicate) tags")
+    p.add_argument("--threshold", type=int, default=80, help="Minimum score 0-100")
+    p.set_defaults(func=cmd_similar)
+
+    p = sub.add_parser("cooccur", parents=[common], help="Tags used together")
+    p.add_argument("--min-count", type=int, default=2, help="Minimum shared notes")
+    p.add_argument("--top", type=int, default=20, help="Number of pairs to show")
+    p.set_defaults(func=cmd_cooccur)
+
+    writes = argparse.ArgumentParser(add_help=False)
+    writes.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="Do not journal the writes (no resume or undo)",
+    )
+
+    p = sub.add_parser("rename", parents=[common, writes], help="Rename a tag")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.set_defaults(func=cmd_rename)
+
+    p = sub.add_parser("merge", parents=[common, writes], help="Merge tags into one")
+    p.add_argument("sources", nargs="+", help="Tags to merge")
+    p.add_argument("--into", required=True, dest="target", help="Target tag")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser(
+        "apply-rules",
+        parents=[common, writes],
+        help="Apply batch rename rules from a file",
+    )
+    p.add_argument("rules", help="Rules file ('old -> new' per line), or - for stdin")
+    p.set_defaults(func=cmd_apply_rules)
+
+    p = sub.add_parser(
+        "journal", parents=[common], help="List, resume or roll back operations"
+    )
+    action = p.add_mutually_exclusive_group()
+    action.add_argument(
+        "--resume", metavar="ID", help="Finish an interrupted operation"
+    )
+    action.add_argument(
+        "--rollback",
+        "--undo",
+        metavar="ID",
+        dest="rollback",
+        help="Restore the files an operation changed",
+    )
+    p.set_defaults(func=cmd_journal)
+
+    p = sub.add_parser(
+        "shards",
+        parents=[common],
+        help="Scan vaults shard by shard in parallel processes",
+    )
+    p.add_argument("more_vaults", nargs="*", type=Path, help="Further vault roots")
+    p.add_argument(
+        "--target",
+        type=int,
+        help="Split folders holding more than this many notes (default: "
+        "one shard per top-level folder)",
+    )
+    p.set_defaults(func=cmd_shards, workers=None)
+
+    sub.add_parser("ui", help="Start the Streamlit app (extra args go to streamlit)")
+    return parser
+
+
+# ---- Commands ----
+
+
+def cmd_scan(args: argparse.Namespace) -> int:
+    notes, _ = _load(args)
+    _emit(
+        args,
+        [
+            {"path": n.path.as_posix(), "title": n.title, "tags": list(n.tags)}
+            for n in notes
+        ],
+        ["path", "title", "tags"],
+    )
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    from tag_wrangler.analyzer import index_stats
+    from tag_wrangler.vault import build_tag_index
+
+    notes, _ = _load(args)
+    stats = index_stats(build_tag_index(notes))
+    if args.format == "json":
+        stats["top_tags"] = [{"tag": t, "count": c} for t, c in stats["top_tags"]]
+        _write_json(stats)
+        return 0
+    top = ", ".join(f"{t} ({c})" for t, c in stats.pop("top_tags"))
+    rows = [{"stat": k, "value": v} for k, v in stats.items()]
+    rows.append({"stat": "top_tags", "value": top})
+    _emit(args, rows, ["stat", "value"])
+    return 0
+
+
+def cmd_tags(args: argparse.Namespace) -> int:
+    from tag_wrangler.vault import build_tag_index
+
+    notes, _ = _load(args)
+    index = build_tag_index(notes)
+    rows = [
+        {"tag": info.name, "count": info.count}
+        for info in sorted(index.values(), key=lambda i: (-i.count, i.name))
+    ]
+    _emit(args, rows, ["tag", "count"])
+    return 0
+
+
+def cmd_similar(args: argparse.Namespace) -> int:
+    from tag_wrangler.analyzer import find_similar_tags
+    from tag_wrangler.vault import build_tag_index
+
+    notes, _ = _load(args)
+    pairs = find_similar_tags(build_tag_index(notes), threshold=args.threshold)
+    rows = [{"tag_a": a, "tag_b": b, "score": round(s, 1)} for a, b, s in pairs]
+    _emit(args, rows, ["tag_a", "tag_b", "score"])
+    return 0
+
+
+def cmd_cooccur(args: argparse.Namespace) -> int:
+    from tag_wrangler.cooccurrence import TagMatrix
+
+    notes, _ = _load(args)
+    pairs = TagMatrix.from_notes(notes).top_pairs(args.top, min_count=args.min_count)
+    rows = [{"tag_a": a, "tag_b": b, "count": c} for a, b, c in pairs]
+    _emit(args, rows, ["tag_a", "tag_b", "count"])
+    return 0
+
+
+def cmd_rename(args: argparse.Namespace) -> int:
+    from tag_wrangler.operations import RenameRule
+
+    return _apply(args, [RenameRule(args.old, args.new)])
+
+
+def cmd_merge(args: argparse.Namespace) -> int:
+    from tag_wrangler.operations import MergeRule
+
+    return _apply(args, [MergeRule(tuple(args.sources), args.target)])
+
+
+def cmd_apply_rules(args: argparse.Namespace) -> int:
+    from tag_wrangler.operations import parse_rules
+
+    if args.rules == "-":
+        text = sys.stdin.read()
+    else:
+        try:
+            text = Path(args.rules).read_text(encoding="utf-8")
+        except OSError as e:
+            print(f"tag-wrangler: cannot read rules: {e}", file=sys.stderr)
+            return 2
+    rules, errors = parse_rules(text)
+    for error in errors:
+        print(f"tag-wrangler: {error}", file=sys.stderr)
+    if not rules:
+        print("tag-wrangler: no rules to apply", file=sys.stderr)
+        return 2
+    return _apply(args, rules)
+
+
+def cmd_journal(args: argparse.Namespace) -> int:
+    from datetime import datetime
+
+    from tag_wrangler.journal import Journal
+
+    journal = Journal.for_vault(_vault(args))
+    if not (args.resume or args.rollback):
+        rows = [
+            {
+                "id": e.id,
+                "created": f"{datetime.fromtimestamp(e.created):%Y-%m-%d %H:%M}",
+                "status": e.status,
+                "files": e.files,
+                "done": e.done,
+                "operation": e.description,
+            }
+            for e in journal.entries()
+        ]
+        _emit(args, rows, ["id", "created", "status", "files", "done", "operation"])
+        return 0
+    try:
+        if args.resume:
+            _, report = journal.resume(args.resume)
+        else:
+            _, report = journal.rollback(args.rollback)
+    except (KeyError, ValueError) as e:
+        print(f"tag-wrangler: {e.args[0]}", file=sys.stderr)
+        return 2
+    errors = [{"path": e.path.as_posix(), "error": e.error} for e in report.errors]
+    if args.format == "json":
+        _write_json({"written": report.written, "errors": errors})
+    else:
+        print(f"Restored {report}." if args.rollback else f"Resumed {report}.")
+    for e in report.errors:
+        print(f"tag-wrangler: could not write {e}", file=sys.stderr)
+    return 1 if report.errors else 0
+
+
+def cmd_shards(args: argparse.Namespace) -> int:
+    from tag_wrangler.shards import scan_roots
+
+    roots = [_vault(args)]
+    for vault in args.more_vaults:
+        args.vault = vault
+        roots.append(_vault(args))
+    if args.fm_backend:
+        from tag_wrangler import fmparse
+
+        fmparse.set_backend(args.fm_backend)
+    index = scan_roots(
+        roots, args.target, workers=args.workers, use_cache=not args.no_cache
+    )
+    rows = [
+        {
+            "root": str(shard.root),
+            "shard": shard.name,
+            "notes": len(part.notes),
+            "tags": len(part.tags),
+        }
+        for shard, part in sorted(index.shards.items())
+    ]
+    stats = index.stats()
+    if args.format == "json":
+        stats["top_tags"] = [{"tag": t, "count": c} for t, c in stats["top_tags"]]
+        _write_json({"shards": rows, "stats": stats})
+        return 0
+    _emit(args, rows, ["root", "shard", "notes", "tags"])
+    if args.format == "text":
+        top = ", ".join(f"{t} ({c})" for t, c in stats.pop("top_tags"))
+        print()
+        for key, value in stats.items():
+            print(f"{key}: {value}")
+        print(f"top_tags: {top}")
+    return 0
+
+
+# ---- Helpers ----
+
+
+def _vault(args: argparse.Namespace) -> Path:
+    vault = args.vault.expanduser().resolve()
+    if not vault.is_dir():
+        print(f"tag-wrangler: not a directory: {vault}", file=sys.stderr)
+        raise SystemExit(2)
+    return vault
+
+
+def _load(args: argparse.Namespace):
+    """Scan the vault (through the scan cache unless ``--no-cache``)."""
+    from tag_wrangler.cache import ScanCache
+    from tag_wrangler.vault import scan_vault
+
+    vault = _vault(args)
+    if args.fm_backend:
+        from tag_wrangler import fmparse
+
+        fmparse.set_backend(args.fm_backend)
+    cache = None if args.no_cache else ScanCache.for_vault(vault)
+    notes = scan_vault(vault, cache=cache, workers=args.workers)
+    if cache is not None:
+        _save_cache(cache)
+    return notes, cache
+
+
+def _apply(args: argparse.Namespace, rules: list) -> int:
+    from tag_wrangler.journal import Journal
+    from tag_wrangler.operations import apply_rules
+
+    notes, cache = _load(args)
+    vault = args.vault.expanduser().resolve()
+    journal = None if args.no_journal else Journal.for_vault(vault)
+    result = apply_rules(notes, vault, rules, journal=journal)
+    if cache is not None and result.changes:
+        for note, _ in result.changes:
+            cache.refresh(note.path.as_posix(), vault / note.path, note)
+        _save_cache(cache)
+    rows = [{"rule": str(r), "notes": n} for r, n in zip(rules, result.per_rule)]
+    errors = [{"path": e.path.as_posix(), "error": e.error} for e in result.errors]
+    if args.format == "json":
+        _write_json(
+            {
+                "modified": result.modified,
+                "rules": rows,
+                "errors": errors,
+                "journal": result.journal_id,
+            }
+        )
+    else:
+        _emit(args, rows, ["rule", "notes"])
+        if args.format == "text":
+            print(f"Modified {result.modified} note(s).")
+            if result.journal_id:
+                print(f"Journal: {result.journal_id} (undo with `journal --undo`)")
+    for e in result.errors:
+        print(f"tag-wrangler: could not write {e}", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+def _save_cache(cache) -> None:
+    try:
+        cache.save()
+    except OSError:
+        # A read-only cache dir only costs the next run its speed-up
+        pass
+
+
+def _emit(args: argparse.Namespace, rows: list[dict], columns: list[str]) -> None:
+    if args.format == "json":
+        _write_json(rows)
+    elif args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {k: ";".join(v) if isinstance(v, list) else v for k, v in row.items()}
+            )
+    else:
+        cells = [
+            [", ".join(v) if isinstance(v, list) else str(v) for v in row.values()]
+            for row in rows
+        ]
+        widths = [
+            max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)
+        ]
+        print("  ".join(c.ljust(w) for c, w in zip(columns, widths)).rstrip())
+        for r in cells:
+            print("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
+
+
+def _write_json(data) -> None:
+    json.dump(data, sys.stdout, indent=2, ensure_ascii=False, default=str)
+    sys.stdout.write("\n")
+
+
+def _run_ui(extra: list[str]) -> int:
+    from streamlit.web import cli as stcli
+
+    sys.argv = ["streamlit", "run", str(APP_PATH), *extra]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Sparse note x tag incidence matrix for co-occurrence and related tags."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tag_wrangler.models import Note
+
+if TYPE_CHECKING:
+    from tag_wrangler.snapshot import Snapshot
+
+# Upper bound on tag pairs expanded at once while building co-occurrence
+_PAIR_CHUNK = 4_000_000
+
+
+class TagMatrix:
+    """Note x tag incidence matrix in CSR form (plus its CSC transpose).
+
+    Tag IDs follow sorted tag names, so for any pair ``a < b`` by ID the
+    names are also in sorted order. Build once per vault state and reuse.
+    """
+
+    def __init__(self, tag_names: list[str], indptr: np.ndarray, indices: np.ndarray):
+        self.tag_names = tag_names
+        self.tag_ids = {name: i for i, name in enumerate(tag_names)}
+        self.indptr = indptr  # row (note) offsets into indices
+        self.indices = indices  # tag IDs, sorted within each row
+        self.n_notes = len(indptr) - 1
+        self.n_tags = len(tag_names)
+        self.tag_counts = np.bincount(indices, minlength=self.n_tags)
+
+        # CSC: for each tag, the notes carrying it
+        order = np.argsort(indices, kind="stable")
+        rows = np.repeat(np.arange(self.n_notes, dtype=np.int64), np.diff(indptr))
+        self.tag_indptr = np.concatenate(([0], np.cumsum(self.tag_counts)))
+        self.tag_notes = rows[order]
+
+        self._pairs: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+
+    @classmethod
+    def from_notes(cls, notes: Sequence[Note]) -> TagMatrix:
+        tag_names = sorted({t for note in notes for t in note.tags})
+        tag_ids = {name: i for i, name in enumerate(tag_names)}
+        lengths = np.fromiter(
+            (len(n.tags) for n in notes), dtype=np.int64, count=len(notes)
+        )
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.fromiter(
+            (tag_ids[t] for note in notes for t in note.tags),
+            dtype=np.int32,
+            count=int(indptr[-1]),
+        )
+        return cls(tag_names, indptr, indices)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> TagMatrix:
+        """The same matrix, read from a vault snapshot instead of notes."""
+        return cls(
+            snapshot.tag_names,
+            np.frombuffer(snapshot.note_offsets, dtype=np.uint64).astype(np.int64),
+            np.frombuffer(snapshot.note_tags, dtype=np.uint32).astype(np.int32),
+        )
+
+    def co_occurrence(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Upper triangle of ``X.T @ X`` as COO arrays ``(tag_a, tag_b, count)``.
+
+        Only pairs that actually co-occur are present; the diagonal (plain
+        tag counts) is in :attr:`tag_counts`.
+        """
+        if self._pairs is None:
+            self._pairs = self._build_pairs()
+        return self._pairs
+
+    def top_pairs(self, k: int = 20, min_count: int = 2) -> list[tuple[str, str, int]]:
+        """The *k* most frequent tag pairs, most frequent first."""
+        a, b, counts = self.co_occurrence()
+        keep = np.nonzero(counts >= min_count)[0]
+        if k < len(keep):
+            keep = keep[np.argpartition(-counts[keep], k - 1)[:k]]
+        # Highest count first, ties in tag-name order
+        keep = keep[np.lexsort((b[keep], a[keep], -counts[keep]))]
+        names = self.tag_names
+        return [(names[a[i]], names[b[i]], int(counts[i])) for i in keep.tolist()]
+
+    def pair_counts(self, min_count: int = 1) -> dict[tuple[str, str], int]:
+        """All co-occurring pairs with at least *min_count* shared notes."""
+        a, b, counts = self.co_occurrence()
+        names = self.tag_names
+        keep = np.nonzero(counts >= min_count)[0].tolist()
+        return {(names[a[i]], names[b[i]]): int(counts[i]) for i in keep}
+
+    def co_counts(self, tag: str) -> np.ndarray:
+        """Row of ``X.T @ X`` for *tag*: notes shared with every other tag."""
+        t = self.tag_ids[tag]
+        notes = self.tag_notes[self.tag_indptr[t] : self.tag_indptr[t + 1]]
+        starts, ends = self.indptr[notes], self.indptr[notes + 1]
+        lengths = ends - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        cols = self.indices[np.repeat(starts, lengths) + offsets]
+        return np.bincount(cols, minlength=self.n_tags)
+
+    def related(
+        self, tag: str, k: int = 10, metric: str = "jaccard", min_count: int = 1
+    ) -> list[tuple[str, float, int]]:
+        """Tags most associated with *tag* as ``(tag, score, shared_notes)``.
+
+        ``metric`` is ``"jaccard"`` (shared / union of notes) or ``"pmi"``
+        (log of observed over expected co-occurrence). Only *tag*'s own row
+        of the co-occurrence matrix is computed.
+        """
+        if tag not in self.tag_ids:
+            return []
+        t = self.tag_ids[tag]
+        shared = self.co_counts(tag)
+        shared[t] = 0
+        cand = np.nonzero(shared >= max(min_count, 1))[0]
+        if not len(cand):
+            return []
+        c = shared[cand].astype(np.float64)
+        if metric == "jaccard":
+            scores = c / (self.tag_counts[t] + self.tag_counts[cand] - c)
+        elif metric == "pmi":
+            scores = np.log(
+                c * self.n_notes / (self.tag_counts[t] * self.tag_counts[cand])
+            )
+        else:
+            raise ValueError(f"Unknown metric: {metric!r}")
+        order = np.lexsort((cand, -scores))[:k]
+        return [
+            (self.tag_names[cand[i]], float(scores[i]), int(shared[cand[i]]))
+            for i in order.tolist()
+        ]
+
+    def _build_pairs(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        lengths = np.diff(self.indptr)
+        # Pairs each position forms with later positions in the same row
+        ends = np.repeat(self.indptr[1:], lengths)
+        per_pos = ends - np.arange(len(self.indices)) - 1
+        n_tags = max(self.n_tags, 1)
+
+        keys_parts: list[np.ndarray] = []
+        count_parts: list[np.ndarray] = []
+        pos = 0
+        cumulative = np.cumsum(per_pos)
+        while pos < len(per_pos):
+            budget = (cumulative[pos - 1] if pos else 0) + _PAIR_CHUNK
+            stop = max(int(np.searchsorted(cumulative, budget, side="right")), pos + 1)
+            counts = per_pos[pos:stop]
+            total = int(counts.sum())
+            if total:
+                left = np.repeat(np.arange(pos, stop), counts)
+                offsets = np.arange(total) - np.repeat(
+                    np.cumsum(counts) - counts, counts
+                )
+                right = left + 1 + offsets
+                keys = (
+                    self.indices[left].astype(np.int64) * n_tags + self.indices[right]
+                )
+                uniq, cnt = np.unique(keys, return_counts=True)
+                keys_parts.append(uniq)
+                count_parts.append(cnt)
+            pos = stop
+
+        if not keys_parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        keys = np.concatenate(keys_parts)
+        counts = np.concatenate(count_parts)
+        if len(keys_parts) > 1:
+            keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        return keys // n_tags, keys % n_tags, counts
@@ -0,0 +1,195 @@
+"""Pluggable frontmatter parsing backends.
+
+Every backend gives exactly what ``frontmatter.loads`` gives, the
+metadata dict and the stripped body; they differ only in speed:
+
+``frontmatter``
+    python-frontmatter itself.
+``libyaml``
+    Splits the fences directly and loads the header with libyaml's
+    ``CSafeLoader`` (the pure-Python loader when PyYAML lacks libyaml).
+``fast``
+    Recognises the common flat shape (``key: scalar`` lines plus flow or
+    block lists of plain scalars, as in ``title``/``date``/``tags``)
+    without invoking YAML at all, and hands anything else to ``libyaml``.
+
+The backend is process-wide: pick it with :func:`set_backend` or the
+``TAG_WRANGLER_FM_BACKEND`` environment variable. ``fast`` is the default.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import re
+
+import frontmatter
+import yaml
+
+from tag_wrangler import perf
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+BACKENDS = ("fast", "libyaml", "frontmatter")
+
+# python-frontmatter's YAML fence; note that \s* may run over blank lines
+_FM_BOUNDARY = re.compile(r"^-{3,}\s*$", re.MULTILINE)
+
+# ---- fast recogniser grammar ----
+_KEY_LINE_RE = re.compile(r"([A-Za-z_][\w\-]*):(?: +(.*?))? *")
+_ITEM_RE = re.compile(r"( *)-(?: +(.*?))? *")
+_INT_RE = re.compile(r"[-+]?(?:0|[1-9][0-9]*)")
+_DATE_RE = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})")
+# Plain scalars that YAML can only read as strings (resolver-free first
+# character, no indicators that would start a comment or a mapping)
+_PLAIN_RE = re.compile(r"[^\W\d][^:#]*")
+_FLOW_PLAIN_RE = re.compile(r"[^\W\d][^:#\[\]{},]*")
+_POST_ARGS = {"content", "handler"}
+_YAML_WORDS = {
+    **dict.fromkeys(["yes", "Yes", "YES", "true", "True", "TRUE"], True),
+    **dict.fromkeys(["on", "On", "ON"], True),
+    **dict.fromkeys(["no", "No", "NO", "false", "False", "FALSE"], False),
+    **dict.fromkeys(["off", "Off", "OFF"], False),
+    **dict.fromkeys(["null", "Null", "NULL"], None),
+}
+
+_backend = os.environ.get("TAG_WRANGLER_FM_BACKEND", "fast")
+
+
+class _Unrecognised(Exception):
+    """The fast recogniser met something it leaves to YAML."""
+
+
+def set_backend(name: str) -> None:
+    """Select the backend used by :func:`loads` and :func:`load_header`."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown frontmatter backend {name!r} (use {BACKENDS})")
+    _backend = name
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def loads(text: str) -> tuple[dict, str]:
+    """``(metadata, body)`` of note *text*, as ``frontmatter.loads`` parses it."""
+    if _backend == "frontmatter" or not text.lstrip().startswith("-"):
+        # No YAML fence: JSON/TOML frontmatter or none at all
+        post = frontmatter.loads(text)
+        return dict(post.metadata), post.content
+    text = text.strip()
+    if not _FM_BOUNDARY.match(text):
+        return {}, text
+    parts = _FM_BOUNDARY.split(text, 2)
+    if len(parts) < 3:
+        return {}, text
+    return load_header(parts[1]), parts[2].strip()
+
+
+def load_header(header: str) -> dict:
+    """Metadata from the YAML between the fences (empty if not a mapping).
+
+    Raises ``TypeError`` for keys python-frontmatter cannot load, just as
+    :func:`loads` does for a whole note.
+    """
+    metadata = None
+    if _backend == "fast":
+        try:
+            metadata = _fast_load(header)
+        except _Unrecognised:
+            perf.count("fm_fast_fallbacks")
+    if metadata is None:
+        data = yaml.load(header, Loader=SafeLoader)
+        metadata = dict(data) if isinstance(data, dict) else {}
+    if any(not isinstance(k, str) or k in _POST_ARGS for k in metadata):
+        # frontmatter.loads passes the metadata to Post(**metadata), which
+        # rejects these keys; fail the same way so every backend agrees
+        raise TypeError("frontmatter keys python-frontmatter cannot load")
+    return metadata
+
+
+def _fast_load(header: str) -> dict:
+    """Parse a flat YAML mapping, or raise :class:`_Unrecognised`."""
+    lines = header.split("\n")
+    data: dict = {}
+    i, n = 0, len(lines)
+    while i < n:
+        line = lines[i]
+        i += 1
+        if not line.strip() or line.startswith("#"):
+            continue
+        m = _KEY_LINE_RE.fullmatch(line)
+        if m is None or m.group(1) in _YAML_WORDS:
+            raise _Unrecognised
+        key, raw = m.group(1), m.group(2)
+        if raw:
+            if raw.startswith("["):
+                data[key] = _flow_list(raw)
+            else:
+                data[key] = _scalar(raw, _PLAIN_RE)
+            if i < n and lines[i][:1] in (" ", "\t"):
+                raise _Unrecognised  # continuation of a multi-line value
+            continue
+        items: list = []
+        indent = None
+        while i < n:
+            item = _ITEM_RE.fullmatch(lines[i])
+            if item is None:
+                if lines[i][:1] in (" ", "\t", "-"):
+                    raise _Unrecognised
+                break
+            if indent is None:
+                indent = item.group(1)
+            elif item.group(1) != indent:
+                raise _Unrecognised
+            items.append(_scalar(item.group(2) or "", _PLAIN_RE))
+            i += 1
+        data[key] = items if indent is not None else None
+    return data
+
+
+def _flow_list(raw: str) -> list:
+    if not raw.endswith("]"):
+        raise _Unrecognised
+    inner = raw[1:-1].strip()
+    if not inner:
+        return []
+    items = [part.strip() for part in inner.split(",")]
+    if not all(items):
+        raise _Unrecognised  # e.g. a trailing comma
+    return [_scalar(item, _FLOW_PLAIN_RE) for item in items]
+
+
+def _scalar(raw: str, plain: re.Pattern):
+    if not raw:
+        return None
+    if not raw.isprintable():
+        raise _Unrecognised
+    first = raw[0]
+    if first == "'":
+        inner = raw[1:-1]
+        if len(raw) < 2 or raw[-1] != "'" or "'" in inner:
+            raise _Unrecognised
+        return inner
+    if first == '"':
+        inner = raw[1:-1]
+        if len(raw) < 2 or raw[-1] != '"' or '"' in inner or "\\" in inner:
+            raise _Unrecognised
+        return inner
+    if raw in _YAML_WORDS:
+        return _YAML_WORDS[raw]
+    if _INT_RE.fullmatch(raw):
+        return int(raw)
+    m = _DATE_RE.fullmatch(raw)
+    if m:
+        try:
+            return datetime.date(*map(int, m.groups()))
+        except ValueError:
+            raise _Unrecognised from None
+    if plain.fullmatch(raw) and raw.lower() not in _YAML_WORDS:
+        return raw
+    raise _Unrecognised
@@ -0,0 +1,156 @@
+"""Minimal-diff rewrites of a note's ``tags`` frontmatter entry.
+
+A full ``frontmatter.dumps`` re-serialises every key, so unrelated values
+get reordered, re-quoted and re-wrapped. When only the tags change,
+:func:`patch_tags` instead splices a new ``tags:`` entry over the lines of
+the old ``tags:`` / ``tag:`` entry and leaves the rest of the file
+byte-for-byte as it was, without parsing the whole header.
+
+The lines being replaced are checked against the frontmatter the note was
+scanned with, and the new entry is loaded back and checked against the new
+tags. Shapes that cannot be patched safely (anchors, block scalars,
+quoted or duplicate keys, frontmatter not at the very start of the file)
+give ``None`` so the caller can fall back to a full rewrite.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import re
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+TAG_KEYS = ("tags", "tag")
+
+# A YAML fence line, as python-frontmatter recognises it
+_FENCE_RE = re.compile(r"^-{3,}\s*$")
+# A top-level tags/tag key (unquoted, at column 0)
+_KEY_RE = re.compile(r"^(tags|tag)[ \t]*:(?=[ \t]|$)")
+# Any other spelling of a tags key: quoted, or with odd spacing
+_ANY_KEY_RE = re.compile(r"""^["']?tags?["']?[ \t]*:""", re.MULTILINE)
+# Lines that carry on the previous key's value
+_CONTINUATION_RE = re.compile(r"^([ \t]|-[ \t]|-$)")
+# Block sequence item prefix to copy when writing new items
+_ITEM_RE = re.compile(r"^([ \t]*-[ \t]+)")
+# Tags that are safe to write unquoted; the round-trip check has the final say
+_PLAIN_RE = re.compile(r"[A-Za-z_][\w/\-.]*")
+_RESERVED = {"true", "false", "yes", "no", "on", "off", "null"}
+# YAML features a line-level splice could break
+_UNSAFE_RE = re.compile(r"[&*!|>{]")
+
+
+def patch_tags(text: str, old_fm: dict, new_fm: dict) -> tuple[str, str] | None:
+    """Rewrite only the tags entry of note *text*; returns (new text, body).
+
+    *old_fm* is the frontmatter *text* is expected to carry and *new_fm* the
+    frontmatter to write. Returns ``None`` when anything other than the tags
+    differs, or when the entry cannot be patched safely.
+    """
+    if _without_tags(old_fm) != _without_tags(new_fm) or "tag" in new_fm:
+        return None
+    new_tags = new_fm.get("tags")
+    if not isinstance(new_tags, list) or not all(isinstance(t, str) for t in new_tags):
+        return None
+
+    lines = text.splitlines(keepends=True)
+    if not lines or not _FENCE_RE.match(lines[0]):
+        return None
+    end = next((i for i in range(1, len(lines)) if _FENCE_RE.match(lines[i])), None)
+    if end is None:
+        return None
+
+    nodes = _find_nodes(lines, end)
+    if nodes is None or set(nodes) != {k for k in TAG_KEYS if k in old_fm}:
+        return None
+    if not nodes and _ANY_KEY_RE.search("".join(lines[1:end])):
+        return None
+    for key, (start, stop) in nodes.items():
+        chunk = "".join(lines[start:stop])
+        if _UNSAFE_RE.search(chunk) or _load(chunk) != {key: old_fm[key]}:
+            return None
+
+    style = lines[nodes["tags"][0] : nodes["tags"][1]] if "tags" in nodes else None
+    if style is None and "tag" in nodes:
+        style = lines[nodes["tag"][0] : nodes["tag"][1]]
+    entry = _render(new_tags, style)
+    if _load(entry) != {"tags": new_tags}:
+        return None
+
+    if nodes:
+        spans = sorted(nodes.values())
+        out = lines[: spans[0][0]] + [entry]
+        for (_, prev_stop), (start, _) in itertools.pairwise(spans):
+            out += lines[prev_stop:start]
+        out += lines[spans[-1][1] :]
+    else:
+        out = lines[:end] + [entry] + lines[end:]
+    return "".join(out), "".join(lines[end + 1 :]).strip()
+
+
+def _find_nodes(lines: list[str], end: int) -> dict[str, tuple[int, int]] | None:
+    """Line ranges ``[start, stop)`` of each tags/tag entry in the header."""
+    nodes: dict[str, tuple[int, int]] = {}
+    i = 1
+    while i < end:
+        m = _KEY_RE.match(lines[i])
+        if m is None:
+            i += 1
+            continue
+        if m.group(1) in nodes:
+            return None
+        stop = i + 1
+        while stop < end:
+            if _CONTINUATION_RE.match(lines[stop]):
+                stop += 1
+            elif (
+                not lines[stop].strip()
+                and stop + 1 < end
+                and _CONTINUATION_RE.match(lines[stop + 1])
+            ):
+                # A blank line inside a block sequence
+                stop += 2
+            else:
+                break
+        nodes[m.group(1)] = (i, stop)
+        i = stop
+    return nodes
+
+
+def _render(tags: list[str], style: list[str] | None) -> str:
+    """A ``tags:`` entry for *tags*, in the style of the entry it replaces."""
+    if not tags:
+        return "tags: []\n"
+    scalars = [_scalar(t) for t in tags]
+    value = style[0].split(":", 1)[1].strip() if style else ""
+    if value.startswith("["):
+        return f"tags: [{', '.join(scalars)}]\n"
+    prefix = "- "
+    for line in style[1:] if style else ():
+        m = _ITEM_RE.match(line)
+        if m:
+            prefix = m.group(1)
+            break
+    return "tags:\n" + "".join(f"{prefix}{s}\n" for s in scalars)
+
+
+def _scalar(tag: str) -> str:
+    if _PLAIN_RE.fullmatch(tag) and tag.lower() not in _RESERVED:
+        return tag
+    return json.dumps(tag, ensure_ascii=False)
+
+
+def _load(chunk: str):
+    try:
+        return yaml.load(chunk, Loader=SafeLoader)
+    except yaml.YAMLError:
+        return None
+
+
+def _without_tags(fm: dict) -> dict:
+    return {k: v for k, v in fm.items() if k not in TAG_KEYS}
@@ -0,0 +1,435 @@
+"""Write-ahead journal for bulk operations: resume, roll back and undo.
+
+Before a batch touches the vault, every planned file change is appended
+to a journal file and synced to disk. A change keeps only the span of the
+note that differs (usually part of the frontmatter), plus a digest of the
+whole text before and after.
+Completed files are then recorded in groups, one fsync per
+:data:`COMMIT_EVERY` files rather than one per file, and a final record
+marks the batch complete. An operation cut short by a crash leaves a
+journal without that record: :meth:`Journal.resume` finishes it and
+:meth:`Journal.rollback` puts the original files back. On a completed
+operation the same rollback is a fast undo that rewrites only the files
+the operation changed.
+
+Recovery compares each file with its planned before/after digest rather
+than trusting the completion records, so it is safe to repeat and never
+overwrites a note that was edited after the operation; such notes are
+reported as errors and left alone.
+
+A journal is a JSON-lines file under the user cache directory, one per
+operation::
+
+    {"op": "begin", "id": ..., "description": ..., "created": ...}
+    {"op": "plan", "path": ..., "start": ..., "before": ..., "after": ...,
+     "before_digest": ..., "after_digest": ...}                  (per file)
+    {"op": "planned", "files": ...}
+    {"op": "done", "paths": [...], "files": ..., "done": ...}    (per group)
+    {"op": "end", "status": "complete" | "rolled back", "files": ..., "done": ...}
+
+Every record after the plan carries the running counts, so a journal is
+listed from its first line and its last complete line alone.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import secrets
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, TextIO
+
+from tag_wrangler import perf
+from tag_wrangler.cache import content_digest, default_cache_dir
+from tag_wrangler.parser import atomic_write_text
+
+if TYPE_CHECKING:
+    from tag_wrangler.writer import WriteReport
+
+# Completed files recorded per journal fsync
+COMMIT_EVERY = 256
+# Finished journals kept for undo; interrupted ones are always kept
+KEEP_JOURNALS = 20
+# Bytes read back from the end of a journal to find its last record
+TAIL_BYTES = 64 * 1024
+
+INTERRUPTED = "interrupted"
+COMPLETE = "complete"
+ROLLED_BACK = "rolled back"
+
+
+@dataclasses.dataclass
+class FileChange:
+    """One planned rewrite; *path* is POSIX-style, relative to the vault.
+
+    *before* and *after* are only the span that differs, starting at
+    character *start*; the digests identify the whole texts.
+    """
+
+    path: str
+    start: int
+    before: str
+    after: str
+    before_digest: str
+    after_digest: str
+
+    @classmethod
+    def between(cls, path: str, before: str, after: str) -> FileChange:
+        """The change that rewrites text *before* into *after*."""
+        start = _common_prefix(before, after)
+        tail = _common_prefix(before[start:][::-1], after[start:][::-1])
+        return cls(
+            path,
+            start,
+            before[start : len(before) - tail],
+            after[start : len(after) - tail],
+            _digest(before),
+            _digest(after),
+        )
+
+
+@dataclasses.dataclass
+class JournalEntry:
+    """Summary of one journaled operation."""
+
+    id: str
+    path: Path
+    description: str
+    created: float
+    status: str  # INTERRUPTED, COMPLETE or ROLLED_BACK
+    files: int  # files the operation planned to rewrite
+    done: int  # files recorded as written
+
+    @property
+    def can_resume(self) -> bool:
+        return self.status == INTERRUPTED
+
+    @property
+    def can_roll_back(self) -> bool:
+        return self.status != ROLLED_BACK
+
+
+class JournalWriter:
+    """Append side of one operation's journal (see :meth:`Journal.begin`)."""
+
+    def __init__(
+        self, entry_id: str, fh: TextIO, files: int = 0, written: int = 0
+    ) -> None:
+        self.id = entry_id
+        self.files = files
+        self.written = written
+        self._fh = fh
+        self._pending: list[str] = []
+
+    def plan(self, changes: Iterable[FileChange]) -> None:
+        """Record every planned change and sync before any file is written."""
+        for change in changes:
+            self._append({"op": "plan", **dataclasses.asdict(change)})
+            self.files += 1
+        self._append({"op": "planned", "files": self.files})
+        self._sync()
+
+    def done(self, path: str) -> None:
+        """Mark *path* written; committed with the next group."""
+        self._pending.append(path)
+        self.written += 1
+        if len(self._pending) >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self) -> None:
+        if self._pending:
+            self._append(
+                {
+                    "op": "done",
+                    "paths": self._pending,
+                    "files": self.files,
+                    "done": self.written,
+                }
+            )
+            self._pending = []
+            self._sync()
+
+    def finish(self, status: str = COMPLETE) -> None:
+        self.commit()
+        self._append(
+            {"op": "end", "status": status, "files": self.files, "done": self.written}
+        )
+        self._sync()
+        self._fh.close()
+
+    def _append(self, record: dict) -> None:
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _sync(self) -> None:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        perf.count("journal_syncs")
+
+
+class Journal:
+    """The operation journals of one vault."""
+
+    def __init__(self, directory: Path, vault_root: Path) -> None:
+        self.directory = directory
+        self.vault_root = vault_root
+
+    @classmethod
+    def for_vault(cls, vault_root: Path, cache_dir: Path | None = None) -> Journal:
+        vault_root = vault_root.resolve()
+        key = hashlib.sha1(str(vault_root).encode("utf-8")).hexdigest()[:16]
+        return cls((cache_dir or default_cache_dir()) / f"journal-{key}", vault_root)
+
+    def begin(self, description: str) -> JournalWriter:
+        """Start the journal of a new operation."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._prune()
+        created = time.time()
+        entry_id = time.strftime("%Y%m%dT%H%M%S", time.localtime(created))
+        entry_id += f"-{secrets.token_hex(3)}"
+        fh = (self.directory / f"{entry_id}.jsonl").open("x", encoding="utf-8")
+        writer = JournalWriter(entry_id, fh)
+        writer._append(
+            {
+                "op": "begin",
+                "id": entry_id,
+                "description": description,
+                "created": created,
+                "vault": str(self.vault_root),
+            }
+        )
+        return writer
+
+    def entries(self) -> list[JournalEntry]:
+        """Every recorded operation, newest first."""
+        if not self.directory.is_dir():
+            return []
+        entries = []
+        for path in sorted(self.directory.glob("*.jsonl"), reverse=True):
+            entry = _read_entry(path)
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+    def interrupted(self) -> list[JournalEntry]:
+        return [e for e in self.entries() if e.status == INTERRUPTED]
+
+    def get(self, entry_id: str) -> JournalEntry:
+        entry = _read_entry(self.directory / f"{entry_id}.jsonl")
+        if entry is None:
+            raise KeyError(f"No journaled operation {entry_id!r}")
+        return entry
+
+    @perf.timed("journal.resume")
+    def resume(
+        self, entry_id: str, workers: int | None = None
+    ) -> tuple[list[Path], WriteReport]:
+        """Finish an interrupted operation; returns the files written."""
+        entry = self.get(entry_id)
+        if not entry.can_resume:
+            raise ValueError(f"Operation {entry_id} is {entry.status}")
+        return self._restore(entry, forward=True, workers=workers)
+
+    @perf.timed("journal.rollback")
+    def rollback(
+        self, entry_id: str, workers: int | None = None
+    ) -> tuple[list[Path], WriteReport]:
+        """Put back the files an operation changed; also undoes a finished one."""
+        entry = self.get(entry_id)
+        if not entry.can_roll_back:
+            raise ValueError(f"Operation {entry_id} is already {ROLLED_BACK}")
+        return self._restore(entry, forward=False, workers=workers)
+
+    undo = rollback
+
+    def _restore(
+        self, entry: JournalEntry, forward: bool, workers: int | None
+    ) -> tuple[list[Path], WriteReport]:
+        # writer imports this module for batch writes
+        from tag_wrangler.writer import DEFAULT_WRITE_WORKERS, WriteError, WriteReport
+
+        changes = _read_changes(entry.path)
+        report = WriteReport()
+        start = time.perf_counter()
+        workers = min(workers or DEFAULT_WRITE_WORKERS, max(len(changes), 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(
+                pool.map(lambda change: self._restore_one(change, forward), changes)
+            )
+        report.seconds = time.perf_counter() - start
+
+        written: list[Path] = []
+        for change, (size, error) in zip(changes, results):
+            if error is not None:
+                report.errors.append(WriteError(Path(change.path), error))
+            elif size:
+                written.append(Path(change.path))
+                report.written += 1
+                report.bytes += size
+        perf.count("files_written", report.written)
+        perf.count("bytes_written", report.bytes)
+        with entry.path.open("a", encoding="utf-8") as fh:
+            done = entry.files - len(report.errors) if forward else entry.done
+            writer = JournalWriter(entry.id, fh, entry.files, done)
+            writer.finish(COMPLETE if forward else ROLLED_BACK)
+        return written, report
+
+    def _restore_one(self, change: FileChange, forward: bool) -> tuple[int, str | None]:
+        """(bytes written, error) for one file; never raises."""
+        if forward:
+            want, want_digest = change.after, change.after_digest
+            other, other_digest = change.before, change.before_digest
+        else:
+            want, want_digest = change.before, change.before_digest
+            other, other_digest = change.after, change.after_digest
+        full_path = self.vault_root / change.path
+        try:
+            current = full_path.read_text(encoding="utf-8", errors="replace")
+            digest = _digest(current)
+            if digest == want_digest:
+                return 0, None
+            if digest != other_digest:
+                return 0, "changed since the operation; left as it is"
+            end = change.start + len(other)
+            text = current[: change.start] + want + current[end:]
+            atomic_write_text(full_path, text)
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            return 0, str(e) or type(e).__name__
+        return len(text.encode("utf-8")), None
+
+    def _prune(self) -> None:
+        """Drop old finished journals and ones whose plan never got synced.
+
+        An unplanned journal belongs to an operation that died before
+        writing any file (or to one still planning, hence the grace period).
+        """
+        finished = 0
+        for path in sorted(self.directory.glob("*.jsonl"), reverse=True):
+            entry = _read_entry(path)
+            if entry is None:
+                if time.time() - path.stat().st_mtime > 60:
+                    path.unlink(missing_ok=True)
+            elif entry.status != INTERRUPTED:
+                finished += 1
+                if finished > KEEP_JOURNALS:
+                    path.unlink(missing_ok=True)
+
+
+def _records(path: Path) -> Iterable[dict]:
+    """Records of a journal file, stopping at a torn final line."""
+    try:
+        fh = path.open(encoding="utf-8")
+    except OSError:
+        return
+    with fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return
+
+
+def _read_entry(path: Path) -> JournalEntry | None:
+    """Summary of *path*, or ``None`` if its plan was never completed."""
+    try:
+        with path.open("rb") as fh:
+            begin = _loads(fh.readline())
+            last = _last_record(fh)
+    except OSError:
+        return None
+    if begin is None or begin.get("op") != "begin" or last is None:
+        return None
+    op = last.get("op")
+    if op == "end":
+        status, files, done = last["status"], last["files"], last["done"]
+    elif op == "planned":
+        status, files, done = INTERRUPTED, last["files"], 0
+    elif op == "done" and "files" in last:
+        status, files, done = INTERRUPTED, last["files"], last["done"]
+    elif op == "done":
+        # Written before done records carried the counts: tally them
+        status, files, done = INTERRUPTED, None, 0
+        for record in _records(path):
+            if record.get("op") == "planned":
+                files = record["files"]
+            elif record.get("op") == "done":
+                done += len(record["paths"])
+        if files is None:
+            return None
+    else:
+        # Still planning, or died before the plan was synced
+        return None
+    return JournalEntry(
+        id=begin["id"],
+        path=path,
+        description=begin["description"],
+        created=begin["created"],
+        status=status,
+        files=files,
+        done=min(done, files),
+    )
+
+
+def _last_record(fh: BinaryIO) -> dict | None:
+    """The last complete record of an open journal, read from its end."""
+    size = fh.seek(0, os.SEEK_END)
+    window = TAIL_BYTES
+    while True:
+        start = max(0, size - window)
+        fh.seek(start)
+        lines = fh.read().split(b"\n")
+        if start:
+            # Probably starts mid-line
+            lines = lines[1:]
+        for line in reversed(lines):
+            record = _loads(line)
+            if record is not None:
+                return record
+        if not start:
+            return None
+        window *= 4
+
+
+def _loads(line: bytes) -> dict | None:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def _read_changes(path: Path) -> list[FileChange]:
+    changes = []
+    for r in _records(path):
+        if r.get("op") != "plan":
+            continue
+        if "start" in r:
+            changes.append(FileChange(**{k: v for k, v in r.items() if k != "op"}))
+        else:
+            # Written before plans kept only the changed span
+            changes.append(FileChange.between(r["path"], r["before"], r["after"]))
+    return changes
+
+
+def _digest(text: str) -> str:
+    return content_digest(text.encode("utf-8"))
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix of *a* and *b*.
+
+    Compares slices, halving the range each time, rather than stepping
+    through the strings one character at a time in Python.
+    """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
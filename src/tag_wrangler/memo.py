@@ -0,0 +1,71 @@
+"""In-memory cache for results derived from one state of a vault."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class ResultCache:
+    """Bounded LRU of derived results, valid for a single vault generation.
+
+    ``generation`` identifies the current vault state. Call :meth:`bump`
+    whenever notes or the tag index change (load, reload, any write): it
+    advances the generation and drops every cached result, so nothing
+    computed from an older state is ever served. Within a generation each
+    ``key`` is computed once; at most ``maxsize`` results are kept.
+
+    The cache may be shared between threads; a key computed by two threads
+    at once is computed twice, and the later result is kept.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the result cached under *key*, computing it on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+            generation = self.generation
+        value = compute()
+        with self._lock:
+            # Not cached if the vault changed while it was being computed
+            if generation == self.generation:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def bump(self) -> int:
+        """Start a new generation (the vault changed). Returns it."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            return self.generation
+
+    def invalidate(self, name: Hashable | None = None) -> None:
+        """Drop one result family (keys equal to or starting with *name*), or all."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if key == name or (isinstance(key, tuple) and key and key[0] == name):
+                    del self._entries[key]
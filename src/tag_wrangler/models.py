@@ -3,18 +3,21 @@
 from __future__ import annotations
 
 import dataclasses
+import sys
+from array import array
+from collections.abc import Iterable, Sequence
 from pathlib import Path
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Note:
     """Represents a single Obsidian markdown note."""
 
     path: Path
     title: str
     frontmatter: dict
-    tags: list[str]
-    body: str
+    tags: tuple[str, ...]  # sorted, interned
+    body: str | None  # None when scanned without bodies (see parser.load_body)
 
     @property
     def relative_path(self) -> str:
@@ -24,13 +27,31 @@ class Note:
         return self.frontmatter.get(key)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class TagInfo:
-    """Aggregated information about a single tag across the vault."""
+    """Aggregated information about a single tag across the vault.
+
+    Postings are integer note IDs into the owning index's shared path
+    table rather than one ``Path`` per posting; ``count`` and ``notes`` are
+    derived from them.
+    """
 
     name: str
-    count: int
-    notes: list[Path]
+    postings: array = dataclasses.field(default_factory=lambda: array("I"))
+    id: int = -1
+    note_paths: Sequence[Path] = dataclasses.field(
+        default=(), repr=False, compare=False
+    )
+
+    @property
+    def count(self) -> int:
+        return len(self.postings)
+
+    @property
+    def notes(self) -> list[Path]:
+        """Paths of the notes carrying this tag, in note-ID order."""
+        paths = self.note_paths
+        return [paths[i] for i in self.postings]
 
     @property
     def parts(self) -> list[str]:
@@ -45,3 +66,30 @@ class TagInfo:
     def root(self) -> str:
         """Return the top-level tag (e.g. 'project' from 'project/work')."""
         return self.parts[0]
+
+
+class TagIndex(dict[str, TagInfo]):
+    """Mapping of tag name -> TagInfo plus the note table postings refer to.
+
+    Note ID ``i`` is ``paths[i]``, the position of the note in the list the
+    index was built from.
+    """
+
+    __slots__ = ("_note_ids", "next_tag_id", "paths")
+
+    def __init__(self, paths: list[Path] | None = None) -> None:
+        super().__init__()
+        self.paths: list[Path] = paths if paths is not None else []
+        self.next_tag_id = 0
+        self._note_ids: dict[Path, int] | None = None
+
+    def note_id(self, path: Path) -> int:
+        """ID of the note at *path* (KeyError if it is not indexed)."""
+        if self._note_ids is None:
+            self._note_ids = {p: i for i, p in enumerate(self.paths)}
+        return self._note_ids[path]
+
+
+def intern_tags(tags: Iterable[str]) -> tuple[str, ...]:
+    """Deduplicate, sort and intern tag strings for storage on a Note."""
+    return tuple(sorted({sys.intern(t) for t in tags}))
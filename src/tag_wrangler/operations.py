@@ -1,25 +1,231 @@
-"""Tag operations: rename, merge, delete, bulk update."""
+"""Tag operations: rename, merge, delete, bulk update.
+
+Every operation goes through the batch engine: a rule set is compiled into
+one tag mapping and each affected note is rewritten (and written to disk)
+at most once, however many rules touch it. The writes themselves run
+concurrently through :mod:`tag_wrangler.writer`, optionally logged to a
+:class:`~tag_wrangler.journal.Journal` so they can be resumed or undone.
+"""
 
 from __future__ import annotations
 
+import dataclasses
+import re
+from collections.abc import Iterable
 from pathlib import Path
 
-from tag_wrangler.models import Note
-from tag_wrangler.parser import write_frontmatter
+from tag_wrangler import perf
+from tag_wrangler.journal import Journal
+from tag_wrangler.models import Note, intern_tags
+from tag_wrangler.parser import inline_tags, normalise_tag
+from tag_wrangler.writer import WriteError, WriteReport, write_frontmatters
 
 
-def rename_tag(
-    notes: list[Note], vault_root: Path, old_tag: str, new_tag: str
-) -> int:
-    """Rename a tag across all notes. Returns count of modified notes."""
-    old_tag = old_tag.lower().strip()
-    new_tag = new_tag.lower().strip()
-    modified = 0
+@dataclasses.dataclass(frozen=True)
+class RenameRule:
+    old: str
+    new: str
+
+    def __str__(self) -> str:
+        return f"{self.old} -> {self.new}"
+
+
+@dataclasses.dataclass(frozen=True)
+class MergeRule:
+    sources: tuple[str, ...]
+    target: str
+
+    def __str__(self) -> str:
+        return f"{', '.join(self.sources)} -> {self.target}"
+
+
+@dataclasses.dataclass(frozen=True)
+class DeleteRule:
+    tag: str
+
+    def __str__(self) -> str:
+        return f"{self.tag} ->"
+
+
+@dataclasses.dataclass(frozen=True)
+class AddRule:
+    """Add *tag* to the notes at *paths* (every note when ``None``)."""
+
+    tag: str
+    paths: frozenset[Path] | None = None
+
+    def __str__(self) -> str:
+        return f"+ {self.tag}"
+
+
+Rule = RenameRule | MergeRule | DeleteRule | AddRule
+
+
+@dataclasses.dataclass
+class CompiledRules:
+    """A rule set folded into a single mapping.
+
+    ``mapping`` sends each (lowercase) source tag to the tags it ends up as
+    after every rule has run; ``adds`` lists tags to append, already passed
+    through the rules that follow them.
+    """
+
+    rules: list[Rule]
+    mapping: dict[str, tuple[str, ...]]
+    adds: list[tuple[tuple[str, ...], frozenset[Path] | None]]
+
+    def touches(self, note: Note) -> bool:
+        if any(paths is None or note.path in paths for _, paths in self.adds):
+            return True
+        return any(t.lower() in self.mapping for t in _get_fm_tags(note.frontmatter))
+
+
+@dataclasses.dataclass
+class BatchResult:
+    """Outcome of :func:`apply_rules`."""
+
+    per_rule: list[int]  # notes each rule matched, in rule order
+    modified: int = 0  # notes actually rewritten (one write each)
+    changes: list[tuple[Note, tuple[str, ...]]] = dataclasses.field(
+        default_factory=list
+    )  # (note, tags before the batch) for every rewritten note
+    report: WriteReport = dataclasses.field(default_factory=WriteReport)
+    journal_id: str | None = None  # journal entry of the writes, if journaled
+
+    @property
+    def errors(self) -> list[WriteError]:
+        """Notes that could not be written; they are left unchanged."""
+        return self.report.errors
+
+
+def compile_rules(rules: Iterable[Rule]) -> CompiledRules:
+    """Fold *rules*, applied in order, into one tag mapping."""
+    rules = list(rules)
+    mapping: dict[str, list[str]] = {}
+    adds: list[tuple[list[str], frozenset[Path] | None]] = []
+
+    def rewrite(sources: set[str], outputs: list[str]) -> None:
+        for key, current in mapping.items():
+            mapping[key] = _rewrite_list(current, sources, outputs)
+        for i, (current, paths) in enumerate(adds):
+            adds[i] = (_rewrite_list(current, sources, outputs), paths)
+        for source in sources:
+            # A source already in the mapping was rewritten by an earlier
+            # rule, so no note still carries it under this name
+            mapping.setdefault(source, list(outputs))
+
+    for rule in rules:
+        if isinstance(rule, RenameRule):
+            old, new = _clean(rule.old), _clean(rule.new)
+            if old and new and old != new:
+                rewrite({old}, [new])
+        elif isinstance(rule, MergeRule):
+            target = _clean(rule.target)
+            sources = {_clean(t) for t in rule.sources} - {target, ""}
+            if target and sources:
+                rewrite(sources, [target])
+        elif isinstance(rule, DeleteRule):
+            tag = _clean(rule.tag)
+            if tag:
+                rewrite({tag}, [])
+        elif isinstance(rule, AddRule):
+            tag = _clean(rule.tag)
+            if tag:
+                adds.append(([tag], rule.paths))
+        else:
+            raise TypeError(f"Unknown rule: {rule!r}")
+
+    return CompiledRules(
+        rules=rules,
+        mapping={k: tuple(v) for k, v in mapping.items()},
+        adds=[(tuple(tags), paths) for tags, paths in adds],
+    )
+
+
+@perf.timed("operations.apply_rules")
+def apply_rules(
+    notes: list[Note],
+    vault_root: Path,
+    rules: Iterable[Rule] | CompiledRules,
+    workers: int | None = None,
+    journal: Journal | None = None,
+) -> BatchResult:
+    """Apply a whole rule set, writing each affected note exactly once.
+
+    Notes are written concurrently (``workers`` threads, see
+    :func:`~tag_wrangler.writer.write_frontmatters`). A note that fails to
+    write is reported in ``errors`` and keeps its old tags in memory. With a
+    *journal* the batch is logged first; its ID is in ``journal_id``.
+    """
+    compiled = rules if isinstance(rules, CompiledRules) else compile_rules(rules)
+    result = BatchResult(per_rule=[0] * len(compiled.rules))
+    if not compiled.mapping and not compiled.adds:
+        return result
+
+    jobs: list[tuple[Note, dict]] = []
+    new_tags: list[list[str]] = []
     for note in notes:
-        if old_tag in note.tags:
-            _replace_tag_in_note(note, vault_root, old_tag, new_tag)
-            modified += 1
-    return modified
+        if not compiled.touches(note):
+            continue
+        old_fm_tags = _get_fm_tags(note.frontmatter)
+        _count_rule_matches(compiled.rules, note, old_fm_tags, result.per_rule)
+
+        new_fm_tags = _map_tags(old_fm_tags, compiled, note.path)
+        if new_fm_tags == old_fm_tags and "tag" not in note.frontmatter:
+            continue
+        jobs.append((note, _with_tags(note.frontmatter, new_fm_tags)))
+        new_tags.append(new_fm_tags)
+
+    log = None
+    if journal is not None and jobs:
+        log = journal.begin("; ".join(str(rule) for rule in compiled.rules))
+        result.journal_id = log.id
+    bodies, result.report = write_frontmatters(jobs, vault_root, workers, log)
+    for (note, fm), fm_tags, body in zip(jobs, new_tags, bodies):
+        if body is None:
+            continue
+        old_tags = note.tags
+        note.frontmatter = fm
+        # Inline tags live in the body, which is left as it is
+        note.tags = intern_tags([normalise_tag(t) for t in fm_tags] + inline_tags(body))
+        result.modified += 1
+        result.changes.append((note, old_tags))
+    return result
+
+
+def parse_rules(text: str) -> tuple[list[Rule], list[str]]:
+    """Parse rule text, one rule per line.
+
+    ``old -> new`` renames, ``a, b, c -> target`` merges and ``old ->``
+    (nothing on the right) deletes. Lines without ``->`` are skipped.
+    Returns the rules and a list of error messages for malformed lines.
+    """
+    rules: list[Rule] = []
+    errors: list[str] = []
+    for line in text.strip().splitlines():
+        line = line.strip()
+        if not line or "->" not in line:
+            continue
+        parts = line.split("->")
+        if len(parts) != 2:
+            errors.append(f"Invalid rule: {line}")
+            continue
+        left, right = parts[0].strip(), parts[1].strip()
+        sources = [s.strip() for s in left.split(",") if s.strip()]
+        if not sources:
+            errors.append(f"Invalid rule: {line}")
+        elif not right:
+            rules.extend(DeleteRule(s) for s in sources)
+        elif len(sources) == 1:
+            rules.append(RenameRule(sources[0], right))
+        else:
+            rules.append(MergeRule(tuple(sources), right))
+    return rules, errors
+
+
+def rename_tag(notes: list[Note], vault_root: Path, old_tag: str, new_tag: str) -> int:
+    """Rename a tag across all notes. Returns count of modified notes."""
+    return apply_rules(notes, vault_root, [RenameRule(old_tag, new_tag)]).modified
 
 
 def merge_tags(
@@ -29,92 +235,98 @@ def merge_tags(
     target_tag: str,
 ) -> int:
     """Merge multiple source tags into a single target tag."""
-    source_set = {t.lower().strip() for t in source_tags}
-    target_tag = target_tag.lower().strip()
-    modified = 0
-    for note in notes:
-        overlap = source_set & set(note.tags)
-        if overlap:
-            for old in overlap:
-                _replace_tag_in_note(note, vault_root, old, target_tag)
-            modified += 1
-    return modified
+    rule = MergeRule(tuple(source_tags), target_tag)
+    return apply_rules(notes, vault_root, [rule]).modified
 
 
 def delete_tag(notes: list[Note], vault_root: Path, tag: str) -> int:
     """Remove a tag from all notes."""
-    tag = tag.lower().strip()
-    modified = 0
-    for note in notes:
-        if tag in note.tags:
-            _remove_tag_from_note(note, vault_root, tag)
-            modified += 1
-    return modified
+    return apply_rules(notes, vault_root, [DeleteRule(tag)]).modified
 
 
 def add_tag_to_notes(
     notes: list[Note], vault_root: Path, tag: str, target_notes: list[Note]
 ) -> int:
     """Add a tag to a specific set of notes."""
-    tag = tag.lower().strip()
-    modified = 0
-    for note in target_notes:
-        if tag not in note.tags:
-            _add_tag_to_note(note, vault_root, tag)
-            modified += 1
-    return modified
+    rule = AddRule(tag, frozenset(n.path for n in target_notes))
+    return apply_rules(target_notes, vault_root, [rule]).modified
+
+
+def _map_tags(fm_tags: list[str], compiled: CompiledRules, path: Path) -> list[str]:
+    """Run one note's frontmatter tags through the compiled mapping."""
+    updated: list[str] = []
+    seen: set[str] = set()
+
+    def emit(tag: str) -> None:
+        if tag.lower() not in seen:
+            seen.add(tag.lower())
+            updated.append(tag)
 
+    for t in fm_tags:
+        for out in compiled.mapping.get(t.lower(), (t,)):
+            emit(out)
+    for tags, paths in compiled.adds:
+        if paths is None or path in paths:
+            for out in tags:
+                emit(out)
+    return updated
 
-def _replace_tag_in_note(
-    note: Note, vault_root: Path, old_tag: str, new_tag: str
+
+def _count_rule_matches(
+    rules: list[Rule], note: Note, fm_tags: list[str], per_rule: list[int]
 ) -> None:
-    """Replace a tag in the note's frontmatter."""
-    fm = dict(note.frontmatter)
-    tags = _get_fm_tags(fm)
-    updated = []
-    seen = set()
-    for t in tags:
-        replacement = new_tag if t.lower() == old_tag else t.lower()
-        if replacement not in seen:
-            updated.append(replacement)
-            seen.add(replacement)
-    fm["tags"] = updated
+    """Replay *rules* on an in-memory tag set to see which ones hit *note*."""
+    current = {t.lower() for t in fm_tags}
+    for i, rule in enumerate(rules):
+        if isinstance(rule, RenameRule):
+            old = _clean(rule.old)
+            if old in current:
+                per_rule[i] += 1
+                current = (current - {old}) | {_clean(rule.new)}
+        elif isinstance(rule, MergeRule):
+            overlap = current & {_clean(t) for t in rule.sources}
+            if overlap:
+                per_rule[i] += 1
+                current = (current - overlap) | {_clean(rule.target)}
+        elif isinstance(rule, DeleteRule):
+            tag = _clean(rule.tag)
+            if tag in current:
+                per_rule[i] += 1
+                current.discard(tag)
+        elif isinstance(rule, AddRule):
+            tag = _clean(rule.tag)
+            if (rule.paths is None or note.path in rule.paths) and tag not in current:
+                per_rule[i] += 1
+                current.add(tag)
+
+
+def _with_tags(frontmatter: dict, new_fm_tags: list[str]) -> dict:
+    """Copy of *frontmatter* carrying the new tag list."""
+    fm = dict(frontmatter)
+    fm["tags"] = new_fm_tags
     # Clean up legacy key
     fm.pop("tag", None)
-    write_frontmatter(note, vault_root, fm)
-    note.frontmatter = fm
-    note.tags = sorted(set(updated))
+    return fm
 
 
-def _remove_tag_from_note(note: Note, vault_root: Path, tag: str) -> None:
-    """Remove a tag from the note's frontmatter."""
-    fm = dict(note.frontmatter)
-    tags = _get_fm_tags(fm)
-    updated = [t for t in tags if t.lower() != tag]
-    fm["tags"] = updated
-    fm.pop("tag", None)
-    write_frontmatter(note, vault_root, fm)
-    note.frontmatter = fm
-    note.tags = sorted(set(updated))
-
-
-def _add_tag_to_note(note: Note, vault_root: Path, tag: str) -> None:
-    """Add a tag to the note's frontmatter."""
-    fm = dict(note.frontmatter)
-    tags = _get_fm_tags(fm)
-    if tag not in [t.lower() for t in tags]:
-        tags.append(tag)
-    fm["tags"] = tags
-    fm.pop("tag", None)
-    write_frontmatter(note, vault_root, fm)
-    note.frontmatter = fm
-    note.tags = sorted(set(tags))
+def _rewrite_list(
+    current: list[str], sources: set[str], outputs: list[str]
+) -> list[str]:
+    updated: list[str] = []
+    for tag in current:
+        for out in outputs if tag in sources else (tag,):
+            if out not in updated:
+                updated.append(out)
+    return updated
+
+
+def _clean(tag: str) -> str:
+    return tag.lower().strip()
 
 
 def _get_fm_tags(fm: dict) -> list[str]:
     """Extract tag list from frontmatter, handling various formats."""
     tags = fm.get("tags") or fm.get("tag") or []
     if isinstance(tags, str):
-        import re
         tags = [t.strip() for t in re.split(r"[,\s]+", tags) if t.strip()]
-    return list(tags)
+    return [str(t) for t in tags]
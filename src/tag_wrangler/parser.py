@@ -2,36 +2,141 @@
 
 from __future__ import annotations
 
+import contextlib
+import io
+import os
 import re
+import stat
+import tempfile
+from collections.abc import Iterable
 from pathlib import Path
 
 import frontmatter
+import yaml
 
-from tag_wrangler.models import Note
+from tag_wrangler import fmparse, perf
+from tag_wrangler.fmpatch import patch_tags
+from tag_wrangler.models import Note, intern_tags
 
 
 # Matches inline #tags (but not headings or anchors)
-INLINE_TAG_RE = re.compile(
-    r"(?:^|(?<=\s))#([A-Za-z][A-Za-z0-9_/\-]*)", re.MULTILINE
-)
+INLINE_TAG_RE = re.compile(r"(?:^|(?<=\s))#([A-Za-z][A-Za-z0-9_/\-]*)", re.MULTILINE)
+
+# What parsing a malformed note raises: YAML syntax errors, values YAML
+# cannot construct (such as impossible dates) and frontmatter keys
+# python-frontmatter rejects
+PARSE_ERRORS = (yaml.YAMLError, ValueError, TypeError)
+
+# A YAML frontmatter fence line, as python-frontmatter recognises it
+FM_FENCE_RE = re.compile(r"^-{3,}\s*$")
 
 
 def parse_note(path: Path, vault_root: Path) -> Note:
     """Parse a single markdown file into a Note."""
     text = path.read_text(encoding="utf-8", errors="replace")
-    post = frontmatter.loads(text)
+    return parse_note_text(text, path, vault_root)
 
-    fm = dict(post.metadata) if post.metadata else {}
-    body = post.content
 
-    # Collect tags from frontmatter
-    fm_tags = _extract_frontmatter_tags(fm)
+def parse_note_bytes(data: bytes, path: Path, vault_root: Path) -> Note:
+    """Parse raw file bytes (already read by the caller) into a Note."""
+    return parse_note_text(decode_text(data), path, vault_root)
+
 
-    # Collect inline tags from body
+@perf.timed("parse.note")
+def parse_note_text(text: str, path: Path, vault_root: Path) -> Note:
+    """Parse the decoded contents of *path* into a Note."""
+    fm, body = fmparse.loads(text)
     inline_tags = INLINE_TAG_RE.findall(body)
+    return _build_note(path, vault_root, fm, inline_tags, body)
+
+
+def parse_note_lazy(path: Path, vault_root: Path) -> Note:
+    """Parse only the frontmatter of *path*; the body is streamed, not kept.
+
+    Inline tags are collected line by line while reading, so the returned
+    Note has ``body=None``. Use :func:`load_body` to fetch it on demand.
+    """
+    with path.open(encoding="utf-8", errors="replace") as fh:
+        return parse_note_lines(fh, path, vault_root)
+
+
+def parse_note_bytes_lazy(data: bytes, path: Path, vault_root: Path) -> Note:
+    """Like :func:`parse_note_lazy` for bytes already read by the caller."""
+    return parse_note_lines(io.StringIO(decode_text(data)), path, vault_root)
+
+
+@perf.timed("parse.note_lazy")
+def parse_note_lines(lines: Iterable[str], path: Path, vault_root: Path) -> Note:
+    """Parse a stream of lines, keeping the frontmatter but not the body.
+
+    Produces the same frontmatter and tags as :func:`parse_note_text`.
+    """
+    it = iter(lines)
+    first = ""
+    for line in it:
+        if line.strip():
+            first = line.strip()
+            break
+
+    if not FM_FENCE_RE.match(first):
+        if first.startswith(("+++", "{")):
+            # TOML / JSON frontmatter: rare enough to take the full path
+            rest = "".join(it)
+            note = parse_note_text(first + "\n" + rest, path, vault_root)
+            note.body = None
+            return note
+        inline_tags = INLINE_TAG_RE.findall(first)
+        for line in it:
+            inline_tags.extend(INLINE_TAG_RE.findall(line))
+        return _build_note(path, vault_root, {}, inline_tags, None)
+
+    header: list[str] = []
+    closed = False
+    for line in it:
+        if not header and not line.strip():
+            # python-frontmatter's fence pattern (---\s*$) also takes any
+            # whitespace-only lines after the opening fence, tabs included
+            continue
+        if FM_FENCE_RE.match(line.rstrip("\n")):
+            closed = True
+            break
+        header.append(line)
+
+    if not closed:
+        # No closing fence: python-frontmatter treats everything as body
+        inline_tags = INLINE_TAG_RE.findall(first)
+        for line in header:
+            inline_tags.extend(INLINE_TAG_RE.findall(line))
+        return _build_note(path, vault_root, {}, inline_tags, None)
+
+    fm = fmparse.load_header("".join(header))
+    inline_tags = []
+    for line in it:
+        inline_tags.extend(INLINE_TAG_RE.findall(line))
+    return _build_note(path, vault_root, fm, inline_tags, None)
+
+
+def load_body(note: Note, vault_root: Path) -> str:
+    """Return the note body, reading it from disk if it was not kept."""
+    if note.body is not None:
+        return note.body
+    text = (vault_root / note.path).read_text(encoding="utf-8", errors="replace")
+    perf.count("files_read")
+    return fmparse.loads(text)[1]
+
+
+def _build_note(
+    path: Path,
+    vault_root: Path,
+    fm: dict,
+    inline_tags: list[str],
+    body: str | None,
+) -> Note:
+    # Collect tags from frontmatter
+    fm_tags = _extract_frontmatter_tags(fm)
 
-    # Normalise: lowercase, strip leading #, deduplicate, sort
-    all_tags = sorted(set(_normalise(t) for t in fm_tags + inline_tags))
+    # Normalise: lowercase, strip leading #, deduplicate, sort, intern
+    all_tags = intern_tags(normalise_tag(t) for t in fm_tags + inline_tags)
 
     rel = path.relative_to(vault_root)
     title = fm.get("title", path.stem)
@@ -45,6 +150,12 @@ def parse_note(path: Path, vault_root: Path) -> Note:
     )
 
 
+def decode_text(data: bytes) -> str:
+    """Decode file bytes the same way ``Path.read_text`` does."""
+    text = data.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
 def _extract_frontmatter_tags(fm: dict) -> list[str]:
     """Pull tags from common frontmatter keys."""
     raw: list[str] = []
@@ -60,17 +171,68 @@ def _extract_frontmatter_tags(fm: dict) -> list[str]:
     return [t.strip() for t in raw if t.strip()]
 
 
-def _normalise(tag: str) -> str:
+def normalise_tag(tag: str) -> str:
     """Lowercase and strip leading # from a tag."""
     return tag.lstrip("#").lower().strip()
 
 
-def write_frontmatter(
-    note: Note, vault_root: Path, new_frontmatter: dict
-) -> None:
-    """Write updated frontmatter back to disk (preserves body)."""
+@perf.timed("write.frontmatter")
+def write_frontmatter(note: Note, vault_root: Path, new_frontmatter: dict) -> str:
+    """Write updated frontmatter back to disk (preserves body).
+
+    Returns the body as found on disk, so callers can refresh inline tags.
+    """
     full_path = vault_root / note.path
     text = full_path.read_text(encoding="utf-8", errors="replace")
+    out, body = render_frontmatter(text, new_frontmatter, note.frontmatter)
+    atomic_write_text(full_path, out)
+    perf.count("files_written")
+    perf.count("bytes_written", len(out.encode("utf-8")))
+    return body
+
+
+def render_frontmatter(
+    text: str, new_frontmatter: dict, old_frontmatter: dict | None = None
+) -> tuple[str, str]:
+    """Replace the frontmatter of note *text*; returns (new text, body).
+
+    When *old_frontmatter* (what *text* was parsed to) is given and only the
+    tags changed, just the tags entry is patched (see :mod:`tag_wrangler.fmpatch`);
+    otherwise the whole frontmatter is re-serialised.
+    """
+    if old_frontmatter is not None:
+        patched = patch_tags(text, old_frontmatter, new_frontmatter)
+        if patched is not None:
+            perf.count("fm_patched")
+            return patched
+    perf.count("fm_serialised")
     post = frontmatter.loads(text)
     post.metadata = new_frontmatter
-    full_path.write_text(frontmatter.dumps(post), encoding="utf-8")
+    return frontmatter.dumps(post), post.content
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write *text* to *path* via a temp file renamed into place.
+
+    Readers (Obsidian, the watcher) see either the old or the new file,
+    never a half-written one. The temp file is hidden, so it never shows
+    up in a scan. Symlinked notes are written through to their target.
+    """
+    if path.is_symlink():
+        path = Path(os.path.realpath(path))
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        with contextlib.suppress(FileNotFoundError):
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def inline_tags(body: str) -> list[str]:
+    """Normalised inline #tags found in *body*."""
+    return [normalise_tag(t) for t in INLINE_TAG_RE.findall(body)]
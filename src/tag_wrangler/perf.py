@@ -0,0 +1,122 @@
+"""Lightweight timing spans and counters for the main pipeline stages.
+
+Spans and counters are aggregated process-wide (count, total and max time
+per span name; a running total per counter) and cost a couple of
+``perf_counter`` calls each, so they stay on all the time. Set
+``TAG_WRANGLER_PERF_LOG`` to a file path (or call :func:`emit_to`) to also
+append every finished span as a JSON line.
+
+Work done inside worker processes is not seen here; the parent records
+the files and bytes it hands them instead.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import IO, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+
+@dataclasses.dataclass
+class SpanStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+
+_lock = threading.Lock()
+_spans: dict[str, SpanStats] = {}
+_counters: dict[str, int] = {}
+_sink: IO[str] | None = None
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block under *name*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            stats = _spans.get(name)
+            if stats is None:
+                stats = _spans[name] = SpanStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            if _sink is not None:
+                _sink.write(
+                    json.dumps(
+                        {"span": name, "seconds": elapsed, "ts": time.time()},
+                        separators=(",", ":"),
+                    )
+                    + "\n"
+                )
+                _sink.flush()
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator form of :func:`span` for whole functions."""
+
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add *n* to the counter *name* (files read, bytes written, ...)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot() -> dict:
+    """Copy of every span and counter recorded since the last reset."""
+    with _lock:
+        return {
+            "spans": {k: dataclasses.asdict(v) for k, v in _spans.items()},
+            "counters": dict(_counters),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def emit_to(path: str | os.PathLike | None) -> None:
+    """Append finished spans as JSON lines to *path* (None stops emitting)."""
+    global _sink
+    with _lock:
+        if _sink is not None:
+            _sink.close()
+        _sink = open(path, "a", encoding="utf-8") if path else None  # noqa: SIM115
+
+
+def write_snapshot(fh: IO[str]) -> None:
+    """Write the current aggregates to *fh* as JSON lines."""
+    data = snapshot()
+    ts = time.time()
+    for name, stats in data["spans"].items():
+        fh.write(json.dumps({"span": name, **stats, "ts": ts}) + "\n")
+    for name, value in data["counters"].items():
+        fh.write(json.dumps({"counter": name, "value": value, "ts": ts}) + "\n")
+
+
+if os.environ.get("TAG_WRANGLER_PERF_LOG"):
+    emit_to(os.environ["TAG_WRANGLER_PERF_LOG"])
@@ -0,0 +1,265 @@
+"""Boolean tag queries evaluated over per-tag note postings.
+
+A query combines tags with ``AND``, ``OR``, ``NOT`` and parentheses, e.g.
+``project/* AND NOT archive OR todo``. ``NOT`` binds tightest, then
+``AND``, then ``OR``. A tag containing ``*`` or ``?`` is a glob over tag
+names; ``project/*`` matches every tag nested under ``project``.
+
+:meth:`TagBitmaps.select` works on the tags' postings as sets: its cost
+follows the postings a query touches and the size of the result, not the
+number of notes in the vault. :meth:`TagBitmaps.evaluate` returns the
+same answer as a bitmap (a Python int with bit *i* set for note ID *i*);
+every bitmap spans the whole vault, so each operation on one is
+O(notes / 8).
+"""
+
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import fnmatch
+import re
+
+from tag_wrangler.models import TagIndex
+
+_TOKEN_RE = re.compile(r"\s*(\(|\)|[^\s()]+)")
+_KEYWORDS = {"AND", "OR", "NOT"}
+
+
+class QueryError(ValueError):
+    """Raised for a tag query that cannot be parsed."""
+
+
+@dataclasses.dataclass(frozen=True)
+class Tag:
+    pattern: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Not:
+    operand: Query
+
+
+@dataclasses.dataclass(frozen=True)
+class And:
+    operands: tuple[Query, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class Or:
+    operands: tuple[Query, ...]
+
+
+Query = Tag | Not | And | Or
+
+
+def parse_query(text: str) -> Query:
+    """Parse *text* into a query tree (raises :class:`QueryError`)."""
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        raise QueryError("Empty query")
+    parser = _Parser(tokens)
+    query = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise QueryError(f"Unexpected {tokens[parser.pos]!r}")
+    return query
+
+
+class _Parser:
+    """Recursive-descent parser over the token list."""
+
+    def __init__(self, tokens: list[str]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> str | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def keyword(self, word: str) -> bool:
+        token = self.peek()
+        if token is not None and token.upper() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def parse_or(self) -> Query:
+        operands = [self.parse_and()]
+        while self.keyword("OR"):
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def parse_and(self) -> Query:
+        operands = [self.parse_not()]
+        while self.keyword("AND"):
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def parse_not(self) -> Query:
+        if self.keyword("NOT"):
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self) -> Query:
+        token = self.peek()
+        if token is None:
+            raise QueryError("Query ends unexpectedly")
+        self.pos += 1
+        if token == "(":
+            query = self.parse_or()
+            if self.peek() != ")":
+                raise QueryError("Missing closing parenthesis")
+            self.pos += 1
+            return query
+        if token == ")" or token.upper() in _KEYWORDS:
+            raise QueryError(f"Expected a tag, got {token!r}")
+        return Tag(token.lstrip("#").lower())
+
+
+class TagBitmaps:
+    """Tag queries over a :class:`TagIndex`, with bitmaps built on first use.
+
+    Queries and bitmaps are derived from the index's postings; build a new
+    instance whenever the index changes.
+    """
+
+    def __init__(self, tag_index: TagIndex) -> None:
+        self.tag_index = tag_index
+        self.n_notes = len(tag_index.paths)
+        self.universe = (1 << self.n_notes) - 1
+        self._names = sorted(tag_index)
+        self._bitmaps: dict[str, int] = {}
+
+    def bitmap(self, tag: str) -> int:
+        """Bitmap of the notes carrying exactly *tag* (0 if unknown)."""
+        bits = self._bitmaps.get(tag)
+        if bits is None:
+            info = self.tag_index.get(tag)
+            bits = ids_to_bits(info.postings, self.n_notes) if info else 0
+            self._bitmaps[tag] = bits
+        return bits
+
+    def expand(self, pattern: str) -> list[str]:
+        """Tag names matched by a (possibly glob) *pattern*."""
+        if not any(c in pattern for c in "*?["):
+            return [pattern] if pattern in self.tag_index else []
+        literal = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        # Only names sharing the literal prefix can match
+        lo = bisect.bisect_left(self._names, literal)
+        hi = lo
+        while hi < len(self._names) and self._names[hi].startswith(literal):
+            hi += 1
+        return fnmatch.filter(self._names[lo:hi], pattern)
+
+    def evaluate(self, query: Query | str) -> int:
+        """Bitmap of the notes matching *query*, at O(notes / 8) per operation."""
+        if isinstance(query, str):
+            query = parse_query(query)
+        if isinstance(query, Tag):
+            bits = 0
+            for tag in self.expand(query.pattern):
+                bits |= self.bitmap(tag)
+            return bits
+        if isinstance(query, Not):
+            return self.universe & ~self.evaluate(query.operand)
+        if isinstance(query, And):
+            bits = self.universe
+            for operand in query.operands:
+                bits &= self.evaluate(operand)
+                if not bits:
+                    break
+            return bits
+        bits = 0
+        for operand in query.operands:
+            bits |= self.evaluate(operand)
+        return bits
+
+    def select(self, query: Query | str) -> list[int]:
+        """Note IDs matching *query*, ascending.
+
+        Costs the postings the query touches plus the result, except that a
+        query matching everything but some notes (``NOT archive``, or
+        ``todo OR NOT archive``) has to list the whole vault.
+        """
+        if isinstance(query, str):
+            query = parse_query(query)
+        ids, complement = self._ids(query)
+        if complement:
+            return [i for i in range(self.n_notes) if i not in ids]
+        return sorted(ids)
+
+    def _ids(
+        self, query: Query, within: set[int] | None = None
+    ) -> tuple[set[int], bool]:
+        """``(ids, complement)``: *query* matches *ids*, or all notes but them.
+
+        Given *within*, only those notes are considered and the answer is
+        never a complement.
+        """
+        if isinstance(query, Tag):
+            postings = [self.tag_index[t].postings for t in self.expand(query.pattern)]
+            if within is not None and len(within) * 16 < sum(map(len, postings)):
+                # Few candidates left: probe the sorted postings for each
+                return {i for i in within if any(_has(p, i) for p in postings)}, False
+            ids = set().union(*postings)
+            return (ids if within is None else ids & within), False
+        if isinstance(query, Not):
+            ids, complement = self._ids(query.operand, within)
+            if within is not None:
+                return within - ids, False
+            return ids, not complement
+        if isinstance(query, And):
+            ids, excluded = within, []
+            # Narrow from the smallest operand, so the candidates only shrink
+            for operand in sorted(query.operands, key=self._size):
+                part, complement = self._ids(operand, ids)
+                if complement:
+                    excluded.append(part)
+                else:
+                    ids = part
+                    if not ids:
+                        break
+            if ids is None:
+                # NOT a AND NOT b == NOT (a OR b)
+                return set().union(*excluded), True
+            return ids.difference(*excluded), False
+        parts = [self._ids(operand, within) for operand in query.operands]
+        plain = [ids for ids, complement in parts if not complement]
+        negated = sorted((ids for ids, complement in parts if complement), key=len)
+        if not negated:
+            return set().union(*plain), False
+        # a OR NOT b OR NOT c == NOT ((b AND c) minus a)
+        return negated[0].intersection(*negated[1:]).difference(*plain), True
+
+    def _size(self, query: Query) -> int:
+        """Upper bound on the notes *query* matches, from posting lengths."""
+        if isinstance(query, Tag):
+            return sum(self.tag_index[t].count for t in self.expand(query.pattern))
+        if isinstance(query, Not):
+            return self.n_notes
+        sizes = [self._size(operand) for operand in query.operands]
+        return min(sizes) if isinstance(query, And) else sum(sizes)
+
+
+def _has(postings, note_id: int) -> bool:
+    """True if sorted *postings* contain *note_id*."""
+    k = bisect.bisect_left(postings, note_id)
+    return k < len(postings) and postings[k] == note_id
+
+
+def ids_to_bits(ids, n_bits: int) -> int:
+    """Pack note IDs into an int bitmap of *n_bits* bits."""
+    buf = bytearray((n_bits + 7) // 8)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def bits_to_ids(bits: int) -> list[int]:
+    """Unpack an int bitmap into its set bit positions, ascending."""
+    ids = []
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    # Zero bytes are skipped by the regex engine, not in Python
+    for m in re.finditer(rb"[^\x00]", raw):
+        byte, base = raw[m.start()], m.start() * 8
+        ids.extend(base + b for b in range(8) if byte >> b & 1)
+    return ids
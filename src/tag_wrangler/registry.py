@@ -0,0 +1,231 @@
+"""Process-wide registry of loaded vaults, shared between app sessions.
+
+Every browser session of the Streamlit app runs in the same server
+process. Rather than each session scanning and holding its own copy of a
+vault, sessions hold a :class:`SharedVault` from the :data:`REGISTRY`:
+one set of notes, tag index, scan cache and derived-result cache per
+vault. Writes go through the vault's :class:`RWLock` and bump the shared
+result generation, so every other session sees them on its next rerun
+without rescanning.
+
+A session holds a vault until it releases it (by loading another) or
+stops showing up: sessions are never told when a browser tab closes, so a
+holder that has not touched the vault within the idle timeout is dropped.
+A vault nobody has held for that long is evicted.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from tag_wrangler.cache import ScanCache
+from tag_wrangler.memo import ResultCache
+from tag_wrangler.models import Note, TagIndex
+from tag_wrangler.snapshot import Snapshot
+from tag_wrangler.vault import build_tag_index
+
+# Seconds a session may go unseen before its hold lapses, and an unheld
+# vault may stay loaded before it is evicted
+IDLE_TIMEOUT = 30 * 60
+
+# Derived results (analyzer output, DataFrames, matrices) kept per vault
+RESULT_CACHE_SIZE = 64
+
+
+class RWLock:
+    """Readers-writer lock: many readers, or one writer.
+
+    A waiting writer keeps new readers out, so writes are not starved.
+    Both sides are re-entrant per thread, and the writer may also read;
+    taking the write lock while holding only a read lock would deadlock
+    and raises ``RuntimeError`` instead.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer: int | None = None
+        self._writes = 0
+        self._waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        depth = getattr(self._local, "reads", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.reads = depth + 1
+            try:
+                yield
+            finally:
+                self._local.reads = depth
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.reads = 1
+        try:
+            yield
+        finally:
+            self._local.reads = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        me = threading.get_ident()
+        if self._writer != me:
+            if getattr(self._local, "reads", 0):
+                raise RuntimeError("Cannot take the write lock while reading")
+            with self._cond:
+                self._waiting += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting -= 1
+                self._writer = me
+        self._writes += 1
+        try:
+            yield
+        finally:
+            self._writes -= 1
+            if not self._writes:
+                with self._cond:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+@dataclasses.dataclass(eq=False)
+class SharedVault:
+    """One loaded vault as every session sees it.
+
+    Read ``notes`` and ``tag_index`` under ``lock.read()``; change them
+    (and bump ``results``) only under ``lock.write()``. ``notes`` is
+    updated in place, while ``tag_index`` may be replaced by a rebuild.
+
+    A vault opened from its ``snapshot`` starts with no notes: the tag
+    index and tag-level results come from the snapshot until the notes
+    are loaded, after which ``snapshot`` is cleared.
+    """
+
+    root: Path
+    lazy_body: bool
+    notes: list[Note]
+    tag_index: TagIndex
+    cache: ScanCache | None = None
+    results: ResultCache = dataclasses.field(
+        default_factory=lambda: ResultCache(maxsize=RESULT_CACHE_SIZE)
+    )
+    lock: RWLock = dataclasses.field(default_factory=RWLock)
+    snapshot: Snapshot | None = None
+    holders: dict[str, float] = dataclasses.field(default_factory=dict)
+    idle_since: float = dataclasses.field(default_factory=time.monotonic)
+
+    @property
+    def key(self) -> tuple[Path, bool]:
+        return self.root, self.lazy_body
+
+    @property
+    def refs(self) -> int:
+        return len(self.holders)
+
+    @classmethod
+    def from_notes(
+        cls, root: Path, lazy_body: bool, notes: list[Note], cache: ScanCache | None
+    ) -> SharedVault:
+        return cls(root.resolve(), lazy_body, notes, build_tag_index(notes), cache)
+
+    def reindex(self) -> None:
+        """Rebuild the tag index from ``notes`` (after notes were added or removed)."""
+        self.tag_index = build_tag_index(self.notes)
+
+
+class VaultRegistry:
+    """Shared vaults keyed by resolved path (and body mode), with holders."""
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT) -> None:
+        self.idle_timeout = idle_timeout
+        self._vaults: dict[tuple[Path, bool], SharedVault] = {}
+        self._loading: dict[tuple[Path, bool], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._vaults)
+
+    def vaults(self) -> list[SharedVault]:
+        with self._lock:
+            return list(self._vaults.values())
+
+    def get(self, root: Path, lazy_body: bool = False) -> SharedVault | None:
+        with self._lock:
+            return self._vaults.get((root.resolve(), lazy_body))
+
+    def acquire(
+        self,
+        session: str,
+        root: Path,
+        load: Callable[[], SharedVault | None],
+        lazy_body: bool = False,
+    ) -> SharedVault | None:
+        """Hold the shared vault at *root*, loading it with *load* if needed.
+
+        *load* builds the vault (or returns None if it has no notes) and
+        runs at most once per vault even when several sessions ask at the
+        same time. Returns None, holding nothing, if *load* does.
+        """
+        key = (root.resolve(), lazy_body)
+        self.evict_idle()
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                vault = self._vaults.get(key)
+            if vault is None:
+                vault = load()
+                if vault is None:
+                    return None
+            return self.hold(session, vault)
+
+    def hold(self, session: str, vault: SharedVault) -> SharedVault:
+        """Mark *session* as (still) using *vault*; call on every rerun.
+
+        A vault evicted while the session was away is registered again.
+        If another copy of it has been loaded meanwhile, the session is
+        moved over to that one, which is returned.
+        """
+        with self._lock:
+            vault = self._vaults.setdefault(vault.key, vault)
+            vault.holders[session] = time.monotonic()
+            return vault
+
+    def release(self, session: str, vault: SharedVault) -> None:
+        with self._lock:
+            if vault.holders.pop(session, None) is not None and not vault.holders:
+                vault.idle_since = time.monotonic()
+
+    def evict_idle(self) -> list[Path]:
+        """Drop lapsed holders, then vaults left unheld too long. Returns their roots."""
+        now = time.monotonic()
+        evicted: list[Path] = []
+        with self._lock:
+            for key, vault in list(self._vaults.items()):
+                for session, seen in list(vault.holders.items()):
+                    if now - seen > self.idle_timeout:
+                        del vault.holders[session]
+                        if not vault.holders:
+                            vault.idle_since = seen
+                if not vault.holders and now - vault.idle_since > self.idle_timeout:
+                    del self._vaults[key]
+                    self._loading.pop(key, None)
+                    evicted.append(vault.root)
+        return evicted
+
+
+# The registry shared by every session of this process
+REGISTRY = VaultRegistry()
@@ -0,0 +1,281 @@
+"""Sharded scanning of large or multi-root vaults.
+
+A vault (or several) is split into :class:`Shard` s, each one folder of
+one root: a top-level folder with everything under it, or just the notes
+directly inside a folder. Shards are scanned in separate processes, each
+through a scan cache of its own, and each produces a picklable
+:class:`ShardIndex`. A :class:`PartialIndex` is a set of disjoint shard
+indexes; partials merge associatively (``a | b``), and the full tag index
+and vault statistics are derived from whatever shards a partial holds.
+When one part of a vault changes, rescan just that shard and put it back
+with :meth:`PartialIndex.replace`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import os
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tag_wrangler import fmparse, perf
+from tag_wrangler.analyzer import stats_from_counts
+from tag_wrangler.cache import ScanCache
+from tag_wrangler.models import Note, TagIndex, TagInfo
+from tag_wrangler.vault import scan_vault
+
+
+@dataclasses.dataclass(frozen=True, order=True)
+class Shard:
+    """One folder of one vault root.
+
+    ``folder`` is vault-relative (``"."`` for the root). A recursive shard
+    covers the whole subtree; otherwise only the notes directly inside the
+    folder, with its subfolders left to shards of their own.
+    """
+
+    root: Path
+    folder: str = "."
+    recursive: bool = True
+
+    @property
+    def name(self) -> str:
+        return self.folder + ("/**" if self.recursive else "/*")
+
+    def __str__(self) -> str:
+        return f"{self.root}:{self.name}"
+
+    def contains(self, rel: str) -> bool:
+        """Whether the vault-relative POSIX path *rel* belongs to this shard."""
+        parent = rel.rpartition("/")[0] or "."
+        if not self.recursive:
+            return parent == self.folder
+        if self.folder == "." or parent == self.folder:
+            return True
+        return parent.startswith(self.folder + "/")
+
+
+@dataclasses.dataclass
+class ShardIndex:
+    """Scan result of one shard: its notes and per-tag postings into them."""
+
+    shard: Shard
+    notes: list[Note]
+    tags: dict[str, array]  # tag -> positions in notes, ascending
+
+    @classmethod
+    def from_notes(cls, shard: Shard, notes: list[Note]) -> ShardIndex:
+        tags: dict[str, array] = {}
+        for i, note in enumerate(notes):
+            for tag in note.tags:
+                postings = tags.get(tag)
+                if postings is None:
+                    postings = tags[tag] = array("I")
+                postings.append(i)
+        return cls(shard, notes, tags)
+
+
+@dataclasses.dataclass
+class PartialIndex:
+    """Index over a set of disjoint shards; merge partials with ``|``."""
+
+    shards: dict[Shard, ShardIndex] = dataclasses.field(default_factory=dict)
+
+    def merge(self, other: PartialIndex) -> PartialIndex:
+        overlap = self.shards.keys() & other.shards.keys()
+        if overlap:
+            raise ValueError(f"Shards indexed twice: {', '.join(map(str, overlap))}")
+        return PartialIndex({**self.shards, **other.shards})
+
+    __or__ = merge
+
+    def replace(self, part: ShardIndex | PartialIndex) -> PartialIndex:
+        """Copy with *part*'s shards swapped in (e.g. after a rescan)."""
+        parts = part.shards if isinstance(part, PartialIndex) else {part.shard: part}
+        return PartialIndex({**self.shards, **parts})
+
+    def rescan(self, shard: Shard, **kwargs) -> PartialIndex:
+        """Copy with *shard* scanned afresh; *kwargs* go to :func:`scan_shard`."""
+        return self.replace(scan_shard(shard, **kwargs))
+
+    def shard_of(self, root: Path, rel: str) -> Shard | None:
+        """The shard holding vault-relative path *rel* of *root*, if any."""
+        root = root.resolve()
+        matches = [s for s in self.shards if s.root == root and s.contains(rel)]
+        # A folder's own notes live in its non-recursive shard, not a parent's
+        return max(matches, key=lambda s: s.folder.count("/"), default=None)
+
+    def _ordered(self) -> list[ShardIndex]:
+        return [self.shards[s] for s in sorted(self.shards)]
+
+    def notes(self) -> list[Note]:
+        """Every note, shard by shard (in shard order, then path order)."""
+        return [note for part in self._ordered() for note in part.notes]
+
+    @perf.timed("shards.tag_index")
+    def tag_index(self) -> TagIndex:
+        """The full tag index, with note IDs as positions in :meth:`notes`.
+
+        With a single root, index paths are the notes' vault-relative paths
+        (as :func:`~tag_wrangler.vault.build_tag_index` makes them); across
+        several roots they are absolute, so equal relative paths stay apart.
+        """
+        parts = self._ordered()
+        multi_root = len({part.shard.root for part in parts}) > 1
+        paths = [
+            part.shard.root / note.path if multi_root else note.path
+            for part in parts
+            for note in part.notes
+        ]
+        index = TagIndex(paths)
+        offset = 0
+        for part in parts:
+            for tag, postings in part.tags.items():
+                info = index.get(tag)
+                if info is None:
+                    info = TagInfo(name=tag, id=index.next_tag_id, note_paths=paths)
+                    index.next_tag_id += 1
+                    index[tag] = info
+                if offset:
+                    info.postings.extend(p + offset for p in postings)
+                else:
+                    info.postings.extend(postings)
+            offset += len(part.notes)
+        return index
+
+    def stats(self) -> dict:
+        """Vault statistics, as :func:`~tag_wrangler.analyzer.vault_stats` gives.
+
+        Computed from per-shard tag counts, without building the tag index.
+        """
+        counts: Counter = Counter()
+        total_notes = notes_with_tags = 0
+        for part in self.shards.values():
+            total_notes += len(part.notes)
+            notes_with_tags += sum(1 for note in part.notes if note.tags)
+            for tag, postings in part.tags.items():
+                counts[tag] += len(postings)
+        return stats_from_counts(total_notes, notes_with_tags, counts)
+
+
+def plan_shards(root: Path, target: int | None = None) -> list[Shard]:
+    """Partition *root* into shards.
+
+    By default there is one recursive shard per top-level folder plus one
+    for the notes at the root. With *target*, any folder holding more than
+    *target* notes is split further: its own notes become one shard and
+    each subfolder is planned the same way.
+    """
+    root = root.resolve()
+    counts = _note_counts(root)
+    children: dict[str, list[str]] = {}
+    for folder in sorted(counts):
+        if folder != ".":
+            children.setdefault(folder.rpartition("/")[0] or ".", []).append(folder)
+    shards: list[Shard] = []
+
+    def plan(folder: str) -> None:
+        own, total = counts[folder]
+        if folder != "." and (target is None or total <= target):
+            shards.append(Shard(root, folder, recursive=True))
+            return
+        if own:
+            shards.append(Shard(root, folder, recursive=False))
+        for sub in children.get(folder, []):
+            plan(sub)
+
+    if counts:
+        plan(".")
+    return shards
+
+
+def _note_counts(root: Path) -> dict[str, tuple[int, int]]:
+    """Folder -> (notes directly inside, notes in the whole subtree).
+
+    Only folders with notes somewhere below them are listed.
+    """
+    counts: dict[str, tuple[int, int]] = {}
+    # os.walk is top-down, so a folder is counted before any folder below it
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        n = sum(1 for f in filenames if f.endswith(".md") and not f.startswith("."))
+        if not n:
+            continue
+        folder = Path(dirpath).relative_to(root).as_posix()
+        counts[folder] = (n, counts.get(folder, (0, 0))[1] + n)
+        while folder != ".":
+            folder = folder.rpartition("/")[0] or "."
+            own, total = counts.get(folder, (0, 0))
+            counts[folder] = (own, total + n)
+    return counts
+
+
+def scan_shard(
+    shard: Shard,
+    cache_dir: Path | None = None,
+    use_cache: bool = True,
+    lazy_body: bool = False,
+) -> ShardIndex:
+    """Scan one shard (through its own scan cache unless *use_cache* is off)."""
+    cache = (
+        ScanCache.for_vault(shard.root, cache_dir, shard=shard.name)
+        if use_cache
+        else None
+    )
+    notes = scan_vault(
+        shard.root,
+        cache=cache,
+        lazy_body=lazy_body,
+        folder=shard.folder,
+        recursive=shard.recursive,
+    )
+    if cache is not None:
+        try:
+            cache.save()
+        except OSError:
+            # A read-only cache dir only costs the next scan its speed-up
+            pass
+    return ShardIndex.from_notes(shard, notes)
+
+
+@perf.timed("shards.scan")
+def scan_sharded(
+    shards: Iterable[Shard],
+    workers: int | None = None,
+    cache_dir: Path | None = None,
+    use_cache: bool = True,
+    lazy_body: bool = False,
+) -> PartialIndex:
+    """Scan *shards* in up to *workers* processes (``None``: every core)."""
+    shards = list(shards)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(shards))
+    scan = functools.partial(
+        scan_shard, cache_dir=cache_dir, use_cache=use_cache, lazy_body=lazy_body
+    )
+    if workers <= 1:
+        parts = [scan(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=fmparse.set_backend,
+            initargs=(fmparse.get_backend(),),
+        ) as pool:
+            parts = list(pool.map(scan, shards))
+    perf.count("shards_scanned", len(parts))
+    return functools.reduce(
+        PartialIndex.merge, (PartialIndex({p.shard: p}) for p in parts), PartialIndex()
+    )
+
+
+def scan_roots(
+    roots: Sequence[Path], target: int | None = None, **kwargs
+) -> PartialIndex:
+    """Plan and scan every root in *roots*; *kwargs* go to :func:`scan_sharded`."""
+    shards = [shard for root in roots for shard in plan_shards(root, target)]
+    return scan_sharded(shards, **kwargs)
@@ -0,0 +1,377 @@
+"""Memory-mapped binary snapshot of a vault's tag index.
+
+Reopening a vault through the scan cache still unpickles a ``Note`` for
+every file and rebuilds the tag index from them. A snapshot, written
+after each scan, stores what the tag-level views need in flat arrays
+instead, and is opened with ``mmap``: tag counts, postings and the notes
+carrying a tag are read straight from the mapped file, and the tag
+index, :class:`~tag_wrangler.tables.VaultTables` and
+:class:`~tag_wrangler.cooccurrence.TagMatrix` are built from its arrays
+without any ``Note``. Full notes are only needed, and loaded through the
+scan cache, when something reads or writes them.
+
+A snapshot also records the file manifest (path, mtime, size) of the scan
+it came from; :func:`load_snapshot` only returns one that still matches
+the files on disk, so stale data is never served.
+
+Layout (native byte order, checked on open; every section 8-byte aligned)::
+
+    header    magic, version, byte-order mark, counts, section offsets
+    strings   UTF-8 blob + uint64 offsets: tags (sorted), files, titles
+    notes     uint32 file of each note; uint64 tag offsets per note;
+              uint32 tag IDs, in each note's tag order
+    tags      uint64 posting offsets per tag; uint32 note IDs, ascending
+    manifest  int64 mtime_ns and int64 size per file
+
+Files are the scanned markdown files in path order, including any that
+failed to parse; notes are the parsed ones in scan order.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from tag_wrangler import perf
+from tag_wrangler.cache import CacheEntry, default_cache_dir
+from tag_wrangler.models import Note, TagIndex, TagInfo
+
+MAGIC = b"TWSNAP\x00\x00"
+# Bump whenever the layout (or which files parse) changes
+SNAPSHOT_VERSION = 2
+_BOM = 0x01020304
+
+# magic, version, byte-order mark, notes, tags, files, then the offset of
+# each section (see _SECTIONS) and the end of the file
+_SECTIONS = (
+    "strings",
+    "string_offsets",
+    "note_files",
+    "note_offsets",
+    "note_tags",
+    "tag_offsets",
+    "postings",
+    "mtimes",
+    "sizes",
+)
+_HEADER = struct.Struct(f"=8sII3Q{len(_SECTIONS) + 1}Q")
+_TYPECODES = {
+    "string_offsets": "Q",
+    "note_files": "I",
+    "note_offsets": "Q",
+    "note_tags": "I",
+    "tag_offsets": "Q",
+    "postings": "I",
+    "mtimes": "q",
+    "sizes": "q",
+}
+
+
+def snapshot_path(vault_root: Path, cache_dir: Path | None = None) -> Path:
+    """Where the snapshot of *vault_root* lives (next to its scan cache)."""
+    key = hashlib.sha1(str(vault_root.resolve()).encode("utf-8")).hexdigest()[:16]
+    return (cache_dir or default_cache_dir()) / f"snapshot-{key}.bin"
+
+
+@perf.timed("snapshot.write")
+def write_snapshot(
+    path: Path, notes: Sequence[Note], manifest: Mapping[str, CacheEntry]
+) -> None:
+    """Atomically write the snapshot of *notes*.
+
+    *manifest* maps every scanned file (vault-relative POSIX path) to its
+    scan cache entry, as the scan that produced *notes* left it.
+    """
+    files = sorted(manifest)
+    file_ids = {rel: i for i, rel in enumerate(files)}
+    tag_names = sorted({t for note in notes for t in note.tags})
+    tag_ids = {name: i for i, name in enumerate(tag_names)}
+
+    note_files = array("I", (file_ids[n.path.as_posix()] for n in notes))
+    note_offsets = array("Q", [0])
+    note_tags = array("I")
+    postings_of: list[array] = [array("I") for _ in tag_names]
+    for i, note in enumerate(notes):
+        for tag in note.tags:
+            note_tags.append(tag_ids[tag])
+            postings_of[tag_ids[tag]].append(i)
+        note_offsets.append(len(note_tags))
+    tag_offsets = array("Q", [0])
+    postings = array("I")
+    for tag_postings in postings_of:
+        postings.extend(tag_postings)
+        tag_offsets.append(len(postings))
+
+    strings = bytearray()
+    string_offsets = array("Q", [0])
+    for s in (*tag_names, *files, *(n.title for n in notes)):
+        strings += s.encode("utf-8")
+        string_offsets.append(len(strings))
+
+    sections = {
+        "strings": bytes(strings),
+        "string_offsets": string_offsets,
+        "note_files": note_files,
+        "note_offsets": note_offsets,
+        "note_tags": note_tags,
+        "tag_offsets": tag_offsets,
+        "postings": postings,
+        "mtimes": array("q", (manifest[rel].mtime_ns for rel in files)),
+        "sizes": array("q", (manifest[rel].size for rel in files)),
+    }
+    offsets = []
+    position = _align(_HEADER.size)
+    for name in _SECTIONS:
+        offsets.append(position)
+        position = _align(position + memoryview(sections[name]).nbytes)
+    header = _HEADER.pack(
+        MAGIC,
+        SNAPSHOT_VERSION,
+        _BOM,
+        len(notes),
+        len(tag_names),
+        len(files),
+        *offsets,
+        position,
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header)
+            for name, offset in zip(_SECTIONS, offsets):
+                fh.write(b"\0" * (offset - fh.tell()))
+                fh.write(sections[name])
+            fh.write(b"\0" * (position - fh.tell()))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def load_snapshot(vault_root: Path, cache_dir: Path | None = None) -> Snapshot | None:
+    """The snapshot of *vault_root* if it exists and matches the files on disk."""
+    try:
+        snapshot = Snapshot.open(snapshot_path(vault_root, cache_dir))
+    except (OSError, ValueError):
+        return None
+    if not snapshot.is_fresh(vault_root):
+        snapshot.close()
+        return None
+    return snapshot
+
+
+class Snapshot:
+    """Read-only view of a snapshot file through ``mmap``."""
+
+    def __init__(self, path: Path, mapped: mmap.mmap) -> None:
+        self.path = path
+        self._mmap = mapped
+        if len(mapped) < _HEADER.size:
+            raise ValueError(f"Truncated snapshot: {path}")
+        magic, version, bom, *counts = _HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != SNAPSHOT_VERSION or bom != _BOM:
+            raise ValueError(f"Not a snapshot of this version and platform: {path}")
+        self.n_notes, self.n_tags, self.n_files = counts[:3]
+        bounds = counts[3:]
+        if bounds[-1] != len(mapped):
+            raise ValueError(f"Truncated snapshot: {path}")
+        self._buf = buf = memoryview(mapped)
+        self._sections: dict[str, memoryview] = {}
+        for name, start, end in zip(_SECTIONS, bounds, bounds[1:]):
+            section = buf[start:end]
+            code = _TYPECODES.get(name)
+            if code is not None:
+                size = struct.calcsize(code)
+                section = section[: len(section) // size * size].cast(code)
+            self._sections[name] = section
+        # Trim the alignment padding off each array
+        lengths = {
+            "string_offsets": self.n_tags + self.n_files + self.n_notes + 1,
+            "note_files": self.n_notes,
+            "note_offsets": self.n_notes + 1,
+            "tag_offsets": self.n_tags + 1,
+            "mtimes": self.n_files,
+            "sizes": self.n_files,
+        }
+        for name, length in lengths.items():
+            self._sections[name] = self._sections[name][:length]
+        sections = self._sections
+        sections["note_tags"] = sections["note_tags"][: sections["note_offsets"][-1]]
+        sections["postings"] = sections["postings"][: sections["tag_offsets"][-1]]
+        self._tag_names: list[str] | None = None
+        self._paths: list[Path] | None = None
+
+    @classmethod
+    def open(cls, path: Path) -> Snapshot:
+        with path.open("rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(path, mapped)
+        except ValueError:
+            mapped.close()
+            raise
+
+    def close(self) -> None:
+        """Unmap the file (views from :meth:`postings` must be released first)."""
+        for section in self._sections.values():
+            section.release()
+        self._sections.clear()
+        self._buf.release()
+        self._mmap.close()
+
+    # ---- Raw arrays (zero-copy views of the mapped file) ----
+
+    @property
+    def note_offsets(self) -> memoryview:
+        """``note_tags[note_offsets[i]:note_offsets[i + 1]]`` are note *i*'s tags."""
+        return self._sections["note_offsets"]
+
+    @property
+    def note_tags(self) -> memoryview:
+        """Tag IDs (positions in :attr:`tag_names`) of every note, back to back."""
+        return self._sections["note_tags"]
+
+    @property
+    def tag_offsets(self) -> memoryview:
+        return self._sections["tag_offsets"]
+
+    # ---- Tags ----
+
+    @property
+    def tag_names(self) -> list[str]:
+        """Every tag, sorted; a tag's ID is its position here."""
+        if self._tag_names is None:
+            self._tag_names = [self._string(i) for i in range(self.n_tags)]
+        return self._tag_names
+
+    def tag_id(self, tag: str) -> int | None:
+        names = self.tag_names
+        i = bisect.bisect_left(names, tag)
+        return i if i < len(names) and names[i] == tag else None
+
+    def tag_count(self, tag: str) -> int:
+        """Number of notes carrying *tag* (0 for an unknown tag)."""
+        i = self.tag_id(tag)
+        if i is None:
+            return 0
+        offsets = self.tag_offsets
+        return offsets[i + 1] - offsets[i]
+
+    def postings(self, tag: str) -> memoryview:
+        """IDs of the notes carrying *tag*, ascending (empty for an unknown tag)."""
+        i = self.tag_id(tag)
+        if i is None:
+            return self._sections["postings"][:0]
+        offsets = self.tag_offsets
+        return self._sections["postings"][offsets[i] : offsets[i + 1]]
+
+    def notes_by_tag(self, tag: str) -> list[Path]:
+        paths = self.paths
+        return [paths[i] for i in self.postings(tag)]
+
+    def note_tag_names(self, note_id: int) -> list[str]:
+        offsets, names = self.note_offsets, self.tag_names
+        return [
+            names[t] for t in self.note_tags[offsets[note_id] : offsets[note_id + 1]]
+        ]
+
+    # ---- Notes ----
+
+    @property
+    def paths(self) -> list[Path]:
+        """Vault-relative path of every note, by note ID."""
+        if self._paths is None:
+            base = self.n_tags
+            self._paths = [
+                Path(self._string(base + f)) for f in self._sections["note_files"]
+            ]
+        return self._paths
+
+    @property
+    def titles(self) -> list[str]:
+        base = self.n_tags + self.n_files
+        return [self._string(base + i) for i in range(self.n_notes)]
+
+    def tag_index(self) -> TagIndex:
+        """A :class:`~tag_wrangler.models.TagIndex` over the snapshot's notes.
+
+        Same tags, IDs and postings as ``build_tag_index`` on the scanned
+        notes; the postings are copied so the index can be updated.
+        """
+        paths = self.paths
+        index = TagIndex(paths)
+        names, offsets = self.tag_names, self.tag_offsets
+        postings = self._sections["postings"]
+        # Tag IDs follow first appearance, as build_tag_index numbers them
+        for t in dict.fromkeys(self.note_tags):
+            index[names[t]] = TagInfo(
+                name=names[t],
+                id=index.next_tag_id,
+                note_paths=paths,
+                postings=array("I", postings[offsets[t] : offsets[t + 1]].tobytes()),
+            )
+            index.next_tag_id += 1
+        return index
+
+    # ---- Validation ----
+
+    def manifest(self) -> dict[str, tuple[int, int]]:
+        """``{path: (mtime_ns, size)}`` of every file the scan saw."""
+        base = self.n_tags
+        mtimes, sizes = self._sections["mtimes"], self._sections["sizes"]
+        return {
+            self._string(base + i): (mtimes[i], sizes[i]) for i in range(self.n_files)
+        }
+
+    @perf.timed("snapshot.validate")
+    def is_fresh(self, vault_root: Path) -> bool:
+        """True if the markdown files under *vault_root* are exactly those
+        the snapshot was taken from, none changed since (by mtime and size)."""
+        return _disk_manifest(vault_root.resolve()) == self.manifest()
+
+    def _string(self, i: int) -> str:
+        offsets = self._sections["string_offsets"]
+        return bytes(self._sections["strings"][offsets[i] : offsets[i + 1]]).decode(
+            "utf-8"
+        )
+
+
+def _disk_manifest(root: Path) -> dict[str, tuple[int, int]]:
+    """``{path: (mtime_ns, size)}`` of the markdown files a scan would read.
+
+    Walks with ``os.scandir`` (hidden files and folders skipped, as in
+    :func:`~tag_wrangler.vault.iter_markdown_files`) and stats each file.
+    """
+    found: dict[str, tuple[int, int]] = {}
+    pending = [(root, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                pending.append((Path(entry.path), f"{prefix}{entry.name}/"))
+            elif entry.name.endswith(".md"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                found[prefix + entry.name] = (st.st_mtime_ns, st.st_size)
+    return found
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
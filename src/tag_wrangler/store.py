@@ -0,0 +1,297 @@
+"""SQLite-backed persistent vault index with a query API.
+
+The store keeps one row per note (path, folder, title, pickled frontmatter
+and the file's manifest stamp) plus normalised tag postings, so lookups
+such as "notes tagged X" or "tags under project/" are answered by indexed
+SQL instead of walking the in-memory note list. :meth:`VaultStore.sync`
+brings it up to date with the filesystem, re-parsing only changed files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+
+from tag_wrangler.cache import ScanStats, content_digest, default_cache_dir
+from tag_wrangler.models import Note, intern_tags
+from tag_wrangler.parser import PARSE_ERRORS, parse_note_bytes_lazy
+from tag_wrangler.vault import iter_markdown_files
+
+# Bump whenever the schema (or the pickled frontmatter layout) changes.
+STORE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    folder TEXT NOT NULL,
+    title TEXT NOT NULL,
+    frontmatter BLOB NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_folder ON notes (folder);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS note_tags (
+    tag_id INTEGER NOT NULL REFERENCES tags (id),
+    note_id INTEGER NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag_id, note_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags (note_id);
+"""
+
+
+class VaultStore:
+    """Persistent note/tag index for one vault, stored in a SQLite file.
+
+    Notes come back with ``body=None``; use
+    :func:`tag_wrangler.parser.load_body` to read a body on demand.
+    """
+
+    def __init__(self, path: Path, vault_root: Path) -> None:
+        self.path = path
+        self.vault_root = vault_root
+        self.stats = ScanStats()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self._migrate()
+
+    @classmethod
+    def for_vault(cls, vault_root: Path, cache_dir: Path | None = None) -> VaultStore:
+        """Open (or create) the store belonging to *vault_root*."""
+        vault_root = vault_root.resolve()
+        key = hashlib.sha1(str(vault_root).encode("utf-8")).hexdigest()[:16]
+        return cls(
+            (cache_dir or default_cache_dir()) / f"index-{key}.sqlite3", vault_root
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _migrate(self) -> None:
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version != STORE_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS note_tags;"
+                "DROP TABLE IF EXISTS tags;"
+                "DROP TABLE IF EXISTS notes;"
+            )
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def clear(self) -> None:
+        """Forget every note (used for a forced full rescan)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM note_tags")
+            self.conn.execute("DELETE FROM notes")
+            self.conn.execute("DELETE FROM tags")
+
+    # ---- Syncing ----
+
+    def sync(self) -> ScanStats:
+        """Bring the store up to date with the vault on disk.
+
+        Files whose mtime/size (or, failing that, content hash) match the
+        stored row are skipped; new and changed files are re-parsed and
+        rows for deleted files are dropped. Runs in one transaction.
+        """
+        stats = self.stats = ScanStats()
+        known = {
+            path: (note_id, mtime_ns, size, digest)
+            for note_id, path, mtime_ns, size, digest in self.conn.execute(
+                "SELECT id, path, mtime_ns, size, digest FROM notes"
+            )
+        }
+        seen: set[str] = set()
+        with self.conn:
+            for md in iter_markdown_files(self.vault_root):
+                rel = md.relative_to(self.vault_root).as_posix()
+                try:
+                    st = md.stat()
+                except OSError:
+                    continue
+                row = known.get(rel)
+                if row and row[1] == st.st_mtime_ns and row[2] == st.st_size:
+                    seen.add(rel)
+                    stats.hits += 1
+                    continue
+                try:
+                    data = md.read_bytes()
+                except OSError:
+                    continue
+                seen.add(rel)
+                digest = content_digest(data)
+                if row and row[3] == digest:
+                    # Touched but unchanged: just re-stamp it
+                    self.conn.execute(
+                        "UPDATE notes SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (st.st_mtime_ns, st.st_size, row[0]),
+                    )
+                    stats.hits += 1
+                    continue
+                stats.misses += 1
+                try:
+                    note = parse_note_bytes_lazy(data, md, self.vault_root)
+                except PARSE_ERRORS:
+                    # Unparseable now: drop any stale row, as a scan would
+                    seen.discard(rel)
+                    stats.failed += 1
+                    continue
+                self._put(note, st.st_mtime_ns, st.st_size, digest)
+
+            stale = [(known[rel][0],) for rel in known.keys() - seen]
+            self.conn.executemany("DELETE FROM notes WHERE id = ?", stale)
+            stats.removed = len(stale)
+            self._drop_unused_tags()
+        return stats
+
+    def update(self, notes: Iterable[Note]) -> None:
+        """Re-store *notes* after the app rewrote them (no re-parse)."""
+        with self.conn:
+            for note in notes:
+                full_path = self.vault_root / note.path
+                try:
+                    st = full_path.stat()
+                    data = full_path.read_bytes()
+                except OSError:
+                    self.conn.execute(
+                        "DELETE FROM notes WHERE path = ?", (note.path.as_posix(),)
+                    )
+                    continue
+                self._put(note, st.st_mtime_ns, st.st_size, content_digest(data))
+            self._drop_unused_tags()
+
+    def _put(self, note: Note, mtime_ns: int, size: int, digest: str) -> None:
+        rel = note.path.as_posix()
+        fm = pickle.dumps(note.frontmatter, protocol=pickle.HIGHEST_PROTOCOL)
+        (note_id,) = self.conn.execute(
+            "INSERT INTO notes (path, folder, title, frontmatter, mtime_ns, size, digest)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (path) DO UPDATE SET title = excluded.title,"
+            " frontmatter = excluded.frontmatter, mtime_ns = excluded.mtime_ns,"
+            " size = excluded.size, digest = excluded.digest"
+            " RETURNING id",
+            (rel, note.path.parent.as_posix(), note.title, fm, mtime_ns, size, digest),
+        ).fetchone()
+        self.conn.execute("DELETE FROM note_tags WHERE note_id = ?", (note_id,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tags (name) VALUES (?)", ((t,) for t in note.tags)
+        )
+        self.conn.executemany(
+            "INSERT INTO note_tags (tag_id, note_id)"
+            " SELECT id, ? FROM tags WHERE name = ?",
+            ((note_id, t) for t in note.tags),
+        )
+
+    def _drop_unused_tags(self) -> None:
+        self.conn.execute(
+            "DELETE FROM tags WHERE NOT EXISTS"
+            " (SELECT 1 FROM note_tags WHERE note_tags.tag_id = tags.id)"
+        )
+
+    # ---- Queries ----
+
+    def note_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def tag_counts(self) -> dict[str, int]:
+        """Every tag with the number of notes carrying it, by name."""
+        return dict(
+            self.conn.execute(
+                "SELECT t.name, COUNT(*) FROM tags t"
+                " JOIN note_tags nt ON nt.tag_id = t.id"
+                " GROUP BY t.id ORDER BY t.name"
+            )
+        )
+
+    def tags_by_prefix(self, prefix: str) -> list[tuple[str, int]]:
+        """Tags starting with *prefix* (e.g. ``project/``) and their counts."""
+        if not prefix:
+            return list(self.tag_counts().items())
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return self.conn.execute(
+            "SELECT t.name, COUNT(*) FROM tags t"
+            " JOIN note_tags nt ON nt.tag_id = t.id"
+            " WHERE t.name >= ? AND t.name < ?"
+            " GROUP BY t.id ORDER BY t.name",
+            (prefix, upper),
+        ).fetchall()
+
+    def notes_by_tag(self, tag: str) -> list[Path]:
+        """Paths of the notes tagged *tag*, in path order."""
+        return self._paths(
+            "SELECT n.path FROM notes n"
+            " JOIN note_tags nt ON nt.note_id = n.id"
+            " JOIN tags t ON t.id = nt.tag_id"
+            " WHERE t.name = ?",
+            (tag,),
+        )
+
+    def untagged_notes(self) -> list[Path]:
+        return self._paths(
+            "SELECT path FROM notes n WHERE NOT EXISTS"
+            " (SELECT 1 FROM note_tags nt WHERE nt.note_id = n.id)"
+        )
+
+    def notes_in_folder(self, folder: str, recursive: bool = True) -> list[Path]:
+        """Paths of notes in *folder* (``"."`` is the vault root).
+
+        With ``recursive``, notes in its subfolders are included too.
+        """
+        if recursive and folder != ".":
+            return self._paths(
+                "SELECT path FROM notes WHERE folder = ? OR folder LIKE ? ESCAPE '\\'",
+                (folder, _like_escape(folder) + "/%"),
+            )
+        if recursive:
+            return self._paths("SELECT path FROM notes")
+        return self._paths("SELECT path FROM notes WHERE folder = ?", (folder,))
+
+    def folders(self) -> list[str]:
+        """Distinct note folders (``"."`` for the root), sorted."""
+        return [
+            f
+            for (f,) in self.conn.execute(
+                "SELECT DISTINCT folder FROM notes ORDER BY folder"
+            )
+        ]
+
+    def load_notes(self) -> list[Note]:
+        """Rebuild every stored note (without bodies), in path order."""
+        tags: dict[int, list[str]] = {}
+        for note_id, name in self.conn.execute(
+            "SELECT nt.note_id, t.name FROM note_tags nt JOIN tags t ON t.id = nt.tag_id"
+        ):
+            tags.setdefault(note_id, []).append(name)
+        notes = [
+            Note(
+                path=Path(path),
+                title=title,
+                frontmatter=pickle.loads(fm),
+                tags=intern_tags(tags.get(note_id, ())),
+                body=None,
+            )
+            for note_id, path, title, fm in self.conn.execute(
+                "SELECT id, path, title, frontmatter FROM notes"
+            )
+        ]
+        notes.sort(key=lambda n: n.path)
+        return notes
+
+    def _paths(self, sql: str, params: tuple = ()) -> list[Path]:
+        # Sorted as Paths (by component), matching scan_vault's note order
+        return sorted(Path(p) for (p,) in self.conn.execute(sql, params))
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,119 @@
+"""Columnar views of a scanned vault for vectorised statistics.
+
+:class:`VaultTables` holds two pandas frames built once per vault state:
+
+``notes``
+    One row per note: ``id`` (position in the notes list), ``path``,
+    ``folder`` (categorical), ``title`` and ``tag_count``.
+``edges``
+    One row per (note, tag) pair: ``note_id`` and ``tag``, a categorical
+    whose categories are the sorted tag names.
+
+Folder and tag columns are integer codes into a category table, so
+group-bys and counts are numpy operations over small integer arrays rather
+than walks over ``Note`` objects.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from tag_wrangler import perf
+from tag_wrangler.models import Note
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tag_wrangler.snapshot import Snapshot
+
+
+@dataclasses.dataclass(eq=False)
+class VaultTables:
+    notes: pd.DataFrame
+    edges: pd.DataFrame
+
+    @classmethod
+    @perf.timed("tables.build")
+    def from_notes(cls, notes: Sequence[Note]) -> VaultTables:
+        tag_names = sorted({t for note in notes for t in note.tags})
+        tag_ids = {name: i for i, name in enumerate(tag_names)}
+        tag_count = np.fromiter(
+            (len(n.tags) for n in notes), dtype=np.int32, count=len(notes)
+        )
+        total = int(tag_count.sum())
+        tag_codes = np.fromiter(
+            (tag_ids[t] for note in notes for t in note.tags),
+            dtype=np.int32,
+            count=total,
+        )
+        return cls._build(
+            [n.path for n in notes],
+            [n.title for n in notes],
+            tag_names,
+            tag_count,
+            tag_codes,
+        )
+
+    @classmethod
+    @perf.timed("tables.build")
+    def from_snapshot(cls, snapshot: Snapshot) -> VaultTables:
+        """The same tables, read from a vault snapshot instead of notes."""
+        tag_count = np.diff(np.frombuffer(snapshot.note_offsets, dtype=np.uint64))
+        return cls._build(
+            snapshot.paths,
+            snapshot.titles,
+            snapshot.tag_names,
+            tag_count.astype(np.int32),
+            np.frombuffer(snapshot.note_tags, dtype=np.uint32).astype(np.int32),
+        )
+
+    @classmethod
+    def _build(
+        cls,
+        paths: Sequence[Path],
+        titles: list[str],
+        tag_names: list[str],
+        tag_count: np.ndarray,
+        tag_codes: np.ndarray,
+    ) -> VaultTables:
+        note_ids = np.repeat(np.arange(len(paths), dtype=np.int32), tag_count)
+        table = pd.DataFrame(
+            {
+                "id": np.arange(len(paths), dtype=np.int32),
+                "path": [p.as_posix() for p in paths],
+                "folder": pd.Categorical([p.parent.as_posix() for p in paths]),
+                "title": titles,
+                "tag_count": tag_count,
+            }
+        )
+        edges = pd.DataFrame(
+            {
+                "note_id": note_ids,
+                "tag": pd.Categorical.from_codes(
+                    tag_codes, categories=pd.Index(tag_names, dtype=object)
+                ),
+            }
+        )
+        return cls(table, edges)
+
+    @property
+    def tag_names(self) -> pd.Index:
+        """Every tag in the vault, sorted; edge tag codes index into it."""
+        return self.edges["tag"].cat.categories
+
+    @property
+    def tag_codes(self) -> np.ndarray:
+        return self.edges["tag"].cat.codes.to_numpy()
+
+    def tag_counts(self) -> np.ndarray:
+        """Notes per tag, aligned with :attr:`tag_names`."""
+        return np.bincount(self.tag_codes, minlength=len(self.tag_names))
+
+    def folders(self) -> list[str]:
+        """Folders holding at least one note, sorted (``"."`` is the root)."""
+        return sorted(self.notes["folder"].cat.categories)
@@ -0,0 +1,142 @@
+"""Tag name indexes: a trie of nested tags and an n-gram search index."""
+
+from __future__ import annotations
+
+import dataclasses
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+
+from tag_wrangler import perf
+from tag_wrangler.models import TagInfo
+
+
+@dataclasses.dataclass(slots=True, eq=False)
+class TrieNode:
+    """One ``/``-separated prefix of the tag namespace."""
+
+    name: str  # last segment, e.g. "work" for project/work
+    path: str  # full prefix, e.g. "project/work"
+    depth: int  # 0 for top-level tags
+    info: TagInfo | None = None  # the tag itself, when the prefix is in use
+    children: dict[str, TrieNode] = dataclasses.field(default_factory=dict)
+    note_count: int = 0  # distinct notes tagged with this prefix or below it
+    tag_count: int = 0  # tags at or below this prefix
+
+    @property
+    def own_count(self) -> int:
+        """Notes tagged with exactly this prefix."""
+        return self.info.count if self.info is not None else 0
+
+    def walk(self) -> Iterator[TrieNode]:
+        """This node and its descendants, depth first in name order."""
+        yield self
+        for name in sorted(self.children):
+            yield from self.children[name].walk()
+
+
+class TagTrie:
+    """Trie over nested tag names with rolled-up note counts.
+
+    A note tagged ``a/b`` and ``a/c`` counts once towards ``a``: counts are
+    the size of the union of the postings below each prefix, not a sum.
+    """
+
+    def __init__(self) -> None:
+        self.roots: dict[str, TrieNode] = {}
+
+    @classmethod
+    @perf.timed("trie.build")
+    def from_index(cls, tag_index: dict[str, TagInfo]) -> TagTrie:
+        trie = cls()
+        for name, info in tag_index.items():
+            trie._insert(name, info)
+        for root in trie.roots.values():
+            _roll_up(root)
+        return trie
+
+    def _insert(self, name: str, info: TagInfo) -> None:
+        level = self.roots
+        path: list[str] = []
+        node = None
+        for depth, part in enumerate(name.split("/")):
+            path.append(part)
+            node = level.get(part)
+            if node is None:
+                node = level[part] = TrieNode(part, "/".join(path), depth)
+            level = node.children
+        node.info = info
+
+    def find(self, path: str) -> TrieNode | None:
+        """Node for the prefix *path* (a tag or an intermediate level)."""
+        level = self.roots
+        node = None
+        for part in path.split("/"):
+            node = level.get(part)
+            if node is None:
+                return None
+            level = node.children
+        return node
+
+    def nested_roots(self) -> list[TrieNode]:
+        """Top-level nodes that have nested tags below them, by name."""
+        return [self.roots[k] for k in sorted(self.roots) if self.roots[k].children]
+
+
+def _roll_up(node: TrieNode) -> Sequence[int] | set[int]:
+    """Fill in counts below *node*; returns the note IDs under it."""
+    own = node.info.postings if node.info is not None else ()
+    if not node.children:
+        node.note_count = len(own)
+        node.tag_count = 1 if node.info is not None else 0
+        return own
+    notes = set(own)
+    tags = 1 if node.info is not None else 0
+    for child in node.children.values():
+        notes.update(_roll_up(child))
+        tags += child.tag_count
+    node.note_count = len(notes)
+    node.tag_count = tags
+    return notes
+
+
+class TagSearch:
+    """Substring search over tag names.
+
+    Names are kept sorted, with an index from every 2- and 3-character
+    substring to the names containing it, so a query only verifies the few
+    names that carry its rarest trigrams instead of scanning every tag.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names = sorted(names)
+        grams: dict[str, array] = {}
+        for i, name in enumerate(self.names):
+            seen = {name[j : j + 2] for j in range(len(name) - 1)}
+            seen.update(name[j : j + 3] for j in range(len(name) - 2))
+            for gram in seen:
+                postings = grams.get(gram)
+                if postings is None:
+                    postings = grams[gram] = array("I")
+                postings.append(i)
+        self.grams = grams
+
+    def search(self, query: str) -> list[int]:
+        """Positions in :attr:`names` of names containing *query*, in order."""
+        q = query.lower()
+        if not q:
+            return list(range(len(self.names)))
+        if len(q) == 1:
+            return [i for i, name in enumerate(self.names) if q in name]
+        if len(q) <= 3:
+            return list(self.grams.get(q, ()))
+        postings = []
+        for j in range(len(q) - 2):
+            p = self.grams.get(q[j : j + 3])
+            if p is None:
+                return []
+            postings.append(p)
+        # Intersect the two rarest trigrams, then check the real substring
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(postings[1])
+        names = self.names
+        return sorted(i for i in candidates if q in names[i])
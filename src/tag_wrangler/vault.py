@@ -2,36 +2,267 @@
 
 from __future__ import annotations
 
+import bisect
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from tag_wrangler.models import Note, TagInfo
-from tag_wrangler.parser import parse_note
+from tag_wrangler import fmparse, perf
+from tag_wrangler.cache import ScanCache, ScanStats, content_digest
+from tag_wrangler.models import Note, TagIndex, TagInfo
+from tag_wrangler.parser import PARSE_ERRORS, parse_note_bytes, parse_note_bytes_lazy
 
 
-def scan_vault(vault_path: Path) -> list[Note]:
-    """Recursively scan a vault directory and parse all markdown files."""
-    vault_path = vault_path.resolve()
-    notes: list[Note] = []
-    for md in sorted(vault_path.rglob("*.md")):
-        # Skip hidden directories (like .obsidian, .trash)
-        parts = md.relative_to(vault_path).parts
-        if any(p.startswith(".") for p in parts):
+def iter_markdown_files(
+    vault_path: Path, folder: str = ".", recursive: bool = True
+) -> Iterator[Path]:
+    """Yield every ``.md`` file under *vault_path* in sorted order.
+
+    Hidden directories (like .obsidian, .trash) are skipped. *folder*
+    (vault-relative) limits the walk to one subtree, or to the notes
+    directly inside it when *recursive* is false.
+    """
+    base = vault_path / folder
+    found = base.rglob("*.md") if recursive else base.glob("*.md")
+    for md in sorted(found):
+        if is_hidden(md.relative_to(vault_path)):
             continue
-        try:
-            notes.append(parse_note(md, vault_path))
-        except Exception:
-            # Skip files that can't be parsed
+        yield md
+
+
+def is_hidden(rel: Path) -> bool:
+    """True if any component of the vault-relative path starts with a dot."""
+    return any(p.startswith(".") for p in rel.parts)
+
+
+@perf.timed("scan")
+def scan_vault(
+    vault_path: Path,
+    cache: ScanCache | None = None,
+    full_rescan: bool = False,
+    workers: int | None = 1,
+    chunk_size: int = 64,
+    lazy_body: bool = False,
+    folder: str = ".",
+    recursive: bool = True,
+) -> list[Note]:
+    """Recursively scan a vault directory and parse all markdown files.
+
+    With a *cache*, files whose mtime/size (or content hash) are unchanged
+    are served from it and only added or modified files are re-parsed.
+    ``full_rescan`` discards the cache first. Hit/miss counts are left on
+    ``cache.stats``.
+
+    ``workers`` > 1 spreads parsing across that many processes (``None``
+    uses every core), handing them files in batches of ``chunk_size``.
+    Notes are always returned in sorted path order.
+
+    ``lazy_body`` keeps only the frontmatter in memory: note bodies are
+    scanned for inline tags and dropped (``Note.body`` is None), to be
+    fetched later with :func:`tag_wrangler.parser.load_body`.
+
+    *folder* and *recursive* scan just part of the vault (see
+    :mod:`tag_wrangler.shards`); cache entries outside it are left alone.
+    """
+    vault_path = vault_path.resolve()
+    if cache is not None and (full_rescan or cache.lazy_body != lazy_body):
+        cache.clear()
+        cache.lazy_body = lazy_body
+    stats = cache.stats if cache is not None else ScanStats()
+    stats.hits = stats.misses = stats.removed = stats.failed = 0
+
+    slots: list[Note | None] = []
+    pending: list[tuple[int, str, Path, os.stat_result]] = []
+    seen: set[str] = set()
+    with perf.span("scan.walk"):
+        for md in iter_markdown_files(vault_path, folder, recursive):
+            rel = md.relative_to(vault_path).as_posix()
+            try:
+                st = md.stat()
+            except OSError:
+                continue
+            seen.add(rel)
+            entry = cache.lookup(rel, st) if cache is not None else None
+            if entry is not None:
+                stats.hits += 1
+                slots.append(entry.note)
+            else:
+                pending.append((len(slots), rel, md, st))
+                slots.append(None)
+    perf.count("files_scanned", len(seen))
+    perf.count("files_read", len(pending))
+    perf.count("bytes_read", sum(st.st_size for *_, st in pending))
+
+    jobs = [
+        (md, vault_path, _known_digest(cache, rel), lazy_body)
+        for _, rel, md, _ in pending
+    ]
+    with perf.span("scan.parse"):
+        results = _load_many(jobs, workers, chunk_size)
+    for (slot, rel, _, st), (digest, note, unchanged) in zip(pending, results):
+        if digest is None:
+            # Unreadable (vanished mid-scan) - leave it out of the manifest too
+            seen.discard(rel)
             continue
+        if cache is None:
+            stats.misses += 1
+            slots[slot] = note
+        elif unchanged:
+            stats.hits += 1
+            slots[slot] = cache.lookup_digest(rel, st, digest).note
+        else:
+            stats.misses += 1
+            # A None note remembers the failure so unchanged broken files
+            # are not retried
+            cache.store(rel, st, digest, note)
+            slots[slot] = note
+
+    if cache is not None:
+        if folder == "." and recursive:
+            stats.removed = cache.prune(seen)
+        else:
+            scope = "" if folder == "." else folder.rstrip("/") + "/"
+            stats.removed = cache.prune(
+                seen,
+                lambda rel: (
+                    rel.startswith(scope)
+                    and (recursive or "/" not in rel[len(scope) :])
+                ),
+            )
+    notes = [n for n in slots if n is not None]
+    stats.failed = len(seen) - len(notes)
     return notes
 
 
-def build_tag_index(notes: list[Note]) -> dict[str, TagInfo]:
-    """Build an index of tag -> TagInfo from parsed notes."""
-    index: dict[str, TagInfo] = {}
-    for note in notes:
+def _known_digest(cache: ScanCache | None, rel: str) -> str | None:
+    if cache is None:
+        return None
+    entry = cache.entries.get(rel)
+    return entry.digest if entry else None
+
+
+def _load_many(
+    jobs: list[tuple[Path, Path, str | None, bool]],
+    workers: int | None,
+    chunk_size: int,
+) -> list[tuple[str | None, Note | None, bool]]:
+    """Run :func:`_load_one` over *jobs*, in worker processes when asked to."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [_load_one(*job) for job in jobs]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=fmparse.set_backend,
+        initargs=(fmparse.get_backend(),),
+    ) as pool:
+        return list(pool.map(_load_one, *zip(*jobs), chunksize=max(1, chunk_size)))
+
+
+def _load_one(
+    path: Path, vault_root: Path, known_digest: str | None, lazy_body: bool = False
+) -> tuple[str | None, Note | None, bool]:
+    """Read and parse one file.
+
+    Returns ``(digest, note, unchanged)``. ``unchanged`` is True (and the
+    parse skipped) when the content hash equals *known_digest*; ``note`` is
+    None when the file could not be parsed and ``digest`` is None when it
+    could not be read at all.
+    """
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None, None, False
+    digest = content_digest(data)
+    if digest == known_digest:
+        return digest, None, True
+    parse = parse_note_bytes_lazy if lazy_body else parse_note_bytes
+    try:
+        return digest, parse(data, path, vault_root), False
+    except PARSE_ERRORS:
+        # Skip files that can't be parsed
+        return digest, None, False
+
+
+@perf.timed("index.build")
+def build_tag_index(notes: list[Note]) -> TagIndex:
+    """Build an index of tag -> TagInfo from parsed notes.
+
+    Note IDs in the postings are positions in *notes*.
+    """
+    paths = [note.path for note in notes]
+    index = TagIndex(paths)
+    for note_id, note in enumerate(notes):
         for tag in note.tags:
-            if tag not in index:
-                index[tag] = TagInfo(name=tag, count=0, notes=[])
-            index[tag].count += 1
-            index[tag].notes.append(note.path)
+            info = index.get(tag)
+            if info is None:
+                info = TagInfo(name=tag, id=index.next_tag_id, note_paths=paths)
+                index.next_tag_id += 1
+                index[tag] = info
+            info.postings.append(note_id)
     return index
+
+
+@perf.timed("index.update")
+def update_tag_index(
+    index: TagIndex, changes: Iterable[tuple[Note, tuple[str, ...]]]
+) -> None:
+    """Apply tag deltas to *index* in place.
+
+    *changes* holds ``(note, tags_before)`` pairs for notes whose ``tags``
+    have since changed (as returned by the operations module). Only the
+    postings of tags a note gained or lost are touched, so the cost is
+    proportional to the change rather than the vault.
+    """
+    for note, old_tags in changes:
+        note_id = index.note_id(note.path)
+        old, new = set(old_tags), set(note.tags)
+        for tag in old - new:
+            info = index.get(tag)
+            if info is None:
+                continue
+            pos = bisect.bisect_left(info.postings, note_id)
+            if pos < len(info.postings) and info.postings[pos] == note_id:
+                del info.postings[pos]
+            if not info.postings:
+                del index[tag]
+        for tag in new - old:
+            info = index.get(tag)
+            if info is None:
+                info = TagInfo(name=tag, id=index.next_tag_id, note_paths=index.paths)
+                index.next_tag_id += 1
+                index[tag] = info
+            pos = bisect.bisect_left(info.postings, note_id)
+            if pos == len(info.postings) or info.postings[pos] != note_id:
+                info.postings.insert(pos, note_id)
+
+
+@perf.timed("notes.refresh")
+def refresh_notes(
+    notes: Iterable[Note], vault_root: Path, lazy_body: bool = False
+) -> list[tuple[Note, tuple[str, ...]]]:
+    """Re-parse *notes* from disk, updating the objects in place.
+
+    Returns ``(note, tags_before)`` pairs for :func:`update_tag_index`.
+    Notes that can no longer be parsed are left as they were.
+    """
+    changes: list[tuple[Note, tuple[str, ...]]] = []
+    for note in notes:
+        full_path = vault_root / note.path
+        try:
+            data = full_path.read_bytes()
+            perf.count("files_read")
+            perf.count("bytes_read", len(data))
+            parse = parse_note_bytes_lazy if lazy_body else parse_note_bytes
+            fresh = parse(data, full_path, vault_root)
+        except (OSError, *PARSE_ERRORS):
+            continue
+        old_tags = note.tags
+        note.title = fresh.title
+        note.frontmatter = fresh.frontmatter
+        note.tags = fresh.tags
+        note.body = fresh.body
+        changes.append((note, old_tags))
+    return changes
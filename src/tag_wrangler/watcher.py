@@ -0,0 +1,291 @@
+"""Watch a vault for note changes and fold them into the loaded notes."""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from tag_wrangler.models import Note
+from tag_wrangler.parser import PARSE_ERRORS, parse_note, parse_note_lazy
+from tag_wrangler.vault import is_hidden, refresh_notes
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional; fall back to polling
+    FileSystemEventHandler = object
+    Observer = None
+
+log = logging.getLogger(__name__)
+
+# (inode, size, mtime_ns) per vault-relative note path
+Snapshot = dict[Path, tuple[int, int, int]]
+
+
+@dataclasses.dataclass
+class VaultEvents:
+    """Net changes to ``.md`` notes since the last drain (vault-relative)."""
+
+    created: set[Path] = dataclasses.field(default_factory=set)
+    modified: set[Path] = dataclasses.field(default_factory=set)
+    deleted: set[Path] = dataclasses.field(default_factory=set)
+    moved: dict[Path, Path] = dataclasses.field(default_factory=dict)  # old -> new
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.modified or self.deleted or self.moved)
+
+
+class VaultWatcher:
+    """Detect created, modified, deleted and renamed notes under a vault.
+
+    The ``"poll"`` backend diffs stat snapshots every ``interval`` seconds
+    and needs nothing beyond the standard library. ``"native"`` uses
+    watchdog (inotify on Linux) when it is installed; ``"auto"`` picks it
+    if available. Events are debounced: :meth:`poll` only hands out a batch
+    once no new event has arrived for ``debounce`` seconds.
+    """
+
+    def __init__(
+        self,
+        vault_root: Path,
+        backend: str = "auto",
+        interval: float = 2.0,
+        debounce: float = 0.5,
+    ) -> None:
+        if backend not in ("auto", "poll", "native"):
+            raise ValueError(f"Unknown watcher backend: {backend!r}")
+        if backend == "native" and Observer is None:
+            raise RuntimeError("The native watcher backend needs watchdog installed")
+        self.vault_root = vault_root.resolve()
+        self.backend = (
+            "native" if backend != "poll" and Observer is not None else "poll"
+        )
+        self.interval = interval
+        self.debounce = debounce
+
+        self._lock = threading.Lock()
+        self._events = VaultEvents()
+        self._last_event = 0.0
+        self._snapshot: Snapshot = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None or self._observer is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._snapshot = snapshot(self.vault_root)
+        if self.backend == "native":
+            self._observer = Observer()
+            self._observer.schedule(
+                _Handler(self), str(self.vault_root), recursive=True
+            )
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._thread = threading.Thread(
+                target=self._poll_loop, name="tag-wrangler-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def poll(self) -> VaultEvents | None:
+        """Return (and clear) pending events once the burst has settled."""
+        with self._lock:
+            if not self._events:
+                return None
+            if time.monotonic() - self._last_event < self.debounce:
+                return None
+            events, self._events = self._events, VaultEvents()
+            return events
+
+    def rescan(self) -> None:
+        """Diff a fresh stat snapshot against the last one and record it."""
+        current = snapshot(self.vault_root)
+        previous, self._snapshot = self._snapshot, current
+        for kind, rel, dest in diff_snapshots(previous, current):
+            self._record(kind, rel, dest)
+
+    def _poll_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.rescan()
+            except OSError:
+                # The vault may be mid-reorganisation; try again next tick
+                continue
+
+    def _record(self, kind: str, rel: Path, dest: Path | None = None) -> None:
+        """Fold one raw event into the pending net change set."""
+        with self._lock:
+            ev = self._events
+            if kind == "created":
+                if rel in ev.deleted:
+                    ev.deleted.discard(rel)
+                    ev.modified.add(rel)
+                else:
+                    ev.created.add(rel)
+            elif kind == "modified":
+                if rel not in ev.created:
+                    ev.modified.add(rel)
+            elif kind == "deleted":
+                ev.modified.discard(rel)
+                if rel in ev.created:
+                    ev.created.discard(rel)
+                else:
+                    ev.deleted.add(rel)
+            elif kind == "moved" and dest is not None:
+                if rel in ev.created:
+                    ev.created.discard(rel)
+                    ev.created.add(dest)
+                else:
+                    origin = next((o for o, n in ev.moved.items() if n == rel), rel)
+                    ev.moved.pop(origin, None)
+                    ev.modified.discard(rel)
+                    ev.moved[origin] = dest
+            self._last_event = time.monotonic()
+
+
+class _Handler(FileSystemEventHandler):
+    """Translate watchdog events into vault-relative note events."""
+
+    def __init__(self, watcher: VaultWatcher) -> None:
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event) -> None:
+        if event.event_type not in ("created", "modified", "deleted", "moved"):
+            return
+        if event.is_directory:
+            # Directory moves/deletes can hide per-file events; diff instead
+            if event.event_type != "modified":
+                self.watcher.rescan()
+            return
+        src = self._note_path(event.src_path)
+        dest = self._note_path(getattr(event, "dest_path", "") or "")
+        if event.event_type == "moved":
+            if src and dest:
+                self.watcher._record("moved", src, dest)
+            elif dest:
+                # e.g. an editor's atomic save: temp file renamed onto the note
+                self.watcher._record("modified", dest)
+            elif src:
+                self.watcher._record("deleted", src)
+        elif src:
+            self.watcher._record(event.event_type, src)
+
+    def _note_path(self, raw: str | bytes) -> Path | None:
+        if not raw:
+            return None
+        path = Path(os.fsdecode(raw))
+        if path.suffix != ".md":
+            return None
+        try:
+            rel = path.relative_to(self.watcher.vault_root)
+        except ValueError:
+            return None
+        return None if is_hidden(rel) else rel
+
+
+def snapshot(vault_root: Path) -> Snapshot:
+    """Stat every note under *vault_root*, skipping hidden directories."""
+    result: Snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(vault_root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if name.startswith(".") or not name.endswith(".md"):
+                continue
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            rel = Path(full).relative_to(vault_root)
+            result[rel] = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return result
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> list[tuple[str, Path, Path | None]]:
+    """Events turning *old* into *new*; same-inode delete+create is a move."""
+    events: list[tuple[str, Path, Path | None]] = []
+    gone = {rel: sig for rel, sig in old.items() if rel not in new}
+    born = {sig: rel for rel, sig in new.items() if rel not in old}
+    for rel, sig in gone.items():
+        dest = born.pop(sig, None)
+        if dest is not None:
+            events.append(("moved", rel, dest))
+        else:
+            events.append(("deleted", rel, None))
+    events.extend(("created", rel, None) for rel in born.values())
+    events.extend(
+        ("modified", rel, None)
+        for rel, sig in new.items()
+        if rel in old and old[rel] != sig
+    )
+    return events
+
+
+def apply_events(
+    notes: list[Note], vault_root: Path, events: VaultEvents, lazy_body: bool = False
+) -> tuple[list[tuple[Note, tuple[str, ...]]], bool]:
+    """Re-parse only the touched notes and update *notes* in place.
+
+    Returns ``(changes, structural)``: ``changes`` are ``(note, tags_before)``
+    pairs for notes that were re-read, and ``structural`` is True when
+    notes were added, removed or renamed (note IDs shifted, so the tag
+    index must be rebuilt rather than patched).
+    """
+    by_path = {note.path: note for note in notes}
+    touched: list[Note] = []
+    structural = False
+    parse = parse_note_lazy if lazy_body else parse_note
+
+    for old, new in events.moved.items():
+        note = by_path.pop(old, None)
+        if note is None:
+            events.created.add(new)
+            continue
+        note.path = new
+        by_path[new] = note
+        touched.append(note)
+        structural = True
+    for rel in events.deleted:
+        if by_path.pop(rel, None) is not None:
+            structural = True
+    for rel in events.created | events.modified:
+        note = by_path.get(rel)
+        if note is not None:
+            touched.append(note)
+            continue
+        try:
+            by_path[rel] = parse(vault_root / rel, vault_root)
+        except OSError:
+            # Already gone again; its deletion is the next event
+            continue
+        except PARSE_ERRORS as e:
+            # Leave it out, like a scan does
+            log.warning("Skipped unparseable note %s: %s", rel, e)
+            continue
+        structural = True
+
+    changes = refresh_notes(touched, vault_root, lazy_body=lazy_body)
+    if structural:
+        notes[:] = sorted(by_path.values(), key=lambda n: n.path)
+    return changes, structural
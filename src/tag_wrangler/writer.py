@@ -0,0 +1,185 @@
+"""Concurrent, atomic frontmatter writes for bulk operations.
+
+Each job reads a note, rewrites its frontmatter (patching just the tags
+entry where it can) and writes it back through a temp file renamed into
+place. Jobs run on a bounded thread pool so the per-file read/write
+latency overlaps (which matters most on network-mounted vaults). A failing
+file is recorded and skipped; it never aborts the rest of the batch.
+
+With a :class:`~tag_wrangler.journal.JournalWriter` the batch runs in two
+passes: every note is read and rendered first, the whole plan is logged,
+and only then are files written, with completions logged in groups.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tag_wrangler import perf
+from tag_wrangler.journal import FileChange, JournalWriter
+from tag_wrangler.models import Note
+from tag_wrangler.parser import PARSE_ERRORS, atomic_write_text, render_frontmatter
+
+# Threads mostly wait on I/O, so use more of them than there are cores
+DEFAULT_WRITE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+@dataclasses.dataclass
+class WriteError:
+    path: Path
+    error: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.error}"
+
+
+@dataclasses.dataclass
+class WriteReport:
+    """Outcome and throughput of one :func:`write_frontmatters` batch."""
+
+    written: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    errors: list[WriteError] = dataclasses.field(default_factory=list)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.written} file(s), {self.bytes / 1e6:.1f} MB in "
+            f"{self.seconds:.2f}s ({self.files_per_second:.0f} files/s), "
+            f"{len(self.errors)} error(s)"
+        )
+
+
+@perf.timed("write.batch")
+def write_frontmatters(
+    jobs: Sequence[tuple[Note, dict]],
+    vault_root: Path,
+    workers: int | None = None,
+    journal: JournalWriter | None = None,
+) -> tuple[list[str | None], WriteReport]:
+    """Write new frontmatter for each ``(note, frontmatter)`` in *jobs*.
+
+    Returns the body found on disk for each job (``None`` where the write
+    failed), in job order, and a report with errors and throughput. At most
+    ``workers`` files are in flight at once (default
+    :data:`DEFAULT_WRITE_WORKERS`). The batch is logged to *journal*, which
+    is finished when it returns.
+    """
+    report = WriteReport()
+    if not jobs:
+        if journal is not None:
+            journal.plan([])
+            journal.finish()
+        return [], report
+    workers = min(workers or DEFAULT_WRITE_WORKERS, len(jobs))
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    run = pool.map if pool is not None else map
+    start = time.perf_counter()
+    try:
+        if journal is None:
+            results = list(
+                run(lambda job: _write_one(job[0], vault_root, job[1]), jobs)
+            )
+        else:
+            results = _write_journaled(jobs, vault_root, journal, run)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    report.seconds = time.perf_counter() - start
+
+    bodies: list[str | None] = []
+    for (note, _), (body, size, error) in zip(jobs, results):
+        if error is not None:
+            report.errors.append(WriteError(note.path, error))
+        else:
+            report.written += 1
+            report.bytes += size
+        bodies.append(body)
+    perf.count("files_written", report.written)
+    perf.count("bytes_written", report.bytes)
+    perf.count("write_errors", len(report.errors))
+    return bodies, report
+
+
+def _write_journaled(
+    jobs: Sequence[tuple[Note, dict]],
+    vault_root: Path,
+    journal: JournalWriter,
+    run: Callable,
+) -> list[tuple[str | None, int, str | None]]:
+    """Render every job, log the plan, then write and log completions."""
+    rendered = list(run(lambda job: _render_one(job[0], vault_root, job[1]), jobs))
+    journal.plan(
+        FileChange.between(note.path.as_posix(), text, out)
+        for (note, _), (text, out, _, error) in zip(jobs, rendered)
+        if error is None
+    )
+    stored = run(
+        lambda item: _store(vault_root / item[0][0].path, item[1]), zip(jobs, rendered)
+    )
+    results = []
+    try:
+        for (note, _), (_, _, body, _), (size, error) in zip(jobs, rendered, stored):
+            if error is not None:
+                results.append((None, 0, error))
+                continue
+            journal.done(note.path.as_posix())
+            results.append((body, size, None))
+    finally:
+        # If this is cut short the journal stays interrupted, ready to resume
+        journal.commit()
+    journal.finish()
+    return results
+
+
+def _write_one(
+    note: Note, vault_root: Path, fm: dict
+) -> tuple[str | None, int, str | None]:
+    """(body, bytes written, error) for one note.
+
+    A read, parse or write failure is returned as the error, not raised.
+    """
+    rendered = _render_one(note, vault_root, fm)
+    size, error = _store(vault_root / note.path, rendered)
+    if error is not None:
+        return None, 0, error
+    return rendered[2], size, None
+
+
+def _render_one(
+    note: Note, vault_root: Path, fm: dict
+) -> tuple[str, str, str, str | None]:
+    """(text on disk, new text, body, error) for one note; never raises."""
+    try:
+        text = (vault_root / note.path).read_text(encoding="utf-8", errors="replace")
+        out, body = render_frontmatter(text, fm, note.frontmatter)
+    except (OSError, *PARSE_ERRORS) as e:
+        return "", "", "", str(e) or type(e).__name__
+    return text, out, body, None
+
+
+def _store(
+    full_path: Path, rendered: tuple[str, str, str, str | None]
+) -> tuple[int, str | None]:
+    """(bytes written, error) for a rendered note; never raises."""
+    out, error = rendered[1], rendered[3]
+    if error is not None:
+        return 0, error
+    try:
+        atomic_write_text(full_path, out)
+    except OSError as e:
+        return 0, str(e) or type(e).__name__
+    return len(out.encode("utf-8")), None